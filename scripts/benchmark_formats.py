@@ -0,0 +1,111 @@
+"""
+Cold start and memory of the app loaders on the csv and parquet clean dataset.
+
+Each loader runs in a fresh python process, as when the app starts.
+
+Usage (from the root of the project):
+    python scripts/benchmark_formats.py --csv data/clean_recipe_df.csv
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import psutil
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+
+def measure(file_format: str, path: str):
+    """Load the dataset with the app loader of the format and print the measures
+    as json
+
+    Args:
+        file_format (str): "csv" or "parquet"
+        path (str): The path of the dataset
+    """
+    from utils.load_functions import load_df, load_df_parquet
+
+    loader = load_df_parquet if file_format == "parquet" else load_df
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    df = loader(path)
+    load_time = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "load_time": load_time,
+                "rss_delta": process.memory_info().rss - rss_before,
+                "df_memory": int(df.memory_usage(deep=True).sum()),
+                "file_size": os.path.getsize(path),
+            }
+        )
+    )
+
+
+def measure_cold(file_format: str, path: str):
+    """Run `measure` in a new python process
+
+    Args:
+        file_format (str): "csv" or "parquet"
+        path (str): The path of the dataset
+
+    Returns:
+        dict : The measures
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", file_format, path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare the csv and parquet loaders of the app"
+    )
+    parser.add_argument("--csv", default=os.path.join(ROOT, "data", "clean_recipe_df.csv"))
+    parser.add_argument(
+        "--parquet",
+        default=None,
+        help="parquet written by the pipeline, converted from the csv if missing",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--measure", nargs=2, metavar=("FORMAT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure is not None:
+        measure(*args.measure)
+        return
+
+    parquet_path = args.parquet or os.path.splitext(args.csv)[0] + ".parquet"
+    if not os.path.exists(parquet_path):
+        from scripts.pipeline_preprocess import load_clean_dataset, save_data_parquet
+
+        print(f"Converting {args.csv} to {parquet_path}")
+        save_data_parquet(load_clean_dataset(args.csv), parquet_path)
+
+    print(
+        f"{'format':<10}{'file (MB)':>12}{'cold load (s)':>15}"
+        f"{'RSS delta (MB)':>16}{'dataframe (MB)':>16}"
+    )
+    for file_format, path in [("csv", args.csv), ("parquet", parquet_path)]:
+        runs = [measure_cold(file_format, path) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["load_time"])
+        print(
+            f"{file_format:<10}{best['file_size'] / 2**20:>12.1f}"
+            f"{best['load_time']:>15.3f}{best['rss_delta'] / 2**20:>16.1f}"
+            f"{best['df_memory'] / 2**20:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
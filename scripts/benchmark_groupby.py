@@ -0,0 +1,91 @@
+"""
+Benchmark of the groupby engines of pipeline_preprocess on synthetic merged data.
+
+Usage (from the root of the project):
+    python scripts/benchmark_groupby.py --n-interactions 1100000 --n-recipes 230000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.pipeline_preprocess import (
+    groupby,
+    GROUPBY_FIRST_COLUMNS,
+    GROUPBY_LIST_COLUMNS,
+)
+
+
+def make_merged_data(n_interactions: int, n_recipes: int, seed: int = 0):
+    """Build a dataframe shaped like the merge of PP_recipes, RAW_recipes and
+    RAW_interactions
+
+    Args:
+        n_interactions (int): The number of rows (interactions)
+        n_recipes (int): The number of distinct recipe_id
+        seed (int): Seed of the random generator
+
+    Returns:
+        df : The merged data, one row per interaction
+    """
+    rng = np.random.default_rng(seed)
+    recipe_ids = rng.integers(0, n_recipes, n_interactions)
+    data = pd.DataFrame({"recipe_id": recipe_ids})
+    for column in GROUPBY_FIRST_COLUMNS:
+        data[column] = recipe_ids
+    data["name"] = "recipe " + data["recipe_id"].astype(str)
+    data["review"] = "review " + pd.Series(np.arange(n_interactions)).astype(str)
+    data["date"] = pd.Timestamp("2000-01-01").date()
+    data["user_id"] = rng.integers(0, 100_000, n_interactions)
+    data["rating"] = rng.integers(0, 6, n_interactions)
+    return data[["recipe_id"] + GROUPBY_FIRST_COLUMNS + GROUPBY_LIST_COLUMNS]
+
+
+def time_engine(data: pd.DataFrame, engine: str, repeat: int):
+    """Time `groupby` with the given engine
+
+    Args:
+        data (pd.DataFrame): The merged data
+        engine (str): The groupby engine
+        repeat (int): The number of runs
+
+    Returns:
+        best : The best wall time, in seconds
+        df : The result of the last run
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = groupby(data, engine=engine)
+        timings.append(time.perf_counter() - start)
+    return min(timings), df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the groupby engines")
+    parser.add_argument("--n-interactions", type=int, default=200_000)
+    parser.add_argument("--n-recipes", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data = make_merged_data(args.n_interactions, args.n_recipes)
+    print(f"{args.n_interactions} interactions, {data['recipe_id'].nunique()} recipes")
+
+    pandas_time, expected = time_engine(data, "pandas", args.repeat)
+    vectorized_time, result = time_engine(data, "vectorized", args.repeat)
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f"{'engine':<12}{'best time (s)':>15}")
+    print(f"{'pandas':<12}{pandas_time:>15.3f}")
+    print(f"{'vectorized':<12}{vectorized_time:>15.3f}")
+    print(f"speedup: x{pandas_time / vectorized_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Benchmark suite of the hot paths of the pipeline and of the app, on synthetic
+Food.com dumps of several sizes (see generate_synthetic_data.py).
+
+Each benchmark is repeated; its best and median wall times and its median peak
+RSS (above the RSS at its start) are stored in a JSON file. Two such files can
+then be compared, the benchmarks slower or heavier than the baseline beyond a
+threshold being reported as regressions.
+
+The "session.*" benchmarks measure instead the memory added by each additional
+session of the app holding the recipes, with its own copy or with a view of the
+shared read-only dataset.
+
+Usage (from the root of the project):
+    python scripts/benchmark_suite.py run --scales 0.01 0.05 \\
+        --output benchmarks/baseline.json
+    python scripts/benchmark_suite.py run --compare benchmarks/baseline.json
+    python scripts/benchmark_suite.py compare benchmarks/baseline.json \\
+        benchmarks/current.json
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "src"))
+
+from scripts import pipeline_preprocess
+from scripts.generate_synthetic_data import SampleProfile, generate
+from scripts.stage_profiler import PeakRss
+
+DEFAULT_SCALES = [0.01, 0.05]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MEMORY_THRESHOLD = 0.3
+# Differences below these are noise, never regressions
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 4 * 2**20
+# Recipes whose scores are computed by the score_functions benchmark
+SCORED_RECIPES = 100
+# Sessions opened by the benchmarks of the memory of a session
+DEFAULT_SESSIONS = 5
+GEOJSON = os.path.join(ROOT, "data", "us_states.geojson")
+
+
+def measure(setup, run, repeat: int):
+    """Time a function and measure its peak RSS
+
+    Args:
+        setup (callable): Returns the arguments of `run`, called before each run
+            and not measured
+        run (callable): The measured function
+        repeat (int): The number of runs
+
+    Returns:
+        dict : The best and median wall times (s) and the median peak RSS delta
+            (bytes)
+    """
+    times = []
+    peaks = []
+    for _ in range(repeat):
+        args = setup()
+        with PeakRss() as rss:
+            start = time.perf_counter()
+            run(*args)
+            times.append(time.perf_counter() - start)
+        peaks.append(rss.delta)
+    return {
+        "time": min(times),
+        "median_time": statistics.median(times),
+        "peak_rss": int(statistics.median(peaks)),
+    }
+
+
+def measure_sessions(setup, load, sessions: int = DEFAULT_SESSIONS):
+    """Time the opening of sessions of the app and measure the memory each adds
+
+    The first session fills the caches; the next ones keep what `load` returns, as
+    the pages keep the recipes in their session state. The memory is the one
+    allocated by Python and numpy (traced by tracemalloc) and by Arrow: unlike the
+    RSS, it does not depend on the memory freed by the first session and reused
+    by the next ones.
+
+    Args:
+        setup (callable): Empties the caches, called once and not measured
+        load (callable): Returns the data kept by a session
+        sessions (int): The number of additional sessions
+
+    Returns:
+        dict : The best and median wall times of a session (s) and the memory
+            added by each additional session (bytes), as "peak_rss" to be
+            compared like the other benchmarks
+    """
+    setup()
+    load()
+    times = []
+    for _ in range(sessions):
+        begin = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - begin)
+
+    gc.collect()
+    tracemalloc.start()
+    arrow_start = pa.total_allocated_bytes()
+    held = [load() for _ in range(sessions)]
+    added = tracemalloc.get_traced_memory()[0] + (
+        pa.total_allocated_bytes() - arrow_start
+    )
+    tracemalloc.stop()
+    del held
+    return {
+        "time": min(times),
+        "median_time": statistics.median(times),
+        "peak_rss": added // sessions,
+    }
+
+
+def benchmark_preprocess(directory: str, repeat: int):
+    """Run `preprocess` on a dump and measure each of its stages
+
+    Args:
+        directory (str): The directory of the dump, where the clean dataset is
+            written
+        repeat (int): The number of runs
+
+    Returns:
+        dict : The measures of each stage, by "preprocess.<stage>"
+    """
+    profile_path = os.path.join(directory, "profile.json")
+    runs = {}
+    # The pipeline reads and writes its files in PATH_DATA
+    path_data = pipeline_preprocess.PATH_DATA
+    pipeline_preprocess.PATH_DATA = directory + os.sep
+    try:
+        for _ in range(repeat):
+            pipeline_preprocess.preprocess(profile_path=profile_path)
+            with open(profile_path, encoding="utf-8") as file:
+                for record in json.load(file)["stages"]:
+                    runs.setdefault(record["stage"], []).append(record)
+    finally:
+        pipeline_preprocess.PATH_DATA = path_data
+    return {
+        f"preprocess.{stage}": {
+            "time": min(record["wall_time"] for record in records),
+            "median_time": statistics.median(record["wall_time"] for record in records),
+            "peak_rss": int(statistics.median(r["peak_rss_delta"] for r in records)),
+        }
+        for stage, records in runs.items()
+    }
+
+
+def app_benchmarks(directory: str):
+    """The benchmarks of the app functions on the clean dataset of a dump
+
+    Args:
+        directory (str): The directory of the dump and of its clean dataset
+
+    Returns:
+        dict : (setup, run) of each benchmark, by name
+    """
+    # Imported here: the app modules start streamlit
+    from utils.load_functions import load_df, initialize_recipes_df, compute_trend
+    from utils.lazy_dataset import LazyRecipes
+    from utils.score_functions import (
+        mean_score,
+        nb_reviews,
+        global_mean_score,
+        bayesian_average,
+    )
+    from utils.univariate_study import UnivariateStudy
+    from utils.bivariate_study import BivariateStudy
+
+    clean_path = os.path.join(directory, pipeline_preprocess.PROCESSED_DATA)
+    df = load_df(clean_path)
+    interactions = pd.read_csv(
+        os.path.join(directory, pipeline_preprocess.RAW_INTERACTIONS),
+        usecols=["recipe_id", "rating"],
+    )
+    scored = interactions["recipe_id"].drop_duplicates().head(SCORED_RECIPES).tolist()
+    minutes = pipeline_preprocess.CLEAN_COLUMNS["minutes"]
+    calories = pipeline_preprocess.CLEAN_COLUMNS["calories"]
+    submitted = pipeline_preprocess.CLEAN_COLUMNS["submitted"]
+    ingredients = pipeline_preprocess.CLEAN_COLUMNS["ingredients_replaced"]
+
+    def no_setup():
+        return ()
+
+    def cold_initialize():
+        initialize_recipes_df.clear()
+        return (clean_path,)
+
+    def scores():
+        c = global_mean_score(interactions)
+        return [
+            bayesian_average(
+                mean_score(recipe_id, interactions),
+                nb_reviews(recipe_id, interactions),
+                c,
+            )
+            for recipe_id in scored
+        ]
+
+    def univariate():
+        study = UnivariateStudy("benchmark", df, "bar_ingredients")
+        return study, df, ingredients, 20, [minutes], [(0, df[minutes].max())]
+
+    def bivariate():
+        study = BivariateStudy("benchmark", df, "scatter")
+        ranges = [(df[axis].min(), df[axis].max()) for axis in [minutes, calories]]
+        return study, df, minutes, calories, ranges[0], ranges[1], [], []
+
+    benchmarks = {
+        # Parse of the CSV, then read of the snapshot written by the first load
+        "load_df": (lambda: (clean_path,), lambda path: load_df(path, snapshot=False)),
+        "load_df.snapshot": (lambda: (clean_path,), load_df),
+        "initialize_recipes_df": (cold_initialize, initialize_recipes_df),
+        # First access to one column of the lazy dataset, as the map page does
+        "LazyRecipes.column": (
+            lambda: (LazyRecipes(clean_path), submitted),
+            LazyRecipes.column,
+        ),
+        # Monthly counts of the frame, the decomposition is cached after the first run
+        "compute_trend": (lambda: (df,), compute_trend),
+        "score_functions": (no_setup, scores),
+        "UnivariateStudy.get_data_points_ingredients": (
+            univariate,
+            lambda study, *args: study.get_data_points_ingredients(*args),
+        ),
+        "BivariateStudy.get_data_points": (
+            bivariate,
+            lambda study, *args: study.get_data_points(*args),
+        ),
+    }
+    if os.path.exists(GEOJSON):
+        benchmarks["generate_random_points"] = random_points_benchmark(df, submitted)
+    return benchmarks
+
+
+def session_benchmarks(directory: str):
+    """The benchmarks of the memory of a session on the clean dataset of a dump
+
+    Args:
+        directory (str): The directory of the dump and of its clean dataset
+
+    Returns:
+        dict : (setup, load) of each benchmark, by name
+    """
+    from utils.load_functions import initialize_recipes_df
+    from utils.lazy_dataset import lazy_recipes, start_prefetch
+
+    clean_path = os.path.join(directory, pipeline_preprocess.PROCESSED_DATA)
+
+    def clear_caches():
+        initialize_recipes_df.clear()
+        start_prefetch.clear()
+
+    return {
+        # A copy of the cached DataFrame per session
+        "session.initialize_recipes_df": (
+            clear_caches,
+            lambda: initialize_recipes_df(clean_path),
+        ),
+        # The process-wide lazy dataset the pages share
+        "session.lazy_recipes": (clear_caches, lambda: lazy_recipes(clean_path)),
+    }
+
+
+def random_points_benchmark(df: pd.DataFrame, submitted: str):
+    """(setup, run) of the benchmark of the map page
+
+    Args:
+        df (pd.DataFrame): The clean dataset
+        submitted (str): The column of the publication dates
+
+    Returns:
+        tuple : setup, run
+    """
+    from pages.Simulation_Carte import load_geojson, generate_random_points
+
+    gdf = load_geojson(GEOJSON)
+    per_year = (
+        df[submitted].dt.year.value_counts().sort_index().rename_axis("année")
+    ).reset_index(name="nombre_recettes")
+
+    def setup():
+        generate_random_points.clear()
+        np.random.seed(0)
+        return per_year, gdf
+
+    return setup, generate_random_points
+
+
+def run_scale(scale: float, repeat: int, profile: SampleProfile, seed: int = 0):
+    """Generate a dump and run all the benchmarks on it
+
+    Args:
+        scale (float): The size of the dump relative to the real one
+        repeat (int): The number of runs of each benchmark
+        profile (SampleProfile): The distributions of the generated data
+        seed (int): Seed of the generated data
+
+    Returns:
+        dict : The measures of each benchmark, by name
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Scale {scale}: generating the data")
+        generate(directory, scale, seed, profile=profile)
+        print(f"Scale {scale}: preprocess")
+        results = benchmark_preprocess(directory, repeat)
+        for name, (setup, run) in app_benchmarks(directory).items():
+            print(f"Scale {scale}: {name}")
+            results[name] = measure(setup, run, repeat)
+        for name, (setup, load) in session_benchmarks(directory).items():
+            print(f"Scale {scale}: {name}")
+            results[name] = measure_sessions(setup, load)
+    return results
+
+
+def run_suite(scales: list, repeat: int = DEFAULT_REPEAT, seed: int = 0):
+    """Run the benchmarks at several scales
+
+    Args:
+        scales (list): The sizes of the dumps relative to the real one
+        repeat (int): The number of runs of each benchmark
+        seed (int): Seed of the generated data
+
+    Returns:
+        dict : The environment and the measures, by scale then benchmark
+    """
+    profile = SampleProfile.from_samples()
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "repeat": repeat,
+        "results": {
+            str(scale): run_scale(scale, repeat, profile, seed) for scale in scales
+        },
+    }
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    memory_threshold: float = DEFAULT_MEMORY_THRESHOLD,
+):
+    """Compare two runs of the suite
+
+    Args:
+        baseline (dict): The reference run
+        current (dict): The new run
+        threshold (float): Relative slowdown of the best time reported as a
+            regression
+        memory_threshold (float): Relative growth of the peak RSS reported as a
+            regression
+
+    Returns:
+        list : One row per benchmark of both runs: scale, name, baseline and
+            current time and peak RSS, and the regressions found ("time",
+            "memory")
+    """
+    rows = []
+    for scale, results in current["results"].items():
+        for name, result in results.items():
+            reference = baseline["results"].get(scale, {}).get(name)
+            if reference is None:
+                continue
+            regressions = []
+            time_delta = result["time"] - reference["time"]
+            if (
+                time_delta > MIN_TIME_DELTA
+                and result["time"] > reference["time"] * (1 + threshold)
+            ):
+                regressions.append("time")
+            memory_delta = result["peak_rss"] - reference["peak_rss"]
+            if memory_delta > MIN_MEMORY_DELTA and result["peak_rss"] > reference[
+                "peak_rss"
+            ] * (1 + memory_threshold):
+                regressions.append("memory")
+            rows.append(
+                {
+                    "scale": scale,
+                    "name": name,
+                    "baseline_time": reference["time"],
+                    "time": result["time"],
+                    "baseline_peak_rss": reference["peak_rss"],
+                    "peak_rss": result["peak_rss"],
+                    "regressions": regressions,
+                }
+            )
+    return rows
+
+
+def format_comparison(rows: list):
+    """The comparison as a text table
+
+    Args:
+        rows (list): The rows returned by `compare`
+
+    Returns:
+        str : The table
+    """
+    lines = [
+        f"{'scale':<7}{'benchmark':<46}{'time (s)':>20}{'peak RSS (MB)':>20}  status"
+    ]
+    for row in rows:
+        times = f"{row['baseline_time']:.3f} -> {row['time']:.3f}"
+        memory = (
+            f"{row['baseline_peak_rss'] / 2**20:.1f} -> {row['peak_rss'] / 2**20:.1f}"
+        )
+        status = ", ".join(f"{kind} regression" for kind in row["regressions"]) or "ok"
+        lines.append(
+            f"{row['scale']:<7}{row['name']:<46}{times:>20}{memory:>20}  {status}"
+        )
+    return "\n".join(lines)
+
+
+def load_results(path: str):
+    """Read a JSON file written by `run`
+
+    Args:
+        path (str): The path of the file
+
+    Returns:
+        dict : The run
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def report_comparison(baseline_path: str, current: dict, threshold, memory_threshold):
+    """Print the comparison of a run with a baseline file
+
+    Returns:
+        int : The exit status, 1 if there is a regression
+    """
+    rows = compare(load_results(baseline_path), current, threshold, memory_threshold)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row["regressions"]]
+    print(f"{len(regressions)} regression(s) over {len(rows)} benchmarks")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    thresholds = argparse.ArgumentParser(add_help=False)
+    thresholds.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown reported as a regression",
+    )
+    thresholds.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=DEFAULT_MEMORY_THRESHOLD,
+        help="relative growth of the peak RSS reported as a regression",
+    )
+
+    run = subparsers.add_parser("run", parents=[thresholds], help="run the benchmarks")
+    run.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES)
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "current.json"))
+    run.add_argument("--compare", metavar="BASELINE", help="baseline to compare with")
+
+    compare_parser = subparsers.add_parser(
+        "compare", parents=[thresholds], help="compare two runs"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return report_comparison(
+            args.baseline,
+            load_results(args.current),
+            args.threshold,
+            args.memory_threshold,
+        )
+
+    results = run_suite(args.scales, args.repeat, args.seed)
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare is not None:
+        return report_comparison(
+            args.compare, results, args.threshold, args.memory_threshold
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+DuckDB execution backend of the relational stages of the preprocessing pipeline.
+
+The interactions are aggregated by recipe directly from their CSV (or Parquet)
+file, and the joins with the recipes and the outlier filters are run as DuckDB
+queries, on all the cores and spilling to disk above the memory limit. The list
+columns of the recipes never go through DuckDB: the queries only return the
+positions of the rows to keep, which are then taken from the pandas DataFrames, so
+the results are the same as the pandas path.
+"""
+
+import os
+import tempfile
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+# Values read as missing by pandas.read_csv, so that both paths see the same reviews
+PANDAS_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+INTERACTIONS_TYPES = {"review": "VARCHAR", "date": "DATE"}
+
+
+def connect(memory_limit_mb: float = None, threads: int = None, tmp_dir: str = None):
+    """
+    Open an in-memory DuckDB database.
+
+    :param memory_limit_mb: memory ceiling of the queries in MB, above it they spill
+        to disk, the DuckDB default (80% of the RAM) by default
+    :type memory_limit_mb: float
+    :param threads: the number of threads, one per core by default
+    :type threads: int
+    :param tmp_dir: directory of the spilled data, a temporary one by default
+    :type tmp_dir: str
+    :rtype: duckdb.DuckDBPyConnection
+    """
+    # The positions of the rows rely on the scans keeping the order of the files
+    config = {"preserve_insertion_order": True}
+    if memory_limit_mb is not None:
+        config["memory_limit"] = f"{memory_limit_mb}MB"
+    if threads is not None:
+        config["threads"] = threads
+    config["temp_directory"] = tmp_dir or os.path.join(
+        tempfile.gettempdir(), "duckdb_preprocess"
+    )
+    return duckdb.connect(config=config)
+
+
+def interactions_source(path: str):
+    """
+    The table function reading the interactions file, as SQL.
+
+    :param path: the path of the interactions, a CSV or Parquet file
+    :type path: str
+    :rtype: str
+    """
+    quoted = "'" + path.replace("'", "''") + "'"
+    if path.endswith(".parquet"):
+        return f"read_parquet({quoted})"
+    na_values = ", ".join("'" + value + "'" for value in PANDAS_NA_VALUES)
+    types = ", ".join(f"'{name}': '{kind}'" for name, kind in INTERACTIONS_TYPES.items())
+    return (
+        f"read_csv({quoted}, header = true, nullstr = [{na_values}], "
+        f"types = {{{types}}})"
+    )
+
+
+def number_interactions(connection, path: str):
+    """
+    The interactions with the position of each row in its file, in a `file_row`
+    column, as SQL.
+
+    Parquet files give the position of the rows themselves. A CSV file is read once
+    by a single thread into a temporary table: the threads of a parallel scan each
+    read a part of the file, and `row_number() OVER ()` would not follow its order.
+
+    :param connection: the database
+    :type connection: duckdb.DuckDBPyConnection
+    :param path: the path of the interactions, a CSV or Parquet file
+    :type path: str
+    :rtype: str
+    """
+    if path.endswith(".parquet"):
+        quoted = "'" + path.replace("'", "''") + "'"
+        return (
+            "(SELECT file_row_number AS file_row, * EXCLUDE (file_row_number) "
+            f"FROM read_parquet({quoted}, file_row_number = true))"
+        )
+    threads = connection.execute("SELECT current_setting('threads')").fetchone()[0]
+    connection.execute("SET threads = 1")
+    try:
+        connection.execute(
+            "CREATE TEMPORARY TABLE numbered_interactions AS "
+            f"SELECT row_number() OVER () AS file_row, * FROM {interactions_source(path)}"
+        )
+    finally:
+        connection.execute(f"SET threads = {threads}")
+    return "numbered_interactions"
+
+
+def register_positions(connection, name: str, data: pd.DataFrame, columns: list):
+    """
+    Register some columns of a DataFrame as a DuckDB view, with the position of each
+    row in a `position` column.
+
+    :param connection: the database
+    :type connection: duckdb.DuckDBPyConnection
+    :param name: the name of the view
+    :type name: str
+    :param data: the DataFrame
+    :type data: pd.DataFrame
+    :param columns: the columns the queries use, without list columns
+    :type columns: list
+    """
+    # np.asarray gives the values of the categorical columns
+    view = pd.DataFrame({column: np.asarray(data[column]) for column in columns})
+    view.insert(0, "position", np.arange(len(data), dtype=np.int64))
+    connection.register(name, view)
+
+
+def list_column(values, missing=None):
+    """
+    Convert an Arrow list column to Python lists.
+
+    :param values: the column
+    :type values: pyarrow.ChunkedArray
+    :param missing: the value replacing the missing elements, as pandas reads them
+    :return: one Python list per row
+    :rtype: list
+    """
+    lists = values.to_pylist()
+    if missing is None:
+        return lists
+    return [[missing if v is None else v for v in items] for items in lists]
+
+
+def groupby_duckdb(
+    raw_recipe_data: pd.DataFrame,
+    pp_recipes_data: pd.DataFrame,
+    interactions_path: str,
+    first_columns: list,
+    list_columns: list,
+    memory_limit_mb: float = None,
+    threads: int = None,
+):
+    """
+    DuckDB equivalent of merging the recipes with the interactions then grouping them
+    by recipe_id.
+
+    The interactions are read and aggregated as lists by DuckDB, in the order of the
+    file (see `number_interactions`), and joined to the ids of both recipe tables. The recipe columns are then
+    taken from the first matching row of each table.
+
+    :param raw_recipe_data: RAW_recipes, lists and dates already parsed
+    :type raw_recipe_data: pd.DataFrame
+    :param pp_recipes_data: PP_recipes, lists already parsed
+    :type pp_recipes_data: pd.DataFrame
+    :param interactions_path: the path of RAW_interactions
+    :type interactions_path: str
+    :param first_columns: the columns taken from the recipes
+    :type first_columns: list
+    :param list_columns: the columns of the interactions aggregated as lists
+    :type list_columns: list
+    :param memory_limit_mb: memory ceiling of the queries in MB
+    :type memory_limit_mb: float
+    :param threads: the number of threads, one per core by default
+    :type threads: int
+    :return: one row per recipe_id, sorted by recipe_id
+    :rtype: pd.DataFrame
+    """
+    lists = ", ".join(
+        f"list({column} ORDER BY file_row) AS {column}" for column in list_columns
+    )
+    connection = connect(memory_limit_mb, threads)
+    try:
+        register_positions(connection, "raw_recipe", raw_recipe_data, ["id"])
+        register_positions(connection, "pp_recipes", pp_recipes_data, ["id"])
+        interactions = number_interactions(connection, interactions_path)
+        query = f"""
+            WITH interactions AS (
+                SELECT recipe_id, {lists}
+                FROM {interactions}
+                WHERE recipe_id IS NOT NULL
+                GROUP BY recipe_id
+            ),
+            raw AS (SELECT id, min(position) AS position FROM raw_recipe GROUP BY id),
+            pp AS (SELECT id, min(position) AS position FROM pp_recipes GROUP BY id)
+            SELECT
+                interactions.recipe_id AS recipe_id,
+                raw.position AS raw_position,
+                pp.position AS pp_position,
+                {", ".join("interactions." + column for column in list_columns)}
+            FROM interactions
+            JOIN raw ON raw.id = interactions.recipe_id
+            JOIN pp ON pp.id = interactions.recipe_id
+            ORDER BY interactions.recipe_id
+        """
+        table = connection.execute(query).fetch_arrow_table()
+    finally:
+        connection.close()
+
+    raw_position = table.column("raw_position").to_numpy()
+    pp_position = table.column("pp_position").to_numpy()
+    df = pd.DataFrame({"recipe_id": table.column("recipe_id").to_numpy()})
+    for column in first_columns:
+        if column in pp_recipes_data.columns:
+            values = pp_recipes_data[column].iloc[pp_position]
+        else:
+            values = raw_recipe_data[column].iloc[raw_position]
+        df[column] = values.reset_index(drop=True)
+    for column in list_columns:
+        df[column] = list_column(table.column(column), missing=np.nan)
+    return df
+
+
+def filter_rows(data: pd.DataFrame, columns: list, condition: str):
+    """
+    Keep the rows of a DataFrame matching a SQL condition on some of its columns.
+
+    :param data: the DataFrame
+    :type data: pd.DataFrame
+    :param columns: the columns used by the condition, without list columns
+    :type columns: list
+    :param condition: the SQL condition, on the columns of `data` and on `position`,
+        the position of the row
+    :type condition: str
+    :return: the kept rows, in their order, with their index
+    :rtype: pd.DataFrame
+    """
+    connection = connect()
+    try:
+        register_positions(connection, "data", data, columns)
+        positions = connection.execute(
+            f"SELECT position FROM data WHERE {condition} ORDER BY position"
+        ).fetchnumpy()["position"]
+    finally:
+        connection.close()
+    return data.iloc[np.asarray(positions, dtype=np.int64)]
+
+
+def delete_outliers_minutes_duckdb(data: pd.DataFrame, outlier_ids: list = None):
+    """
+    DuckDB equivalent of `delete_outliers_minutes`: drop the troll recipes (the two
+    largest minutes, the first ones on ties, or `outlier_ids`) and the recipes
+    without minutes.
+
+    :param data: the recipes
+    :type data: pd.DataFrame
+    :param outlier_ids: recipe_id of the troll recipes, when they were computed on a
+        larger dataset
+    :type outlier_ids: list
+    :return: the kept recipes
+    :rtype: pd.DataFrame
+    """
+    if outlier_ids is None:
+        trolls = """position NOT IN (
+            SELECT position FROM data WHERE minutes IS NOT NULL
+            ORDER BY minutes DESC, position LIMIT 2
+        )"""
+    else:
+        ids = ", ".join(str(int(recipe_id)) for recipe_id in outlier_ids)
+        trolls = f"recipe_id NOT IN ({ids})" if ids else "TRUE"
+    # Like `!=` in pandas, a missing value is different from 0
+    return filter_rows(
+        data, ["recipe_id", "minutes"], trolls + " AND minutes IS DISTINCT FROM 0"
+    )
+
+
+def delete_outliers_steps_duckdb(data: pd.DataFrame):
+    """
+    DuckDB equivalent of `delete_outliers_steps`: drop the recipes without steps.
+
+    :param data: the recipes
+    :type data: pd.DataFrame
+    :return: the kept recipes
+    :rtype: pd.DataFrame
+    """
+    return filter_rows(data, ["n_steps"], "n_steps IS DISTINCT FROM 0")
+
+
+def delete_outliers_calories_duckdb(data: pd.DataFrame):
+    """
+    DuckDB equivalent of `delete_outliers_calories`: drop the recipes over 20000
+    calories or without calories.
+
+    :param data: the recipes
+    :type data: pd.DataFrame
+    :return: the kept recipes
+    :rtype: pd.DataFrame
+    """
+    return filter_rows(data, ["calories"], "calories < 20000 AND calories > 0")
@@ -0,0 +1,482 @@
+"""
+Generator of a synthetic Food.com dump (RAW_recipes, RAW_interactions, PP_recipes
+and ingredients.csv) for load tests and benchmarks.
+
+The marginal distributions are learned from the samples shipped in data/: tags,
+ingredients, names, descriptions, steps and reviews (vocabularies and list
+lengths), minutes, nutrition, ratings and the date ranges. The files are written
+chunk by chunk, so the memory used does not grow with the scale.
+
+Usage (from the root of the project):
+    python scripts/generate_synthetic_data.py --scale 10 --output data/synthetic
+"""
+
+import os
+import sys
+import argparse
+import itertools
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from utils.list_parser import parse_list_column
+from utils.techniques import TECHNIQUES_LIST
+
+PATH_DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+RECIPES_SAMPLE = "RAW_recipes_sample.csv"
+INTERACTIONS_SAMPLE = "RAW_interactions_sample.csv"
+
+# Size of the real Food.com dump, the unit of the scale factor
+REAL_RECIPES = 231_637
+REAL_INTERACTIONS = 1_132_367
+REAL_USERS = 226_570
+REAL_CONTRIBUTORS = 27_926
+DEFAULT_CHUNK_RECIPES = 10_000
+# Skew of the user / contributor activity: index = pool size * uniform ** SKEW
+ACTIVITY_SKEW = 3
+# Items drawn per distinct item wanted in the lists without duplicates
+UNIQUE_OVERSAMPLING = 4
+# Skew of the delay between the publication of a recipe and its reviews
+REVIEW_DELAY_SKEW = 3
+
+RECIPE_COLUMNS = [
+    "name",
+    "id",
+    "minutes",
+    "contributor_id",
+    "submitted",
+    "tags",
+    "nutrition",
+    "n_steps",
+    "steps",
+    "description",
+    "ingredients",
+    "n_ingredients",
+]
+INTERACTION_COLUMNS = ["user_id", "recipe_id", "date", "rating", "review"]
+PP_COLUMNS = [
+    "id",
+    "i",
+    "name_tokens",
+    "ingredient_tokens",
+    "steps_tokens",
+    "techniques",
+    "calorie_level",
+    "ingredient_ids",
+]
+
+
+def frequencies(items):
+    """Vocabulary of some items and the frequency of each one
+
+    Args:
+        items (iterable): The items, with repetitions
+
+    Returns:
+        vocabulary, probabilities : The distinct items (object array) and their
+            frequencies
+    """
+    counts = Counter(items)
+    vocabulary = np.array(list(counts), dtype=object)
+    probabilities = np.array(list(counts.values()), dtype=np.float64)
+    return vocabulary, probabilities / probabilities.sum()
+
+
+def words(texts):
+    """The words of some texts, in order
+
+    Args:
+        texts (iterable): The texts
+
+    Returns:
+        list : The words
+    """
+    return [word for text in texts for word in str(text).split()]
+
+
+class SampleProfile:
+    """
+    Marginal distributions of the Food.com samples used to generate new data.
+
+    Empirical distributions (minutes, list lengths, nutrition, ...) are resampled
+    with replacement; vocabularies are sampled with the frequencies of the words.
+    """
+
+    def __init__(self, recipes: pd.DataFrame, interactions: pd.DataFrame):
+        tags = parse_list_column(recipes["tags"])
+        steps = parse_list_column(recipes["steps"])
+        ingredients = parse_list_column(recipes["ingredients"])
+        descriptions = recipes["description"].dropna().astype(str)
+
+        self.tags, self.tags_p = frequencies(itertools.chain.from_iterable(tags))
+        self.tag_counts = tags.map(len).to_numpy()
+        self.ingredients, self.ingredients_p = frequencies(
+            itertools.chain.from_iterable(ingredients)
+        )
+        self.ingredient_counts = np.maximum(ingredients.map(len).to_numpy(), 1)
+        self.steps = np.array(list(itertools.chain.from_iterable(steps)), dtype=object)
+        self.step_counts = steps.map(len).to_numpy()
+        self.name_words, self.name_words_p = frequencies(words(recipes["name"]))
+        self.name_lengths = np.maximum(
+            recipes["name"].astype(str).str.split().map(len).to_numpy(), 1
+        )
+        self.description_words, self.description_words_p = frequencies(
+            words(descriptions)
+        )
+        self.description_lengths = np.maximum(descriptions.str.split().map(len), 1)
+        self.description_missing = recipes["description"].isna().mean()
+        self.minutes = recipes["minutes"].to_numpy()
+        self.nutrition = recipes["nutrition"].to_numpy(dtype=object)
+        calories = np.array([float(text[1:].split(",")[0]) for text in self.nutrition])
+        # PP_recipes splits the recipes in three calorie levels
+        self.calorie_levels = np.quantile(calories, [1 / 3, 2 / 3])
+        self.submitted = pd.to_datetime(recipes["submitted"]).to_numpy("datetime64[D]")
+        interaction_dates = pd.to_datetime(interactions["date"]).to_numpy("datetime64[D]")
+        self.last_date = max(interaction_dates.max(), self.submitted.max())
+        self.ratings, self.ratings_p = frequencies(interactions["rating"])
+        self.review_words, self.review_words_p = frequencies(
+            words(interactions["review"])
+        )
+        self.review_lengths = np.maximum(
+            interactions["review"].astype(str).str.split().map(len).to_numpy(), 1
+        )
+        self.interactions_per_recipe = REAL_INTERACTIONS / REAL_RECIPES
+
+    @classmethod
+    def from_samples(cls, path: str = PATH_DATA):
+        """Learn the distributions of the samples of a data directory
+
+        Args:
+            path (str): The directory of RAW_recipes_sample.csv and
+                RAW_interactions_sample.csv
+
+        Returns:
+            SampleProfile : The distributions
+        """
+        return cls(
+            pd.read_csv(os.path.join(path, RECIPES_SAMPLE)),
+            pd.read_csv(os.path.join(path, INTERACTIONS_SAMPLE)),
+        )
+
+
+def sample_lists(rng, vocabulary, probabilities, lengths, unique=False):
+    """Draw lists of items from a vocabulary, all the items at once
+
+    Args:
+        rng (np.random.Generator): The random generator
+        vocabulary (np.ndarray): The items
+        probabilities (np.ndarray): The frequency of each item
+        lengths (np.ndarray): The length of each list
+        unique (bool): Draw distinct items in each list: more items are drawn and
+            the duplicates skipped, i.e. weighted sampling without replacement
+
+    Returns:
+        list : The lists of items
+    """
+    drawn = lengths * UNIQUE_OVERSAMPLING if unique else lengths
+    items = vocabulary[rng.choice(len(vocabulary), drawn.sum(), p=probabilities)]
+    items = items.tolist()
+    offsets = np.concatenate(([0], np.cumsum(drawn)))
+    lists = [items[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    if unique:
+        lists = [
+            list(dict.fromkeys(items))[:length] for items, length in zip(lists, lengths)
+        ]
+    return lists
+
+
+def sample_texts(rng, vocabulary, probabilities, lengths):
+    """Draw texts made of words of a vocabulary
+
+    Args:
+        rng (np.random.Generator): The random generator
+        vocabulary (np.ndarray): The words
+        probabilities (np.ndarray): The frequency of each word
+        lengths (np.ndarray): The number of words of each text
+
+    Returns:
+        list : The texts
+    """
+    lists = sample_lists(rng, vocabulary, probabilities, lengths)
+    return [" ".join(text) for text in lists]
+
+
+def skewed_index(rng, pool_size: int, size: int):
+    """Draw indices in a pool, the first ones being much more frequent (a few very
+    active users or contributors)
+
+    Args:
+        rng (np.random.Generator): The random generator
+        pool_size (int): The size of the pool
+        size (int): The number of indices
+
+    Returns:
+        np.ndarray : The indices
+    """
+    return (pool_size * rng.random(size) ** ACTIVITY_SKEW).astype(np.int64)
+
+
+def token_ids(text: str, vocabulary: dict):
+    """Token ids of the words of a text, new words getting the next ids
+
+    Args:
+        text (str): The text
+        vocabulary (dict): The id of each word, updated with the new words
+
+    Returns:
+        list : The ids
+    """
+    return [vocabulary.setdefault(word, len(vocabulary)) for word in text.split()]
+
+
+def generate_recipes(
+    profile, rng, ids, first_index, scale, ingredient_ids, token_vocabulary
+):
+    """Generate a chunk of RAW_recipes and the matching rows of PP_recipes
+
+    Args:
+        profile (SampleProfile): The distributions
+        rng (np.random.Generator): The random generator
+        ids (np.ndarray): The id of the recipes of the chunk
+        first_index (int): The row of the first recipe of the chunk in PP_recipes
+        scale (float): The scale factor, for the number of contributors
+        ingredient_ids (dict): The id of each ingredient in ingredients.csv
+        token_vocabulary (dict): The token id of each word, for PP_recipes
+
+    Returns:
+        recipes, pp_recipes : The two tables, lists written as in the real files
+    """
+    n = len(ids)
+    tags = sample_lists(
+        rng, profile.tags, profile.tags_p, rng.choice(profile.tag_counts, n), unique=True
+    )
+    ingredients = sample_lists(
+        rng,
+        profile.ingredients,
+        profile.ingredients_p,
+        rng.choice(profile.ingredient_counts, n),
+        unique=True,
+    )
+    step_counts = rng.choice(profile.step_counts, n)
+    steps = [
+        profile.steps[rng.integers(0, len(profile.steps), count)].tolist()
+        for count in step_counts
+    ]
+    names = sample_texts(
+        rng, profile.name_words, profile.name_words_p, rng.choice(profile.name_lengths, n)
+    )
+    descriptions = np.array(
+        sample_texts(
+            rng,
+            profile.description_words,
+            profile.description_words_p,
+            rng.choice(profile.description_lengths, n),
+        ),
+        dtype=object,
+    )
+    descriptions[rng.random(n) < profile.description_missing] = None
+    nutrition = rng.choice(profile.nutrition, n)
+    contributors = max(1, round(scale * REAL_CONTRIBUTORS))
+    recipes = pd.DataFrame(
+        {
+            "name": names,
+            "id": ids,
+            "minutes": rng.choice(profile.minutes, n),
+            "contributor_id": skewed_index(rng, contributors, n) + 1,
+            "submitted": rng.choice(profile.submitted, n),
+            "tags": [str(items) for items in tags],
+            "nutrition": nutrition,
+            "n_steps": step_counts,
+            "steps": [str(items) for items in steps],
+            "description": descriptions,
+            "ingredients": [str(items) for items in ingredients],
+            "n_ingredients": [len(items) for items in ingredients],
+        },
+        columns=RECIPE_COLUMNS,
+    )
+
+    steps_texts = [" ".join(items) for items in steps]
+    # Techniques of PP_recipes: the techniques named in the steps
+    techniques = [
+        str([int(technique in text) for technique in TECHNIQUES_LIST])
+        for text in steps_texts
+    ]
+    calories = np.array([float(text[1:].split(",")[0]) for text in nutrition])
+    pp_recipes = pd.DataFrame(
+        {
+            "id": ids,
+            "i": np.arange(first_index, first_index + n),
+            "name_tokens": [str(token_ids(name, token_vocabulary)) for name in names],
+            "ingredient_tokens": [
+                str([token_ids(item, token_vocabulary) for item in items])
+                for items in ingredients
+            ],
+            "steps_tokens": [
+                str(token_ids(text, token_vocabulary)) for text in steps_texts
+            ],
+            "techniques": techniques,
+            "calorie_level": np.searchsorted(profile.calorie_levels, calories),
+            "ingredient_ids": [
+                str([ingredient_ids[item] for item in items]) for items in ingredients
+            ],
+        },
+        columns=PP_COLUMNS,
+    )
+    return recipes, pp_recipes
+
+
+def generate_interactions(profile, rng, recipes, scale):
+    """Generate the interactions of a chunk of recipes
+
+    Args:
+        profile (SampleProfile): The distributions
+        rng (np.random.Generator): The random generator
+        recipes (pd.DataFrame): The recipes of the chunk
+        scale (float): The scale factor, for the number of users
+
+    Returns:
+        interactions : The RAW_interactions rows of the recipes
+    """
+    # Number of reviews per recipe: geometric, most recipes have one review
+    counts = rng.geometric(1 / profile.interactions_per_recipe, len(recipes))
+    n = counts.sum()
+    submitted = np.repeat(recipes["submitted"].to_numpy("datetime64[D]"), counts)
+    span = (profile.last_date - submitted).astype(np.int64)
+    delays = (span * rng.random(n) ** REVIEW_DELAY_SKEW).astype(np.int64)
+    users = max(1, round(scale * REAL_USERS))
+    return pd.DataFrame(
+        {
+            "user_id": skewed_index(rng, users, n) + 1,
+            "recipe_id": np.repeat(recipes["id"].to_numpy(), counts),
+            "date": submitted + delays.astype("timedelta64[D]"),
+            "rating": rng.choice(profile.ratings, n, p=profile.ratings_p),
+            "review": sample_texts(
+                rng,
+                profile.review_words,
+                profile.review_words_p,
+                rng.choice(profile.review_lengths, n),
+            ),
+        },
+        columns=INTERACTION_COLUMNS,
+    )
+
+
+def ingredients_table(profile, ingredient_ids):
+    """The ingredients.csv table of the generated ingredients, each one mapped to
+    itself
+
+    Args:
+        profile (SampleProfile): The distributions
+        ingredient_ids (dict): The id of each ingredient
+
+    Returns:
+        df : The table, with the columns of the real ingredients.csv
+    """
+    names = list(ingredient_ids)
+    return pd.DataFrame(
+        {
+            "raw_ingr": names,
+            "raw_words": [len(name.split()) for name in names],
+            "processed": names,
+            "len_proc": [len(name) for name in names],
+            "replaced": names,
+            "count": np.round(
+                profile.ingredients_p * REAL_RECIPES * profile.ingredient_counts.mean()
+            ).astype(np.int64),
+            "id": list(ingredient_ids.values()),
+        }
+    )
+
+
+def generate(
+    output: str,
+    scale: float = 1.0,
+    seed: int = 0,
+    chunk_recipes: int = DEFAULT_CHUNK_RECIPES,
+    profile: SampleProfile = None,
+):
+    """Write a synthetic dump, `scale` times the size of the real Food.com dump
+
+    Args:
+        output (str): The directory of the generated files
+        scale (float): The number of recipes relative to the real dump
+        seed (int): Seed of the random generator
+        chunk_recipes (int): The number of recipes generated and written at once
+        profile (SampleProfile): The distributions, learned from data/ by default
+
+    Returns:
+        n_recipes, n_interactions : The number of rows written
+    """
+    if scale <= 0:
+        raise ValueError("scale must be strictly positive.")
+    if chunk_recipes <= 0:
+        raise ValueError("chunk_recipes must be strictly positive.")
+    profile = profile or SampleProfile.from_samples()
+    rng = np.random.default_rng(seed)
+    os.makedirs(output, exist_ok=True)
+    n_recipes = max(1, round(scale * REAL_RECIPES))
+    ingredient_ids = {name: i for i, name in enumerate(profile.ingredients)}
+    token_vocabulary = {}
+    # Distinct, increasing recipe ids with gaps, as in the real dump
+    next_id = 38
+    n_interactions = 0
+    paths = {
+        name: os.path.join(output, name)
+        for name in ["RAW_recipes.csv", "RAW_interactions.csv", "PP_recipes.csv"]
+    }
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    for start in range(0, n_recipes, chunk_recipes):
+        size = min(chunk_recipes, n_recipes - start)
+        ids = next_id + np.cumsum(rng.integers(1, 4, size))
+        next_id = int(ids[-1])
+        recipes, pp_recipes = generate_recipes(
+            profile, rng, ids, start, scale, ingredient_ids, token_vocabulary
+        )
+        interactions = generate_interactions(profile, rng, recipes, scale)
+        header = start == 0
+        recipes.to_csv(paths["RAW_recipes.csv"], mode="a", header=header, index=False)
+        interactions.to_csv(
+            paths["RAW_interactions.csv"], mode="a", header=header, index=False
+        )
+        pp_recipes.to_csv(paths["PP_recipes.csv"], mode="a", header=header, index=False)
+        n_interactions += len(interactions)
+        print(f"{start + size}/{n_recipes} recipes, {n_interactions} interactions")
+
+    ingredients_table(profile, ingredient_ids).to_csv(
+        os.path.join(output, "ingredients.csv"), index=False
+    )
+    return n_recipes, n_interactions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Food.com dump")
+    parser.add_argument("--output", default=os.path.join(PATH_DATA, "synthetic"))
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="number of recipes relative to the real dump (231637 recipes)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--chunk-recipes",
+        type=int,
+        default=DEFAULT_CHUNK_RECIPES,
+        help="number of recipes generated and written at once",
+    )
+    args = parser.parse_args(argv)
+    n_recipes, n_interactions = generate(
+        args.output, args.scale, args.seed, args.chunk_recipes
+    )
+    print(f"Wrote {n_recipes} recipes and {n_interactions} interactions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
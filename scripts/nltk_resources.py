@@ -0,0 +1,225 @@
+"""
+Local bundle of the nltk resources of the preprocessing pipeline.
+
+`NltkResources.bundle` downloads the resources once into a directory and records
+the checksum of each of their files in a manifest; it is the only step needing the
+network, and the directory can then be copied to hosts without network access. The
+pipeline then calls `NltkResources.require` when a stage needs a resource: the
+first time, its files are checked against the manifest and the directory is put in
+front of the nltk search path. Resources that are not in the bundle are left to
+the usual nltk lookup.
+
+Usage: python scripts/nltk_resources.py [--directory DIRECTORY] [RESOURCE ...]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+import nltk
+
+# Resources of the pipeline and the path nltk finds them at. nltk >= 3.9 loads
+# the perceptron tagger from averaged_perceptron_tagger_eng.
+RESOURCES = {
+    "punkt_tab": "tokenizers/punkt_tab",
+    "averaged_perceptron_tagger_eng": "taggers/averaged_perceptron_tagger_eng",
+    "wordnet": "corpora/wordnet",
+    "stopwords": "corpora/stopwords",
+}
+PERCEPTRON_TAGGER = "averaged_perceptron_tagger_eng"
+MANIFEST = "manifest.json"
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "nltk_data"
+)
+FILE_BLOCK_SIZE = 1 << 20
+
+
+def file_checksum(path: str):
+    """
+    Hash of the content of a file.
+
+    :param path: the path of the file
+    :type path: str
+    :return: the sha256 hex digest of the file
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(FILE_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resource_files(directory: str, path: str):
+    """
+    The files of a resource, relative to the bundle directory.
+
+    nltk unzips the packages it downloads next to their archive; the unzipped files
+    are used when they exist, the archive otherwise.
+
+    :param directory: the bundle directory
+    :type directory: str
+    :param path: the path of the resource, as found by nltk
+    :type path: str
+    :return: the sorted relative paths, empty if the resource is not there
+    :rtype: list
+    """
+    root = os.path.join(directory, path)
+    if os.path.isdir(root):
+        files = []
+        for parent, _, names in os.walk(root):
+            for name in names:
+                files.append(os.path.relpath(os.path.join(parent, name), directory))
+        return sorted(path.replace(os.sep, "/") for path in files)
+    if os.path.isfile(root + ".zip"):
+        return [path + ".zip"]
+    return []
+
+
+class NltkResources:
+    """
+    The nltk resources bundled in a directory, see the module documentation.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, resources: dict = None):
+        self.directory = os.path.abspath(directory)
+        self.resources = dict(RESOURCES if resources is None else resources)
+        self.loaded = set()
+        self.__manifest = None
+
+    @property
+    def manifest_path(self):
+        """Path of the manifest of the bundle."""
+        return os.path.join(self.directory, MANIFEST)
+
+    def manifest(self):
+        """
+        The manifest of the bundle, read once.
+
+        :return: the nltk version and, for each bundled resource, its path and the
+            checksums of its files; None without bundle
+        :rtype: dict
+        """
+        if self.__manifest is None and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as file:
+                self.__manifest = json.load(file)
+        return self.__manifest
+
+    def checksums(self, name: str):
+        """
+        The checksums of the files of a resource in the bundle directory.
+
+        :param name: the name of the resource
+        :type name: str
+        :return: the checksum of each file, by relative path
+        :rtype: dict
+        """
+        return {
+            path: file_checksum(os.path.join(self.directory, path))
+            for path in resource_files(self.directory, self.resources[name])
+        }
+
+    def is_valid(self, name: str):
+        """
+        Whether a resource is in the bundle and its files match the manifest.
+
+        :param name: the name of the resource
+        :type name: str
+        :rtype: bool
+        """
+        manifest = self.manifest()
+        if manifest is None or name not in manifest["resources"]:
+            return False
+        expected = manifest["resources"][name]["files"]
+        return bool(expected) and self.checksums(name) == expected
+
+    def bundle(self, names: list = None, force: bool = False):
+        """
+        Download resources into the bundle directory and write the manifest.
+
+        The resources already bundled with valid files are not downloaded again,
+        unless `force`.
+
+        :param names: the resources, all of `resources` by default
+        :type names: list
+        :param force: download the resources even if they are bundled
+        :type force: bool
+        :raises LookupError: if a resource could not be downloaded
+        :return: the manifest
+        :rtype: dict
+        """
+        names = list(self.resources) if names is None else names
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.manifest() or {"resources": {}}
+        for name in names:
+            if not force and self.is_valid(name):
+                continue
+            nltk.download(name, download_dir=self.directory, quiet=True)
+            files = self.checksums(name)
+            if not files:
+                raise LookupError(f"nltk resource {name} could not be downloaded")
+            manifest["resources"][name] = {"path": self.resources[name], "files": files}
+        manifest["nltk_version"] = nltk.__version__
+        with open(self.manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        self.__manifest = manifest
+        self.loaded.clear()
+        return manifest
+
+    def require(self, *names: str):
+        """
+        Make resources loadable by nltk from the bundle, without network access.
+
+        Each resource is handled once: if it is in the bundle, its files are checked
+        against the manifest and the bundle directory is put in front of the nltk
+        search path. Otherwise nltk looks for it in its usual directories.
+
+        :param names: the resources
+        :type names: str
+        :raises ValueError: if the files of a bundled resource do not match the
+            manifest
+        """
+        for name in names:
+            if name in self.loaded:
+                continue
+            manifest = self.manifest()
+            if manifest is not None and name in manifest["resources"]:
+                if not self.is_valid(name):
+                    raise ValueError(
+                        f"The files of nltk resource {name} in {self.directory} do "
+                        "not match the manifest, bundle it again"
+                    )
+                if self.directory not in nltk.data.path:
+                    nltk.data.path.insert(0, self.directory)
+            self.loaded.add(name)
+
+
+def main(argv=None):
+    """
+    Bundle the nltk resources of the pipeline from the command line.
+
+    :param argv: the arguments, sys.argv by default
+    :type argv: list
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "resources", nargs="*", help="resources to bundle, all by default"
+    )
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument(
+        "--force", action="store_true", help="download the bundled resources again"
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.resources) - set(RESOURCES)
+    if unknown:
+        parser.error(f"unknown resources: {', '.join(sorted(unknown))}")
+    resources = NltkResources(args.directory)
+    manifest = resources.bundle(args.resources or None, force=args.force)
+    count = len(manifest["resources"])
+    print(f"{count} nltk resource(s) bundled in {resources.directory}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
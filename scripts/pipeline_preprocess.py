@@ -1,28 +1,147 @@
 import pandas as pd
 import numpy as np
 import os
-import ast
+import sys
 import nltk
 import re
+import math
+import itertools
+import argparse
+import warnings
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
 from datetime import date
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from scripts.token_cache import TokenCache, DEFAULT_MAX_ENTRIES
+from scripts.stage_cache import Stage, StageCache, run_stages, file_fingerprint
+from scripts.stage_profiler import StageProfiler
+from scripts.nltk_resources import NltkResources, PERCEPTRON_TAGGER
+from scripts.pos_lexicon import LexiconTagger, load_lexicon
+from scripts.review_sentiment import (
+    review_sentiment,
+    open_sentiment_cache,
+    count_reviews,
+)
+from scripts.duckdb_backend import (
+    groupby_duckdb,
+    delete_outliers_minutes_duckdb,
+    delete_outliers_steps_duckdb,
+    delete_outliers_calories_duckdb,
+)
+from utils.list_parser import parse_list_column
+from utils.dtype_functions import compact_dtypes, format_dtype_report
+from utils.techniques import (
+    TECHNIQUES_LIST,
+    TECHNIQUES_MASK_COLUMN,
+    vectors_to_masks,
+    masks_to_words,
+)
+from utils.ingredients import (
+    INGREDIENT_VOCABULARY,
+    build_vocabulary,
+    save_vocabulary,
+    encode_ingredients,
+)
 
 
-def load_nltk_resources():
+PATH_DATA = "../data/"
+NLTK_DATA = "nltk_data"
+
+# nltk resources of the pipeline, see `use_nltk_data`
+_nltk_resources = None
+
+
+def load_nltk_resources(directory: str = None):
+    """
+    Download the nltk resources into the local bundle used by the pipeline, the only
+    step needing the network (see `scripts.nltk_resources`)
+
+    Args:
+        directory (str): The bundle directory, PATH_DATA/nltk_data by default
+
+    Returns:
+        dict : The manifest of the bundle
     """
-    Load the nltk resources
+    return use_nltk_data(directory).bundle()
+
+
+def use_nltk_data(directory: str = None):
     """
-    nltk.download("punkt_tab")
-    nltk.download("averaged_perceptron_tagger")
-    nltk.download("wordnet")
-    nltk.download("stopwords")
+    Load the nltk resources from a local bundle, lazily, when a stage needs them
+
+    Args:
+        directory (str): The bundle directory, PATH_DATA/nltk_data by default
+
+    Returns:
+        NltkResources : The resources of the pipeline
+    """
+    global _nltk_resources
+    _nltk_resources = NltkResources(directory or os.path.join(PATH_DATA, NLTK_DATA))
+    return _nltk_resources
+
+
+def require_nltk(*names: str):
+    """
+    Make nltk resources available without network access, see `NltkResources.require`
+
+    Args:
+        names (str): The resources
+    """
+    resources = _nltk_resources if _nltk_resources is not None else use_nltk_data()
+    resources.require(*names)
 
 
-PATH_DATA = "../data/"
 RAW_RECIPE = "RAW_recipes.csv"
 RAW_INTERACTIONS = "RAW_interactions.csv"
 PROCESSED_DATA = "clean_recipe_df.csv"
 PROCESSED_DATA_JSON = "clean_recipe_df.json"
+PROCESSED_DATA_PARQUET = "clean_recipe_df.parquet"
 PP_RECIPES = "PP_recipes.csv"
+TOKEN_CACHE = os.path.join("cache", "tokens.sqlite")
+STAGE_CACHE = os.path.join("cache", "stages")
+PROFILE_REPORT = os.path.join("profile", "preprocess_profile.json")
+POS_LEXICON = os.path.join("cache", "pos_lexicon.json")
+SENTIMENT_CACHE = os.path.join("cache", "sentiment.sqlite")
+INCREMENTAL_STATE = "clean_recipe_df.state.json"
+
+# Columns taken from the first row of each recipe_id group in `groupby`
+GROUPBY_FIRST_COLUMNS = [
+    "i",
+    "name_tokens",
+    "ingredient_tokens",
+    "steps_tokens",
+    "techniques",
+    "calorie_level",
+    "ingredient_ids",
+    "name",
+    "minutes",
+    "contributor_id",
+    "submitted",
+    "tags",
+    "nutrition",
+    "steps",
+    "n_steps",
+    "description",
+    "ingredients",
+    "n_ingredients",
+]
+# Columns from RAW_interactions aggregated as lists in `groupby`
+GROUPBY_LIST_COLUMNS = ["review", "date", "user_id", "rating"]
+
+# Chunked mode: in-memory size of RAW_interactions relative to its size on disk
+INTERACTIONS_MEMORY_FACTOR = 4
+DEFAULT_MEMORY_LIMIT_MB = 512
+DEFAULT_CHUNKSIZE = 100_000
+
+# Execution backends of the joins, the groupby and the outlier filters
+BACKENDS = ["pandas", "duckdb"]
 
 
 def load_data(path: str):
@@ -64,7 +183,7 @@ def change_to_list(data: pd, colone: str):
     Returns:
         panda df : The data in a pandas dataframe with the column as a list of strings
     """
-    data[colone] = data[colone].apply(ast.literal_eval)
+    data[colone] = parse_list_column(data[colone])
     print("Type après conversion:", type(data[colone].iloc[0]))
     return data
 
@@ -96,47 +215,213 @@ def merge_dataframe(dataframe1, dataframe2, lefton, righton):
     return data
 
 
-def groupby(data: pd):
+def group_offsets(keys: np.ndarray):
+    """Sort the keys once and compute the boundaries of each group of equal keys
+
+    Args:
+        keys (np.ndarray): The group key of each row
+
+    Returns:
+        order : The stable sort order of the rows
+        unique_keys : The sorted unique keys
+        offsets : Group g is made of the rows order[offsets[g]:offsets[g + 1]]
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    if len(sorted_keys) == 0:
+        return order, sorted_keys, np.zeros(1, dtype=np.int64)
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    offsets = np.concatenate(([0], boundaries, [len(sorted_keys)]))
+    return order, sorted_keys[offsets[:-1]], offsets
+
+
+def offsets_to_lists(values: np.ndarray, offsets: np.ndarray):
+    """Materialize an offset-based list array (values + offsets) as Python lists
+
+    Args:
+        values (np.ndarray): The values of all the lists, one list after the other
+        offsets (np.ndarray): List g is values[offsets[g]:offsets[g + 1]]
+
+    Returns:
+        list : One Python list per group
+    """
+    flat = values.tolist()
+    return [flat[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def groupby_vectorized(data: pd.DataFrame, first_columns: list, list_columns: list):
+    """
+    Group the data by recipe_id with a single sort instead of per-group Python calls
+
+    The `first_columns` are taken from the first row of each group in one take, which
+    is the same as "first" as long as they are constant within a group (the recipe
+    columns after the merge with the interactions). The `list_columns` are built as
+    offset-based list arrays, then materialized as Python lists.
+
+    Args:
+        data (pd.DataFrame): The data in a pandas dataframe
+        first_columns (list): Columns to take from the first row of each group
+        list_columns (list): Columns to aggregate as lists
+
+    Returns:
+        df : The data in a pandas dataframe grouped by recipe_id
+    """
+    data = data[data["recipe_id"].notna()]
+    order, recipe_ids, offsets = group_offsets(data["recipe_id"].to_numpy())
+
+    df = data[first_columns].iloc[order[offsets[:-1]]].reset_index(drop=True)
+    df.insert(0, "recipe_id", recipe_ids)
+    for column in list_columns:
+        df[column] = offsets_to_lists(data[column].to_numpy()[order], offsets)
+    return df
+
+
+def groupby(data: pd, engine: str = "vectorized"):
     """ "
     Group the data by recipe_id and aggregate the columns from Interactions as List
 
     Args:
         data (pd): The data in a pandas dataframe
+        engine (str): "vectorized" (sort once, see `groupby_vectorized`) or "pandas"
+            (`DataFrame.groupby.agg` with one Python call per group)
 
     Returns:
         df : The data in a pandas dataframe grouped by recipe_id
     """
-    df = (
-        data.groupby(["recipe_id"])
-        .agg(
-            {
-                "i": "first",
-                "name_tokens": "first",
-                "ingredient_tokens": "first",
-                "steps_tokens": "first",
-                "techniques": "first",
-                "calorie_level": "first",
-                "ingredient_ids": "first",
-                "name": "first",
-                "minutes": "first",
-                "contributor_id": "first",
-                "submitted": "first",
-                "tags": "first",
-                "nutrition": "first",
-                "steps": "first",
-                "n_steps": "first",
-                "description": "first",
-                "ingredients": "first",
-                "n_ingredients": "first",
-                "review": lambda x: list(x) if len(x) > 0 else [],
-                "date": lambda x: list(x) if len(x) > 0 else [],
-                "user_id": lambda x: list(x) if len(x) > 0 else [],
-                "rating": lambda x: list(x) if len(x) > 0 else [],
-            }
-        )
-        .reset_index()
+    if engine == "vectorized":
+        return groupby_vectorized(data, GROUPBY_FIRST_COLUMNS, GROUPBY_LIST_COLUMNS)
+    if engine != "pandas":
+        raise ValueError(f"Unknown groupby engine: {engine}")
+
+    aggregations = {column: "first" for column in GROUPBY_FIRST_COLUMNS}
+    aggregations.update(
+        {
+            column: lambda x: list(x) if len(x) > 0 else []
+            for column in GROUPBY_LIST_COLUMNS
+        }
     )
+    df = data.groupby(["recipe_id"]).agg(aggregations).reset_index()
+
+    return df
+
+
+def get_number_of_partitions(path: str, memory_limit_mb: float):
+    """Compute how many recipe_id partitions RAW_interactions must be split into
+    so that one partition fits in the memory ceiling
+
+    Args:
+        path (str): The path of the interactions file
+        memory_limit_mb (float): Memory ceiling for one partition, in MB
+
+    Returns:
+        int : The number of partitions
+    """
+    if memory_limit_mb <= 0:
+        raise ValueError("memory_limit_mb must be strictly positive.")
+    estimated_size = os.path.getsize(path) * INTERACTIONS_MEMORY_FACTOR
+    return max(1, math.ceil(estimated_size / (memory_limit_mb * 1024**2)))
+
+
+def partition_interactions(
+    path: str, tmp_dir: str, n_partitions: int, chunksize: int = DEFAULT_CHUNKSIZE
+):
+    """Read the interactions by chunks of `chunksize` rows and spill every chunk
+    to disk, split into `n_partitions` partitions by recipe_id
+
+    The rows of a recipe all land in the same partition and keep the order of the file.
 
+    Args:
+        path (str): The path of the interactions file
+        tmp_dir (str): Directory where the partition files are written
+        n_partitions (int): The number of partitions
+        chunksize (int): The number of rows read at once
+
+    Returns:
+        partition_files : For each partition, the list of its pickle files
+        dtypes : For each column, the dtype it would have if the file was read at once
+    """
+    partition_files = [[] for _ in range(n_partitions)]
+    chunk_dtypes = {}
+    for chunk_number, chunk in enumerate(pd.read_csv(path, chunksize=chunksize)):
+        for column, dtype in chunk.dtypes.items():
+            chunk_dtypes.setdefault(column, []).append(dtype)
+        keys = chunk["recipe_id"] % n_partitions
+        for partition, part in chunk.groupby(keys, sort=False):
+            file = os.path.join(tmp_dir, f"partition_{partition}_{chunk_number}.pkl")
+            part.to_pickle(file)
+            partition_files[partition].append(file)
+
+    # A column can be int in a chunk and float in another one (missing values)
+    dtypes = {column: np.result_type(*types) for column, types in chunk_dtypes.items()}
+    return partition_files, dtypes
+
+
+def aggregate_interactions(interactions: pd.DataFrame):
+    """Group the interactions by recipe_id and aggregate their columns as lists
+
+    Args:
+        interactions (pd.DataFrame): Interactions of one or several recipes
+
+    Returns:
+        df : One row per recipe_id with the review, date, user_id and rating lists
+    """
+    return groupby_vectorized(interactions, [], GROUPBY_LIST_COLUMNS)
+
+
+def groupby_chunked(
+    raw_recipe_data: pd.DataFrame,
+    pp_recipes_data: pd.DataFrame,
+    interactions_path: str,
+    memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    tmp_dir: str = None,
+):
+    """Out-of-core equivalent of merging the recipes with the interactions then
+    calling `groupby`
+
+    The interactions are never loaded at once: they are partitioned by recipe_id on
+    disk, then the per-recipe lists are built one partition at a time and joined to
+    the recipes, which avoids materializing the recipe columns once per interaction.
+
+    Args:
+        raw_recipe_data (pd.DataFrame): RAW_recipes, lists and dates already parsed
+        pp_recipes_data (pd.DataFrame): PP_recipes, lists already parsed
+        interactions_path (str): The path of RAW_interactions
+        memory_limit_mb (float): Memory ceiling for one partition, in MB
+        chunksize (int): The number of interactions read at once
+        tmp_dir (str): Directory for the partition files, a temporary one by default
+
+    Returns:
+        df : The same dataframe as `groupby` on the merged data
+    """
+    n_partitions = get_number_of_partitions(interactions_path, memory_limit_mb)
+    print(f"Partitioning interactions into {n_partitions} partition(s)")
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as partition_dir:
+        partition_files, dtypes = partition_interactions(
+            interactions_path, partition_dir, n_partitions, chunksize
+        )
+        aggregated = []
+        for files in partition_files:
+            if not files:
+                continue
+            interactions = pd.concat(
+                [pd.read_pickle(file) for file in files]
+            ).astype(dtypes)
+            for file in files:
+                os.remove(file)
+            interactions = change_to_date_time_format(interactions, "date")
+            aggregated.append(aggregate_interactions(interactions))
+            del interactions
+
+    interactions_lists = pd.concat(aggregated, ignore_index=True)
+    df = merge_dataframe(raw_recipe_data, interactions_lists, "id", "recipe_id")
+    df = merge_dataframe(pp_recipes_data, df, "id", "recipe_id")
+    df = (
+        df[["recipe_id"] + GROUPBY_FIRST_COLUMNS + GROUPBY_LIST_COLUMNS]
+        .sort_values("recipe_id", kind="stable")
+        .reset_index(drop=True)
+    )
     return df
 
 
@@ -151,33 +436,60 @@ def change_na_description_by_name(data: pd):
     return data
 
 
-def delete_outliers_minutes(data: pd):
+def delete_outliers_minutes(data: pd, outlier_ids: list = None):
     """ "
     Delete the two largest minutes (troll recipes)
     Delete Recipe with 0 minutes
 
     Args:
         data (pd): The data in a pandas dataframe
+        outlier_ids (list): recipe_id of the troll recipes, when they were
+            computed on a larger dataset (see `minutes_outliers`)
 
     Returns:
         df : The data in a pandas dataframe without the two largest minutes and 0 minutes' recipes
 
     """
-    data = data.drop(data["minutes"].nlargest(2).index)
+    if outlier_ids is None:
+        data = data.drop(data["minutes"].nlargest(2).index)
+    else:
+        data = data[~data["recipe_id"].isin(outlier_ids)]
     data = data[data["minutes"] != 0]
     return data
 
 
-def delete_outliers_calories(data: pd):
+def minutes_outliers(data: pd.DataFrame):
+    """
+    Get the two recipes `delete_outliers_minutes` drops as troll recipes
+
+    Args:
+        data (pd.DataFrame): The grouped data, without the recipes with no name
+
+    Returns:
+        list : [recipe_id, minutes] of the two recipes with the largest minutes
+    """
+    outliers = data.loc[data["minutes"].nlargest(2).index, ["recipe_id", "minutes"]]
+    return [[int(recipe_id), int(minutes)] for recipe_id, minutes in outliers.values]
+
+
+def delete_outliers_calories(data: pd, backend: str = "pandas"):
     """Delete Recipe over 20000 calories or 0 calories (outliers)
 
     :param data: dataframe des recettes
     :type data: pd
+    :param backend: "pandas" ou "duckdb", voir `BACKENDS`
+    :type backend: str
     :return: dataframe des recettes sans les recettes avec plus de 20000 calories ou 0 calories
     :rtype: pd.dataframe
     """
-    data = data[(data["calories"] < 20000) & (data["calories"] > 0)]
-    return data
+    # Filter on the float64 calories as parsed: in float32 a value just under the
+    # limit (19999.9995) rounds to 20000
+    if backend == "duckdb":
+        data = delete_outliers_calories_duckdb(data)
+    else:
+        calories = data["calories"].to_numpy()
+        data = data[(calories < 20000) & (calories > 0)]
+    return data.astype({"calories": np.float32})
 
 
 def delete_outliers_steps(data: pd):
@@ -203,7 +515,7 @@ def get_stopwords():
         stopwords : The stopwords from nltk aggregated with custom stopwords
     """
 
-    nltk.download("stopwords")
+    require_nltk("stopwords")
 
     custom_stopwords = {
         "recipe",
@@ -236,54 +548,84 @@ def get_stopwords():
     return stopwords
 
 
-def clean_and_tokenize(text: str, stopwords: set, do_pos_tags=True):
+# POS tags dropped by `clean_and_tokenize`
+EXCLUDED_POS_TAGS = frozenset(
+    (
+        "JJ",
+        "JJR",
+        "JJS",  # Adjectifs
+        "DT",  # Déterminants
+        "PRP",
+        "PRP$",
+        "WP",
+        "WP$",  # Pronoms
+        "RB",
+        "RBR",
+        "RBS",  # Adverbes
+        "MD",  # Modaux
+        "VB",
+        "VBD",
+        "VBG",
+        "VBN",
+        "VBP",
+        "VBZ",  # Tous les types de verbes
+        "CC",
+        "IN",  # Conjonctions et prépositions
+        "CD",  # Nombres
+        "UH",  # Interjections
+    )
+)
+
+# Parallel text cleaning: number of texts sent to a worker at once
+DEFAULT_TEXT_BATCH_SIZE = 2_000
+
+
+def tokenize_text(text: str):
     """
-    Clean and tokenize the text by removing stopwords and punctuation. Filtered also the POS tags to keep only the nouns and verbs
+    Lower the text, remove the numbers and the punctuation and split it into words
 
     Args:
-        text (_type_): _description_
+        text (str): The text
 
     Returns:
-        str: _description_
+        list: The words
     """
     text = text.lower()
     text = re.sub(r"[0-9]+", "", text)
     text = re.sub(r"[.;:!\'?,\"()\[\]]", "", text)
 
-    tokens = nltk.word_tokenize(text)
+    require_nltk("punkt_tab")
+    return nltk.word_tokenize(text)
 
-    if do_pos_tags:
-        pos_tags = nltk.pos_tag(tokens)
 
-    filtered_tokens = [
-        word
-        for word, tag in pos_tags
-        if tag
-        not in (
-            "JJ",
-            "JJR",
-            "JJS",  # Adjectifs
-            "DT",  # Déterminants
-            "PRP",
-            "PRP$",
-            "WP",
-            "WP$",  # Pronoms
-            "RB",
-            "RBR",
-            "RBS",  # Adverbes
-            "MD",  # Modaux
-            "VB",
-            "VBD",
-            "VBG",
-            "VBN",
-            "VBP",
-            "VBZ",  # Tous les types de verbes
-            "CC",
-            "IN",  # Conjonctions et prépositions
-            "CD",  # Nombres
-            "UH",  # Interjections
-        )
-    ]
+def clean_and_tokenize(text: str, stopwords: set, do_pos_tags=True, tagger=None):
+    """
+    Clean and tokenize the text by removing stopwords and punctuation. Filtered also the POS tags to keep only the nouns and verbs
+
+    Args:
+        text (str): The text to clean
+        stopwords (set): The stopwords to remove
+        do_pos_tags (bool): Filter the tokens on their POS tags
+        tagger: A POS tagger with a `tag` method, reused between calls, for instance
+            a `LexiconTagger` (see `get_pos_tagger`). By default `nltk.pos_tag` is
+            called.
+
+    Returns:
+        list: The cleaned tokens
+    """
+    tokens = tokenize_text(text)
+
+    if do_pos_tags:
+        if tagger is None:
+            require_nltk(PERCEPTRON_TAGGER)
+            pos_tags = nltk.pos_tag(tokens)
+        else:
+            pos_tags = tagger.tag(tokens)
+        filtered_tokens = [
+            word for word, tag in pos_tags if tag not in EXCLUDED_POS_TAGS
+        ]
+    else:
+        filtered_tokens = tokens
     filtered_tokens = [
         word for word in filtered_tokens if word.lower() not in stopwords
     ]
@@ -291,20 +633,192 @@ def clean_and_tokenize(text: str, stopwords: set, do_pos_tags=True):
     return filtered_tokens
 
 
-def clean_colonne(data: pd, colonne: str, stopwords: set):
+def get_pos_tagger(pos_lexicon: dict = None):
+    """
+    Build the nltk perceptron tagger used by `nltk.pos_tag`, to load its model once,
+    or a tagger looking the tags up in a lexicon
+
+    Args:
+        pos_lexicon (dict): The dominant tag of each word (see `scripts.pos_lexicon`).
+            The perceptron tagger is then only loaded for the texts with words
+            missing from the lexicon
+
+    Returns:
+        nltk.tag.PerceptronTagger or LexiconTagger : The POS tagger
+    """
+    if pos_lexicon is not None:
+        return LexiconTagger(pos_lexicon, fallback=get_pos_tagger)
+    require_nltk(PERCEPTRON_TAGGER)
+    return nltk.tag.PerceptronTagger()
+
+
+# State of a text cleaning worker process, set once by `init_text_worker`
+_worker_stopwords = None
+_worker_tagger = None
+
+
+def init_text_worker(stopwords: set, nltk_data: str = None, pos_lexicon: dict = None):
+    """
+    Initialize a text cleaning worker process with its own tagger and stopword set
+
+    Args:
+        stopwords (set): The stopwords to remove
+        nltk_data (str): The nltk bundle directory of the parent process
+        pos_lexicon (dict): The lexicon of the tags, see `get_pos_tagger`
+    """
+    global _worker_stopwords, _worker_tagger
+    use_nltk_data(nltk_data)
+    _worker_stopwords = frozenset(stopwords)
+    _worker_tagger = get_pos_tagger(pos_lexicon)
+
+
+def clean_batch(texts: list):
+    """
+    Clean a batch of texts in a worker process initialized by `init_text_worker`
+
+    Args:
+        texts (list): The texts to clean
+
+    Returns:
+        list : The cleaned tokens of each text, in the same order
+    """
+    return [
+        clean_and_tokenize(text, _worker_stopwords, tagger=_worker_tagger)
+        for text in texts
+    ]
+
+
+def clean_texts_parallel(
+    texts: list,
+    stopwords: set,
+    n_jobs: int,
+    batch_size: int = DEFAULT_TEXT_BATCH_SIZE,
+    pos_lexicon: dict = None,
+):
+    """
+    Clean the texts in batches across a pool of processes
+
+    Args:
+        texts (list): The texts to clean
+        stopwords (set): The stopwords to remove
+        n_jobs (int): The number of processes, -1 for one per CPU
+        batch_size (int): The number of texts sent to a worker at once
+        pos_lexicon (dict): The lexicon of the tags, see `get_pos_tagger`
+
+    Returns:
+        list : The cleaned tokens of each text, in the original order
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=init_text_worker,
+        initargs=(
+            stopwords,
+            _nltk_resources and _nltk_resources.directory,
+            pos_lexicon,
+        ),
+    ) as executor:
+        # map yields the results in the order of the batches
+        return [tokens for batch in executor.map(clean_batch, batches) for tokens in batch]
+
+
+def token_cache_fingerprint(stopwords: set, pos_lexicon_path: str = None):
+    """
+    Fingerprint of the settings `clean_and_tokenize` depends on, so that a token cache
+    filled with other stopwords, another POS filter, another POS lexicon or another
+    nltk is invalidated
+
+    Args:
+        stopwords (set): The stopwords to remove
+        pos_lexicon_path (str): The lexicon of the tags, None for the perceptron tagger
+
+    Returns:
+        str : The fingerprint
+    """
+    settings = [
+        nltk.__version__,
+        " ".join(sorted(stopwords)),
+        " ".join(sorted(EXCLUDED_POS_TAGS)),
+    ]
+    if pos_lexicon_path is not None:
+        settings.append(file_fingerprint(pos_lexicon_path))
+    return hashlib.sha256("\n".join(settings).encode("utf-8")).hexdigest()
+
+
+def open_token_cache(
+    path: str,
+    stopwords: set,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    pos_lexicon_path: str = None,
+):
+    """
+    Open the persistent token cache for the given stopwords and POS lexicon
+
+    Args:
+        path (str): The path of the cache file
+        stopwords (set): The stopwords to remove
+        max_entries (int): The number of texts kept in the cache
+        pos_lexicon_path (str): The lexicon of the tags, None for the perceptron tagger
+
+    Returns:
+        TokenCache : The token cache
+    """
+    fingerprint = token_cache_fingerprint(stopwords, pos_lexicon_path)
+    return TokenCache(path, fingerprint, max_entries)
+
+
+def clean_colonne(
+    data: pd,
+    colonne: str,
+    stopwords: set,
+    n_jobs: int = 1,
+    batch_size: int = DEFAULT_TEXT_BATCH_SIZE,
+    cache: TokenCache = None,
+    pos_lexicon: dict = None,
+):
     """
     Clean the column by removing stopwords and punctuation. Filtered also the POS tags to keep only the nouns and verbs
 
+    Identical texts are cleaned only once, and not at all if they are in the cache.
+
     Args:
         data (pd): The data in a pandas dataframe
         colonne (str): The column to clean
         stopwords (set): The stopwords to remove
+        n_jobs (int): The number of processes, 1 cleans in the current process
+        batch_size (int): The number of texts sent to a worker at once
+        cache (TokenCache): Persistent cache of the cleaned texts, see `open_token_cache`
+        pos_lexicon (dict): Tag the words with this lexicon instead of the perceptron
+            tagger, see `get_pos_tagger`
 
     Returns:
         df : The data in a pandas dataframe with the column cleaned
     """
-    data["cleaned_" + colonne] = data[colonne].apply(
-        lambda x: clean_and_tokenize(x, stopwords)
+    unique_texts = pd.unique(data[colonne])
+    cleaned = cache.get_many(unique_texts) if cache is not None else {}
+    missing = [text for text in unique_texts if text not in cleaned]
+
+    if n_jobs == 1:
+        options = {}
+        if pos_lexicon is not None and missing:
+            options["tagger"] = get_pos_tagger(pos_lexicon)
+        tokens = [clean_and_tokenize(text, stopwords, **options) for text in missing]
+    else:
+        tokens = clean_texts_parallel(
+            missing, stopwords, n_jobs, batch_size, pos_lexicon
+        )
+    cleaned.update(zip(missing, tokens))
+    if cache is not None:
+        cache.set_many(zip(missing, tokens))
+        print(
+            f"Token cache for {colonne}: "
+            f"{len(unique_texts) - len(missing)} hits, {len(missing)} misses"
+        )
+
+    data["cleaned_" + colonne] = pd.Series(
+        [cleaned[text] for text in data[colonne]], index=data.index, dtype=object
     )
     return data
 
@@ -358,18 +872,65 @@ def ingredient_to_ingredient_processed(
     return processed_list, replaced_list
 
 
-def processed_ingredient(data: pd):
+def map_ingredient_lists(ingredient_lists: pd.Series, lookup: pd.DataFrame):
+    """
+    Map every ingredient of the lists through a lookup table in one pass: the lists
+    are flattened once, looked up with an index, and rebuilt from their offsets
+
+    Args:
+        ingredient_lists (pd.Series): The lists of raw ingredients
+        lookup (pd.DataFrame): The mapped names of each raw ingredient, indexed by
+            the raw ingredient (unique)
+
+    Returns:
+        dict : The mapped lists for each column of `lookup`, unknown ingredients
+            mapped to None
+    """
+    lengths = np.fromiter(
+        map(len, ingredient_lists), dtype=np.int64, count=len(ingredient_lists)
+    )
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    flat = np.fromiter(
+        itertools.chain.from_iterable(ingredient_lists), dtype=object, count=offsets[-1]
+    )
+    # -1 for the unknown ingredients, which take the None appended to each column
+    positions = lookup.index.get_indexer(flat)
+    mapped = {}
+    for column in lookup.columns:
+        values = np.append(lookup[column].to_numpy(dtype=object), None)
+        mapped[column] = offsets_to_lists(values[positions], offsets)
+    return mapped
+
+
+def processed_ingredient(data: pd, engine: str = "vectorized"):
     """
     Process the ingredients by removing stopwords and punctuation. Filtered also the POS tags to keep only the nouns and verbs
 
     Args:
         data (pd): The data in a pandas dataframe
+        engine (str): "vectorized" (one lookup for all the ingredients, see
+            `map_ingredient_lists`) or "apply" (`ingredient_to_ingredient_processed`
+            on each recipe)
 
     Returns:
         df : The data in a pandas dataframe with the ingredients processed and replaced
     """
+    if engine not in ("vectorized", "apply"):
+        raise ValueError(f"Unknown ingredient engine: {engine}")
     ingredients_data = load_data(os.path.join(PATH_DATA, "ingredients.csv"))
 
+    if engine == "vectorized":
+        # The last row of a raw ingredient wins, as with to_dict
+        lookup = ingredients_data.drop_duplicates("raw_ingr", keep="last").set_index(
+            "raw_ingr"
+        )[["processed", "replaced"]]
+        mapped = map_ingredient_lists(data["ingredients"], lookup)
+        for column in ["processed", "replaced"]:
+            data[f"ingredients_{column}"] = pd.Series(
+                mapped[column], index=data.index, dtype=object
+            )
+        return data
+
     processed_dict = ingredients_data.set_index("raw_ingr")["processed"].to_dict()
     replaced_dict = ingredients_data.set_index("raw_ingr")["replaced"].to_dict()
 
@@ -417,80 +978,81 @@ def save_data_json(data: pd, path: str):
         data (pd): Data in a pandas dataframe
         path (str): The path to save the data
     """
+    float32_columns = data.columns[data.dtypes == np.float32]
+    if len(float32_columns) > 0:
+        # Write 138.4 rather than the float64 value of the float32 (138.3999938965)
+        data = data.astype({column: str for column in float32_columns}).astype(
+            {column: np.float64 for column in float32_columns}
+        )
     data.to_json(path, orient="records", lines=True)
 
 
+def to_arrow_column(values: pd.Series, column: str, vocabulary: list = None):
+    """Convert a column of the clean dataset to a typed Arrow array: lists as native
+    list columns and dates as timestamps
+
+    Args:
+        values (pd.Series): The values of the column
+        column (str): The name of the column
+        vocabulary (list): The ingredient vocabulary, the ingredients are stored as
+            lists of int32 ids into it when given, as lists of strings otherwise
+
+    Returns:
+        pa.Array : The typed values
+    """
+    if column == CLEAN_COLUMNS["submitted"]:
+        return pa.array(pd.to_datetime(values))
+    if column == CLEAN_COLUMNS["date"]:
+        # pyarrow only builds timestamps from datetime.date through date32
+        return pa.array(values, type=pa.list_(pa.date32())).cast(
+            pa.list_(pa.timestamp("ns"))
+        )
+    if column == CLEAN_COLUMNS["ingredients_replaced"] and vocabulary is not None:
+        return pa.array(encode_ingredients(values, vocabulary))
+    if column in (CLEAN_COLUMNS["ingredients_replaced"], CLEAN_COLUMNS["techniques"]):
+        return pa.array(values, type=pa.list_(pa.string()))
+    return pa.array(values, from_pandas=True)
+
+
+def save_data_parquet(
+    data: pd, path: str, recipe_ids: list = None, vocabulary: list = None
+):
+    """Save the clean dataset to the path in parquet format, with typed columns
+
+    Args:
+        data (pd): The clean dataset
+        path (str): The path to save the data
+        recipe_ids (list): recipe_id of the rows, stored as an integer column
+            when given
+        vocabulary (list): The ingredient vocabulary, see `to_arrow_column`
+    """
+    columns = {}
+    if recipe_ids is not None:
+        columns["recipe_id"] = pa.array(np.asarray(recipe_ids, dtype=np.int64))
+    for column in data.columns:
+        columns[column] = to_arrow_column(data[column], column, vocabulary)
+    # Vocabularies of the bits of the techniques mask and of the ingredient ids
+    metadata = {"techniques": json.dumps(TECHNIQUES_LIST)}
+    if vocabulary is not None:
+        metadata["ingredients"] = json.dumps(vocabulary)
+    table = pa.table(columns).replace_schema_metadata(metadata)
+    pq.write_table(table, path)
+
+
 def change_techniques_to_words(data: pd):
-    """Change the techniques list of bool to words
+    """Change the techniques list of bool to words, and keep them as a bitmask
+    (bit i for TECHNIQUES_LIST[i]) in techniques_mask
 
     :param data: The data in a pandas dataframe
     :type data: pd
     :return: The data in a pandas dataframe with the techniques as words
     :rtype: pd.dataframe
     """
-    TECHNIQUES_LIST = [
-        "bake",
-        "barbecue",
-        "blanch",
-        "blend",
-        "boil",
-        "braise",
-        "brine",
-        "broil",
-        "caramelize",
-        "combine",
-        "crock pot",
-        "crush",
-        "deglaze",
-        "devein",
-        "dice",
-        "distill",
-        "drain",
-        "emulsify",
-        "ferment",
-        "freez",
-        "fry",
-        "grate",
-        "griddle",
-        "grill",
-        "knead",
-        "leaven",
-        "marinate",
-        "mash",
-        "melt",
-        "microwave",
-        "parboil",
-        "pickle",
-        "poach",
-        "pour",
-        "pressure cook",
-        "puree",
-        "refrigerat",
-        "roast",
-        "saute",
-        "scald",
-        "scramble",
-        "shred",
-        "simmer",
-        "skillet",
-        "slow cook",
-        "smoke",
-        "smooth",
-        "soak",
-        "sous-vide",
-        "steam",
-        "stew",
-        "strain",
-        "tenderize",
-        "thicken",
-        "toast",
-        "toss",
-        "whip",
-        "whisk",
-    ]
-    data["techniques"] = data["techniques"].apply(
-        lambda x: [tech for tech, val in zip(TECHNIQUES_LIST, x) if val == 1]
+    masks = vectors_to_masks(data["techniques"])
+    data["techniques"] = pd.Series(
+        masks_to_words(masks), index=data.index, dtype=object
     )
+    data["techniques_mask"] = masks
     return data
 
 
@@ -521,140 +1083,1292 @@ def create_mean_rating(df):
     return df
 
 
-def explicit_nutriments(data):
+# Values of the nutrition lists of RAW_recipes, in order
+NUTRITION_COLUMNS = [
+    "calories",
+    "total fat (%)",
+    "sugar (%)",
+    "sodium (%)",
+    "protein (%)",
+    "saturated fat (%)",
+    "carbohydrates (%)",
+]
+# Nutrition values kept in the clean dataset
+NUTRITION_KEPT_COLUMNS = ["calories"]
+
+
+def nutrition_matrix(values: pd.Series, dtype=None):
+    """Parse the nutrition column into a matrix, one row per recipe and one column
+    per value of NUTRITION_COLUMNS
+
+    The nutrition texts of RAW_recipes ("[51.5, 0.0, ...]") are parsed all at once
+    with numpy; anything else (lists, unusual texts) row by row.
+
+    Args:
+        values (pd.Series): The nutrition lists, or their texts
+        dtype: The type of the matrix, inferred from the values by default
+
+    Raises:
+        ValueError: If a list is invalid or does not have one value per nutriment
+
+    Returns:
+        np.ndarray : The contiguous (recipes x nutriments) matrix
+    """
+    n_values = len(NUTRITION_COLUMNS)
+    matrix = None
+    if len(values) > 0 and values.map(type).eq(str).all():
+        text = "".join(values.tolist())
+        if (
+            text.startswith("[")
+            and text.endswith("]")
+            and text.count("[") == text.count("][") + 1 == len(values)
+            and text.count("]") == len(values)
+            and values.str.count(",").eq(n_values - 1).all()
+        ):
+            with warnings.catch_warnings():
+                # numpy warns instead of raising on a text it cannot read
+                warnings.simplefilter("error", DeprecationWarning)
+                try:
+                    matrix = np.fromstring(
+                        text[1:-1].replace("][", ","), dtype=np.float64, sep=","
+                    )
+                except (ValueError, DeprecationWarning):
+                    matrix = None
+            if matrix is not None and matrix.size != len(values) * n_values:
+                matrix = None
+        if matrix is not None:
+            matrix = matrix.reshape(-1, n_values)
+        else:
+            values = parse_list_column(values)
+    if matrix is None:
+        matrix = np.array(values.tolist())
+        if matrix.ndim != 2 or matrix.shape[1] != n_values:
+            raise ValueError(
+                f"Each nutrition list must have {n_values} values, got shape "
+                f"{matrix.shape}"
+            )
+    return np.ascontiguousarray(matrix, dtype=dtype)
+
+
+def explicit_nutriments(data, columns: list = None, dtype=None):
+    """Split the nutrition lists into one column per nutriment
+
+    Args:
+        data (pd.DataFrame): The recipes with their nutrition lists
+        columns (list): The nutriments to keep, all of NUTRITION_COLUMNS by default
+        dtype: The type of the columns, inferred from the values by default
+
+    Raises:
+        ValueError: If the nutrition column is missing or cannot be parsed
+
+    Returns:
+        pd.DataFrame : The recipes with the nutriment columns
+    """
     if "nutrition" not in data.columns:
         raise ValueError("The 'nutrition' column is missing from the data.")
+    columns = NUTRITION_COLUMNS if columns is None else columns
 
     try:
-        data[
-            [
-                "calories",
-                "total fat (%)",
-                "sugar (%)",
-                "sodium (%)",
-                "protein (%)",
-                "saturated fat (%)",
-                "carbohydrates (%)",
-            ]
-        ] = pd.DataFrame(data["nutrition"].to_list(), index=data.index)
+        matrix = nutrition_matrix(data["nutrition"], dtype)
+        for column in columns:
+            data[column] = matrix[:, NUTRITION_COLUMNS.index(column)]
     except Exception as e:
         raise ValueError(f"Error processing 'nutrition' column: {e}")
 
     return data
 
 
-def preprocess():
-    """
-    Preprocess the data by loading, cleaning, and saving it
+# Columns of the clean dataset and their names in the saved files
+CLEAN_COLUMNS = {
+    "name": "Nom",
+    "mean_rating": "Note moyenne",
+    "comment_count": "Nombre de commentaires",
+    "submitted": "Date de publication de la recette",
+    "minutes": "Durée de la recette (minutes)",
+    "ingredients_replaced": "Ingrédients",
+    "calories": "Calories",
+    "techniques": "Techniques utilisées",
+    "techniques_mask": TECHNIQUES_MASK_COLUMN,
+    "n_steps": "Nombre d'étapes",
+    "date": "Dates des commentaires",
+    "sentiment_mean": "Sentiment moyen des commentaires",
+    "sentiment_std": "Écart-type du sentiment des commentaires",
+}
+
+UNWANTED_COLUMNS = [
+    "ingredient_tokens",
+    "ingredients_processed",
+    "ingredients",
+    "cleaned_name",
+    "description",
+    "cleaned_description",
+    "nutrition",
+    "steps",
+    "n_ingredients",
+    "i",
+    "name_tokens",
+    "steps_tokens",
+    "ingredient_ids",
+    "tags",
+    "review",
+    "calorie_level",
+    "rating",
+    "contributor_id",
+    "user_id",
+]
+
+
+def load_raw_data(chunked=False):
     """
+    Load RAW_recipes, RAW_interactions and PP_recipes and parse their dates and lists
+    (the nutrition texts are parsed by `explicit_nutriments`)
 
-    print("Downloading nltk resources")
-    load_nltk_resources()
+    Args:
+        chunked (bool): Do not load RAW_interactions, it is streamed later
 
+    Returns:
+        raw_recipe_data, raw_interactions_data (None if chunked), pp_recipes_data
+    """
     raw_recipe_data = load_data(os.path.join(PATH_DATA, RAW_RECIPE))
-    raw_interactions_data = load_data(os.path.join(PATH_DATA, RAW_INTERACTIONS))
+    raw_interactions_data = None
+    if not chunked:
+        raw_interactions_data = load_data(os.path.join(PATH_DATA, RAW_INTERACTIONS))
     pp_recipes_data = load_data(os.path.join(PATH_DATA, PP_RECIPES))
 
     raw_recipe_data = change_to_date_time_format(raw_recipe_data, "submitted")
-    raw_interactions_data = change_to_date_time_format(raw_interactions_data, "date")
+    if not chunked:
+        raw_interactions_data = change_to_date_time_format(
+            raw_interactions_data, "date"
+        )
 
     raw_recipe_data = change_to_list(raw_recipe_data, "tags")
     raw_recipe_data = change_to_list(raw_recipe_data, "steps")
-    raw_recipe_data = change_to_list(raw_recipe_data, "nutrition")
     raw_recipe_data = change_to_list(raw_recipe_data, "ingredients")
     pp_recipes_data = change_to_list(pp_recipes_data, "techniques")
+    return raw_recipe_data, raw_interactions_data, pp_recipes_data
 
+
+def build_grouped_data(raw_recipe_data, raw_interactions_data, pp_recipes_data):
+    """
+    Merge the recipes with their interactions and group them by recipe_id
+
+    Args:
+        raw_recipe_data (pd.DataFrame): RAW_recipes
+        raw_interactions_data (pd.DataFrame): RAW_interactions
+        pp_recipes_data (pd.DataFrame): PP_recipes
+
+    Returns:
+        df : One row per recipe with the interactions as lists
+    """
     df = merge_dataframe(raw_recipe_data, raw_interactions_data, "id", "recipe_id")
-    print("Type après merge:", type(df["ingredients"].iloc[0]))
+    if len(df) > 0:
+        print("Type après merge:", type(df["ingredients"].iloc[0]))
     df = merge_dataframe(pp_recipes_data, df, "id", "recipe_id")
     df = groupby(df)
+    return df
 
+
+def filter_recipes(df, minutes_outlier_ids=None, backend="pandas"):
+    """
+    Drop the recipes without name, the troll recipes and the recipes without
+    minutes or steps
+
+    Args:
+        df (pd.DataFrame): The grouped data
+        minutes_outlier_ids (list): recipe_id of the troll recipes, the two largest
+            minutes of `df` by default
+        backend (str): Run the outlier filters with pandas or DuckDB, see `BACKENDS`
+
+    Returns:
+        df : The kept recipes
+    """
     df = change_na_description_by_name(df)
 
     df = change_category(df, "contributor_id")
     df = change_category(df, "recipe_id")
 
-    df = delete_outliers_minutes(df)
+    if backend == "duckdb":
+        df = delete_outliers_minutes_duckdb(df, minutes_outlier_ids)
+        df = delete_outliers_steps_duckdb(df)
+        return df
+    df = delete_outliers_minutes(df, minutes_outlier_ids)
     df = delete_outliers_steps(df)
+    return df
 
-    stopwords = get_stopwords()
-    df = clean_colonne(df, "description", stopwords)
-    df = clean_colonne(df, "name", stopwords)
 
-    df = processed_ingredient(df)
+def clean_texts(df, stopwords, n_jobs=1, token_cache=None, pos_lexicon_path=None):
+    """
+    Tokenize the descriptions and the names of the recipes
+
+    Args:
+        df (pd.DataFrame): The recipes
+        stopwords (set): The stopwords to remove
+        n_jobs (int): The number of processes cleaning the texts
+        token_cache (TokenCache): Persistent cache of the cleaned texts
+        pos_lexicon_path (str): Tag the words with this lexicon instead of the
+            perceptron tagger, see `scripts.pos_lexicon`
+
+    Returns:
+        df : The recipes with cleaned_description and cleaned_name
+    """
+    pos_lexicon = None
+    if pos_lexicon_path is not None:
+        pos_lexicon = load_lexicon(pos_lexicon_path)
+    for colonne in ["description", "name"]:
+        df = clean_colonne(
+            df,
+            colonne,
+            stopwords,
+            n_jobs=n_jobs,
+            cache=token_cache,
+            pos_lexicon=pos_lexicon,
+        )
+    return df
+
+
+def add_review_sentiment(df, n_jobs=1, sentiment_cache=None):
+    """
+    Score the sentiment of the reviews with VADER and aggregate it by recipe, see
+    `scripts.review_sentiment`
+
+    Args:
+        df (pd.DataFrame): The recipes, with their reviews as lists
+        n_jobs (int): The number of processes scoring the reviews, -1 for one per CPU
+        sentiment_cache (TokenCache): Persistent cache of the review scores
+
+    Returns:
+        df : The recipes with sentiment_mean and sentiment_std, NaN for the recipes
+            without review
+    """
+    df["sentiment_mean"], df["sentiment_std"] = review_sentiment(
+        df["review"], n_jobs, cache=sentiment_cache
+    )
+    return df
+
+
+def build_features(df):
+    """
+    Compute the techniques, nutrition and interaction aggregates, then drop the
+    columns that are not kept
+
+    Args:
+        df (pd.DataFrame): The recipes with their ingredients processed
 
+    Returns:
+        df : The recipes with their features
+    """
     df = change_techniques_to_words(df)
 
-    df = explicit_nutriments(df)
+    # Calories kept in float64 until `delete_outliers_calories`, which compacts them
+    df = explicit_nutriments(df, NUTRITION_KEPT_COLUMNS, np.float64)
     df = create_colums_count(df)
     df = create_mean_rating(df)
     print(df.columns)
     # supression des colonnes inutiles
-    unwated_columns = [
-        "ingredient_tokens",
-        "ingredients_processed",
-        "ingredients",
-        "cleaned_name",
-        "description",
-        "cleaned_description",
-        "nutrition",
-        "steps",
-        "n_ingredients",
-        "i",
-        "name_tokens",
-        "steps_tokens",
-        "ingredient_ids",
-        "tags",
-        "review",
-        "total fat (%)",
-        "sugar (%)",
-        "sodium (%)",
-        "protein (%)",
-        "saturated fat (%)",
-        "carbohydrates (%)",
-        "calorie_level",
-        "rating",
-        "contributor_id",
-        "user_id",
-    ]
-    df = delete_unwanted_columns(df, unwated_columns)
+    df = delete_unwanted_columns(df, UNWANTED_COLUMNS)
+    return df
+
 
+def clean_grouped_data(
+    df,
+    stopwords,
+    n_jobs=1,
+    token_cache=None,
+    minutes_outlier_ids=None,
+    pos_lexicon_path=None,
+    sentiment_cache=None,
+):
+    """
+    Clean the grouped recipes: outliers, texts, ingredients, review sentiment,
+    techniques, nutrition and interaction aggregates
+
+    Args:
+        df (pd.DataFrame): The grouped data
+        stopwords (set): The stopwords to remove
+        n_jobs (int): The number of processes cleaning the texts
+        token_cache (TokenCache): Persistent cache of the cleaned texts
+        minutes_outlier_ids (list): recipe_id of the troll recipes, the two largest
+            minutes of `df` by default
+        pos_lexicon_path (str): Tag the words with this lexicon instead of the
+            perceptron tagger
+        sentiment_cache (TokenCache): Persistent cache of the review scores
+
+    Returns:
+        df : The clean recipes, with their recipe_id
+    """
+    df = filter_recipes(df, minutes_outlier_ids)
+    df = clean_texts(df, stopwords, n_jobs, token_cache, pos_lexicon_path)
+    df = processed_ingredient(df)
+    df = add_review_sentiment(df, n_jobs, sentiment_cache)
+    df = build_features(df)
     df = delete_outliers_calories(df)
+    return df
 
-    old_col = [
-        "name",
-        "mean_rating",
-        "comment_count",
-        "submitted",
-        "minutes",
-        "ingredients_replaced",
-        "calories",
-        "techniques",
-        "n_steps",
-        "date",
-    ]
 
-    new_col = {
-        "mean_rating": "Note moyenne",
-        "comment_count": "Nombre de commentaires",
-        "name": "Nom",
-        "submitted": "Date de publication de la recette",
-        "n_steps": "Nombre d'étapes",
-        "date": "Dates des commentaires",
-        "ingredients_replaced": "Ingrédients",
-        "minutes": "Durée de la recette (minutes)",
-        "calories": "Calories",
-        "techniques": "Techniques utilisées",
-    }
+def rename_clean_data(df):
+    """
+    Keep and rename the columns of the clean dataset
+
+    Args:
+        df (pd.DataFrame): The clean recipes
 
+    Returns:
+        df : The clean dataset, as saved
+    """
     print("Original columns:", df.columns)
 
-    df = rename_column(df, old_col, new_col)
+    df = rename_column(df, list(CLEAN_COLUMNS), CLEAN_COLUMNS)
 
     print("Renamed columns:", df.columns)
+    return df
+
+
+def split_recipe_ids(df):
+    """
+    Rename the clean recipes and keep their recipe_id apart
+
+    Args:
+        df (pd.DataFrame): The clean recipes, with their recipe_id
+
+    Returns:
+        df, recipe_ids : The clean dataset, as saved, and the recipe_id of its rows
+    """
+    recipe_ids = df["recipe_id"].astype(int).tolist()
+    return rename_clean_data(df), recipe_ids
+
+
+def group_recipes(
+    raw_recipe_data,
+    raw_interactions_data,
+    pp_recipes_data,
+    chunked=False,
+    memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+    chunksize=DEFAULT_CHUNKSIZE,
+    backend="pandas",
+):
+    """
+    Group the interactions by recipe, in memory, by chunks of RAW_interactions or
+    with DuckDB reading RAW_interactions directly
+
+    Args:
+        raw_recipe_data (pd.DataFrame): RAW_recipes
+        raw_interactions_data (pd.DataFrame): RAW_interactions, None if chunked or
+            with the duckdb backend
+        pp_recipes_data (pd.DataFrame): PP_recipes
+        chunked (bool): Stream RAW_interactions by chunks
+        memory_limit_mb (float): Memory ceiling for one partition of interactions,
+            or for the DuckDB queries
+        chunksize (int): The number of interactions read at once
+        backend (str): "pandas" or "duckdb", see `BACKENDS`
+
+    Returns:
+        df : One row per recipe with the interactions as lists
+    """
+    if backend == "duckdb":
+        return groupby_duckdb(
+            raw_recipe_data,
+            pp_recipes_data,
+            os.path.join(PATH_DATA, RAW_INTERACTIONS),
+            GROUPBY_FIRST_COLUMNS,
+            GROUPBY_LIST_COLUMNS,
+            memory_limit_mb,
+        )
+    if chunked:
+        return groupby_chunked(
+            raw_recipe_data,
+            pp_recipes_data,
+            os.path.join(PATH_DATA, RAW_INTERACTIONS),
+            memory_limit_mb,
+            chunksize,
+        )
+    return build_grouped_data(raw_recipe_data, raw_interactions_data, pp_recipes_data)
+
+
+def incremental_watermarks(df, raw_recipe_data):
+    """
+    Watermarks recorded for `preprocess_incremental`
+
+    Args:
+        df (pd.DataFrame): The grouped data
+        raw_recipe_data (pd.DataFrame): RAW_recipes
 
+    Returns:
+        max_date, max_submitted, outliers : The last interaction date, the last
+            submission date and the troll recipes (see `minutes_outliers`)
+    """
+    outliers = minutes_outliers(df[df["name"].notna()])
+    max_date = max(max(dates) for dates in df["date"])
+    max_submitted = raw_recipe_data["submitted"].max()
+    return max_date, max_submitted, outliers
+
+
+def preprocess_stages(
+    stopwords,
+    chunked=False,
+    memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+    chunksize=DEFAULT_CHUNKSIZE,
+    n_jobs=1,
+    token_cache=None,
+    backend="pandas",
+    pos_lexicon_path=None,
+    sentiment_cache=None,
+):
+    """
+    The named stages of `preprocess`, in order
+
+    Args:
+        stopwords (set): The stopwords to remove
+        chunked (bool): Stream RAW_interactions by chunks instead of loading it at once
+        memory_limit_mb (float): Memory ceiling for one partition of interactions (chunked mode)
+            or for the DuckDB queries
+        chunksize (int): The number of interactions read at once (chunked mode)
+        n_jobs (int): The number of processes cleaning the texts and scoring the
+            reviews
+        token_cache (TokenCache): Persistent cache of the cleaned texts
+        backend (str): Run the joins, the groupby and the outlier filters with pandas
+            or DuckDB, see `BACKENDS`
+        pos_lexicon_path (str): Tag the words with this lexicon instead of the
+            perceptron tagger
+        sentiment_cache (TokenCache): Persistent cache of the review scores
+
+    Returns:
+        list : The stages, see `STAGES`
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    # Both chunked mode and DuckDB read RAW_interactions in the group stage
+    stream = chunked or backend == "duckdb"
+    raw_files = [os.path.join(PATH_DATA, RAW_RECIPE), os.path.join(PATH_DATA, PP_RECIPES)]
+    interactions_file = [os.path.join(PATH_DATA, RAW_INTERACTIONS)]
+    return [
+        Stage(
+            "load",
+            load_raw_data,
+            outputs=["raw_recipe", "raw_interactions", "pp_recipes"],
+            params={"chunked": stream},
+            files=raw_files + ([] if stream else interactions_file),
+        ),
+        Stage(
+            "group",
+            group_recipes,
+            inputs=["raw_recipe", "raw_interactions", "pp_recipes"],
+            outputs=["grouped"],
+            params={"chunked": chunked},
+            options={
+                "memory_limit_mb": memory_limit_mb,
+                "chunksize": chunksize,
+                "backend": backend,
+            },
+            files=interactions_file if stream else [],
+        ),
+        Stage(
+            "watermarks",
+            incremental_watermarks,
+            inputs=["grouped", "raw_recipe"],
+            outputs=["watermarks"],
+        ),
+        Stage(
+            "filter",
+            filter_recipes,
+            inputs=["grouped"],
+            outputs=["filtered"],
+            options={"backend": backend},
+        ),
+        Stage(
+            "texts",
+            clean_texts,
+            inputs=["filtered"],
+            outputs=["tokenized"],
+            params={"stopwords": stopwords, "pos_lexicon_path": pos_lexicon_path},
+            options={"n_jobs": n_jobs, "token_cache": token_cache},
+            files=[] if pos_lexicon_path is None else [pos_lexicon_path],
+        ),
+        Stage(
+            "ingredients",
+            processed_ingredient,
+            inputs=["tokenized"],
+            outputs=["with_ingredients"],
+            files=[os.path.join(PATH_DATA, "ingredients.csv")],
+        ),
+        Stage(
+            "sentiment",
+            add_review_sentiment,
+            inputs=["with_ingredients"],
+            outputs=["with_sentiment"],
+            options={"n_jobs": n_jobs, "sentiment_cache": sentiment_cache},
+            throughput=("reviews", count_reviews),
+        ),
+        Stage(
+            "features", build_features, inputs=["with_sentiment"], outputs=["features"]
+        ),
+        Stage(
+            "calories",
+            delete_outliers_calories,
+            inputs=["features"],
+            outputs=["recipes"],
+            options={"backend": backend},
+        ),
+        Stage(
+            "rename", split_recipe_ids, inputs=["recipes"], outputs=["clean", "recipe_ids"]
+        ),
+    ]
+
+
+# Names of the stages of `preprocess`, for --from-stage
+STAGES = [
+    "load",
+    "group",
+    "watermarks",
+    "filter",
+    "texts",
+    "ingredients",
+    "sentiment",
+    "features",
+    "calories",
+    "rename",
+]
+
+
+def save_ingredient_vocabulary(df):
+    """
+    Save the vocabulary of the ingredients of the clean dataset, the names sorted so
+    that their ids only depend on the ingredients of the dataset
+
+    Args:
+        df (pd.DataFrame): The clean dataset
+
+    Returns:
+        list : The vocabulary, the id of an ingredient being its position
+    """
+    vocabulary = build_vocabulary(df[CLEAN_COLUMNS["ingredients_replaced"]])
+    save_vocabulary(os.path.join(PATH_DATA, INGREDIENT_VOCABULARY), vocabulary)
+    return vocabulary
+
+
+def save_clean_data(df, recipe_ids=None):
+    """
+    Save the clean dataset in csv, json and parquet format, with its columns
+    compacted to the smallest types keeping their values, and the vocabulary of
+    its ingredients
+
+    The parquet file stores the ingredients as int32 ids into the vocabulary (see
+    `utils.ingredients`), the csv and json files keep their names.
+
+    Args:
+        df (pd.DataFrame): The clean dataset
+        recipe_ids (list): recipe_id of the rows, only kept in the parquet file
+    """
+    df, report = compact_dtypes(df)
+    print(format_dtype_report(report))
+    vocabulary = save_ingredient_vocabulary(df)
     save_data(df, os.path.join(PATH_DATA, PROCESSED_DATA))
     save_data_json(df, os.path.join(PATH_DATA, PROCESSED_DATA_JSON))
+    save_data_parquet(
+        df, os.path.join(PATH_DATA, PROCESSED_DATA_PARQUET), recipe_ids, vocabulary
+    )
+
+
+def open_stopwords_and_cache(token_cache_path, token_cache_size, pos_lexicon_path=None):
+    """
+    Get the stopwords and open the token cache if a path is given
+
+    Args:
+        token_cache_path (str): The path of the token cache, or None
+        token_cache_size (int): The number of texts kept in the token cache
+        pos_lexicon_path (str): The lexicon of the tags, None for the perceptron tagger
+
+    Returns:
+        stopwords, token_cache (None without path)
+    """
+    stopwords = get_stopwords()
+    token_cache = None
+    if token_cache_path is not None:
+        token_cache = open_token_cache(
+            token_cache_path, stopwords, token_cache_size, pos_lexicon_path
+        )
+    return stopwords, token_cache
+
+
+def write_profile(profiler, path):
+    """
+    Write and print the measures of the stages, and the cProfile statistics of the
+    slowest stage when they were collected
+
+    Args:
+        profiler (StageProfiler): The measures of the run
+        path (str): The path of the JSON report
+    """
+    print(profiler.write(path))
+    print(f"Profile written to {path}")
+    stats_path = os.path.splitext(path)[0] + ".prof"
+    name = profiler.dump_slowest(stats_path)
+    if name is not None:
+        print(f"cProfile statistics of the slowest stage ({name}) written to {stats_path}")
+
+
+def preprocess(
+    chunked=False,
+    memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+    chunksize=DEFAULT_CHUNKSIZE,
+    n_jobs=1,
+    token_cache_path=None,
+    token_cache_size=DEFAULT_MAX_ENTRIES,
+    state_path=None,
+    stage_cache_path=None,
+    from_stage=None,
+    profile_path=None,
+    profile_cprofile=False,
+    backend="pandas",
+    nltk_data_path=None,
+    pos_lexicon_path=None,
+    sentiment_cache_path=None,
+):
+    """
+    Preprocess the data by loading, cleaning, and saving it
+
+    The work is split in the named stages of `preprocess_stages`. With a stage cache,
+    the stages whose code, parameters and inputs did not change are loaded from the
+    cache instead of being run.
+
+    Args:
+        chunked (bool): Stream RAW_interactions by chunks instead of loading it at once
+        memory_limit_mb (float): Memory ceiling for one partition of interactions (chunked mode)
+        chunksize (int): The number of interactions read at once (chunked mode)
+        n_jobs (int): The number of processes cleaning the texts and scoring the
+            reviews, -1 for one per CPU
+        token_cache_path (str): Persistent cache of the cleaned texts, none by default
+        token_cache_size (int): The number of texts kept in the token cache
+        state_path (str): Where to record the watermarks for `preprocess_incremental`,
+            nothing is recorded by default
+        stage_cache_path (str): Directory caching the result of each stage, none by default
+        from_stage (str): Run this stage and the stages after it even if they are
+            cached, see `STAGES`
+        profile_path (str): Where to write the measures of each stage (JSON, and a
+            text table next to it), nothing is measured by default
+        profile_cprofile (bool): Also run the stages under cProfile and keep the
+            statistics of the slowest one next to the report
+        backend (str): "duckdb" to run the joins, the groupby and the outlier filters
+            as DuckDB queries reading RAW_interactions directly, on all the cores and
+            spilling to disk above `memory_limit_mb`. The result is the same as with
+            "pandas"
+        nltk_data_path (str): The bundle of the nltk resources, see
+            `load_nltk_resources`, PATH_DATA/nltk_data by default
+        pos_lexicon_path (str): Tag the words of the texts with this lexicon (see
+            `scripts.pos_lexicon`) instead of the perceptron tagger, which is then
+            only used for the texts with unknown words
+        sentiment_cache_path (str): Persistent cache of the VADER scores of the
+            reviews, none by default
+    """
+
+    use_nltk_data(nltk_data_path)
+
+    stopwords, token_cache = open_stopwords_and_cache(
+        token_cache_path, token_cache_size, pos_lexicon_path
+    )
+    sentiment_cache = None
+    if sentiment_cache_path is not None:
+        sentiment_cache = open_sentiment_cache(sentiment_cache_path)
+    stages = preprocess_stages(
+        stopwords,
+        chunked,
+        memory_limit_mb,
+        chunksize,
+        n_jobs,
+        token_cache,
+        backend,
+        pos_lexicon_path,
+        sentiment_cache,
+    )
+    stage_cache = None
+    if stage_cache_path is not None:
+        stage_cache = StageCache(stage_cache_path)
+    # The watermarks are computed first: the next stages modify the grouped data
+    targets = ["clean", "recipe_ids"]
+    if state_path is not None:
+        targets = ["watermarks"] + targets
+    profiler = None
+    if profile_path is not None:
+        profiler = StageProfiler(cprofile=profile_cprofile)
+    try:
+        results = run_stages(stages, targets, stage_cache, from_stage, profiler)
+    finally:
+        if token_cache is not None:
+            token_cache.close()
+        if sentiment_cache is not None:
+            sentiment_cache.close()
+    df, recipe_ids = results[-2:]
+
+    if profiler is None:
+        save_clean_data(df, recipe_ids)
+    else:
+        profiler.measure("save", lambda: save_clean_data(df, recipe_ids), [df])
+        write_profile(profiler, profile_path)
+
+    if state_path is not None:
+        max_date, max_submitted, outliers = results[0]
+        interactions_rows = count_interactions(
+            os.path.join(PATH_DATA, RAW_INTERACTIONS), chunksize
+        )
+        write_incremental_state(
+            state_path,
+            max_date,
+            max_submitted,
+            recipe_ids,
+            outliers,
+            interactions_rows,
+        )
+
+
+def write_incremental_state(
+    path, max_date, max_submitted, recipe_ids, outliers, interactions_rows
+):
+    """
+    Record what the clean dataset was built from, for `preprocess_incremental`
+
+    Args:
+        path (str): The path of the state file
+        max_date (date): Date of the last interaction processed
+        max_submitted (date): Submission date of the last recipe processed
+        recipe_ids (list): recipe_id of each row of the clean dataset
+        outliers (list): [recipe_id, minutes] of the troll recipes
+        interactions_rows (int): The number of rows of RAW_interactions processed,
+            the next rows are the new interactions
+    """
+    state = {
+        "max_date": max_date.isoformat(),
+        "max_submitted": max_submitted.isoformat(),
+        "minutes_outliers": outliers,
+        "recipe_ids": recipe_ids,
+        "interactions_rows": interactions_rows,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+
+
+def load_incremental_state(path):
+    """
+    Load the state written by `write_incremental_state`
+
+    Args:
+        path (str): The path of the state file
+
+    Returns:
+        dict : The state with parsed dates, None if there is no state yet
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        state = json.load(file)
+    state["max_date"] = date.fromisoformat(state["max_date"])
+    state["max_submitted"] = date.fromisoformat(state["max_submitted"])
+    return state
+
+
+DATE_REPR = re.compile(r"datetime\.date\((\d+), (\d+), (\d+)\)")
+
+
+def parse_date_list(text: str):
+    """
+    Parse a saved list of dates, e.g. "[datetime.date(2009, 12, 9)]"
+
+    Args:
+        text (str): The list as written in the csv
+
+    Returns:
+        list : The dates
+    """
+    return [
+        date(int(year), int(month), int(day))
+        for year, month, day in DATE_REPR.findall(text)
+    ]
+
+
+def load_clean_dataset(path: str):
+    """
+    Load the clean dataset saved by `save_clean_data` with the types it was saved with
+
+    Args:
+        path (str): The path of the csv
+
+    Returns:
+        df : The clean dataset
+    """
+    # Recipe names such as "null" must stay strings, and floats must round trip
+    df = pd.read_csv(path, keep_default_na=False, float_precision="round_trip")
+    df = change_to_date_time_format(df, CLEAN_COLUMNS["submitted"])
+    df[CLEAN_COLUMNS["ingredients_replaced"]] = parse_list_column(
+        df[CLEAN_COLUMNS["ingredients_replaced"]]
+    )
+    df[CLEAN_COLUMNS["techniques"]] = parse_list_column(df[CLEAN_COLUMNS["techniques"]])
+    df[TECHNIQUES_MASK_COLUMN] = df[TECHNIQUES_MASK_COLUMN].astype(np.uint64)
+    df[CLEAN_COLUMNS["calories"]] = df[CLEAN_COLUMNS["calories"]].astype(np.float32)
+    df[CLEAN_COLUMNS["date"]] = df[CLEAN_COLUMNS["date"]].apply(parse_date_list)
+    # The recipes without review have an empty sentiment
+    for column in ["sentiment_mean", "sentiment_std"]:
+        column = CLEAN_COLUMNS[column]
+        df[column] = df[column].replace("", np.nan).astype(np.float64)
+    return df
+
+
+def read_interactions(path: str, keep, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Read the interactions by chunks and keep only some of them
+
+    Args:
+        path (str): The path of RAW_interactions
+        keep (callable): Returns the boolean mask of the rows to keep in a chunk
+        chunksize (int): The number of rows read at once
+
+    Returns:
+        df : The kept interactions, dates parsed, in the order of the file
+    """
+    kept = []
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = change_to_date_time_format(chunk, "date")
+        kept.append(chunk[keep(chunk)])
+    return pd.concat(kept)
+
+
+def count_interactions(path: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Count the interactions of RAW_interactions, as pandas reads them (a review may
+    span several lines)
+
+    Args:
+        path (str): The path of RAW_interactions
+        chunksize (int): The number of rows read at once
+
+    Returns:
+        int : The number of interactions
+    """
+    return sum(
+        len(chunk)
+        for chunk in pd.read_csv(path, usecols=["recipe_id"], chunksize=chunksize)
+    )
+
+
+def read_new_interactions(
+    path: str, first_row: int, chunksize: int = DEFAULT_CHUNKSIZE
+):
+    """
+    Read the interactions appended to RAW_interactions after its first rows
+
+    Args:
+        path (str): The path of RAW_interactions
+        first_row (int): The number of interactions already processed
+        chunksize (int): The number of rows read at once
+
+    Returns:
+        df, int : The new interactions, dates parsed, in the order of the file, and
+            the number of interactions of the file
+    """
+    kept = []
+    n_rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        positions = np.arange(n_rows, n_rows + len(chunk))
+        n_rows += len(chunk)
+        chunk = change_to_date_time_format(chunk, "date")
+        kept.append(chunk[positions >= first_row])
+    return pd.concat(kept), n_rows
+
+
+def update_interaction_aggregates(clean, recipe_ids, new_interactions):
+    """
+    Add new interactions to the comment dates, comment count and mean rating of
+    recipes already in the clean dataset
+
+    Args:
+        clean (pd.DataFrame): The clean dataset
+        recipe_ids (list): recipe_id of each row of the clean dataset
+        new_interactions (pd.DataFrame): The new interactions of these recipes
+
+    Returns:
+        df : The clean dataset with the aggregates updated
+    """
+    clean = clean.copy()
+    position = pd.Series(np.arange(len(recipe_ids)), index=recipe_ids)
+    updates = groupby_vectorized(new_interactions, [], ["date", "rating"])
+
+    dates = clean[CLEAN_COLUMNS["date"]].tolist()
+    counts = clean[CLEAN_COLUMNS["comment_count"]].tolist()
+    means = clean[CLEAN_COLUMNS["mean_rating"]].tolist()
+    for recipe_id, new_dates, new_ratings in zip(
+        updates["recipe_id"], updates["date"], updates["rating"]
+    ):
+        row = position[recipe_id]
+        # The ratings are integers: their sum is recovered exactly from the mean
+        rating_sum = round(means[row] * counts[row]) + sum(new_ratings)
+        dates[row] = dates[row] + new_dates
+        counts[row] = counts[row] + len(new_dates)
+        means[row] = rating_sum / counts[row]
+
+    clean[CLEAN_COLUMNS["date"]] = dates
+    clean[CLEAN_COLUMNS["comment_count"]] = counts
+    clean[CLEAN_COLUMNS["mean_rating"]] = means
+    return clean
+
+
+def update_review_sentiment(
+    clean, recipe_ids, interactions, n_jobs=1, sentiment_cache=None
+):
+    """
+    Recompute the review sentiment of recipes already in the clean dataset from all
+    their interactions, the old reviews being found in the sentiment cache
+
+    Args:
+        clean (pd.DataFrame): The clean dataset
+        recipe_ids (list): recipe_id of each row of the clean dataset
+        interactions (pd.DataFrame): All the interactions of the updated recipes, in
+            the order of the file
+        n_jobs (int): The number of processes scoring the reviews
+        sentiment_cache (TokenCache): Persistent cache of the review scores
+
+    Returns:
+        df : The clean dataset with the sentiment of these recipes updated
+    """
+    clean = clean.copy()
+    if len(interactions) == 0:
+        return clean
+    position = pd.Series(np.arange(len(recipe_ids)), index=recipe_ids)
+    updates = groupby_vectorized(interactions, [], ["review"])
+    rows = position[updates["recipe_id"]].to_numpy()
+    means, stds = review_sentiment(updates["review"], n_jobs, cache=sentiment_cache)
+    for column, values in [("sentiment_mean", means), ("sentiment_std", stds)]:
+        clean.loc[clean.index[rows], CLEAN_COLUMNS[column]] = values
+    return clean
+
+
+def preprocess_incremental(
+    state_path,
+    chunksize=DEFAULT_CHUNKSIZE,
+    n_jobs=1,
+    token_cache_path=None,
+    token_cache_size=DEFAULT_MAX_ENTRIES,
+    nltk_data_path=None,
+    pos_lexicon_path=None,
+    sentiment_cache_path=None,
+):
+    """
+    Update the clean dataset with the interactions and recipes that appeared since
+    the last run, instead of preprocessing everything again
+
+    Only the interactions after the rows recorded in the state are read as new, so
+    the dumps are expected to only append interactions (at any date, including the
+    day of the last run). The recipes already in the clean
+    dataset get their aggregates updated (their review sentiment is recomputed from
+    all their interactions, the sentiment cache avoids scoring the old reviews
+    again); the recipes that get their first
+    interactions go through the whole pipeline. When the new recipes change the troll
+    recipes (largest minutes), a full rebuild is done instead.
+
+    Args:
+        state_path (str): The state recorded by the previous run
+        chunksize (int): The number of interactions read at once
+        n_jobs (int): The number of processes cleaning the texts and scoring the
+            reviews, -1 for one per CPU
+        token_cache_path (str): Persistent cache of the cleaned texts, none by default
+        token_cache_size (int): The number of texts kept in the token cache
+        nltk_data_path (str): The bundle of the nltk resources, see
+            `load_nltk_resources`, PATH_DATA/nltk_data by default
+        pos_lexicon_path (str): Tag the words with this lexicon instead of the
+            perceptron tagger
+        sentiment_cache_path (str): Persistent cache of the VADER scores of the
+            reviews, none by default
+    """
+    state = load_incremental_state(state_path)
+    if state is None or "interactions_rows" not in state:
+        # The states of older runs only have the date watermark
+        print("No incremental state found, full rebuild")
+        preprocess(
+            n_jobs=n_jobs,
+            token_cache_path=token_cache_path,
+            token_cache_size=token_cache_size,
+            state_path=state_path,
+            nltk_data_path=nltk_data_path,
+            pos_lexicon_path=pos_lexicon_path,
+            sentiment_cache_path=sentiment_cache_path,
+        )
+        return
+
+    use_nltk_data(nltk_data_path)
+
+    interactions_path = os.path.join(PATH_DATA, RAW_INTERACTIONS)
+    new_interactions, interactions_rows = read_new_interactions(
+        interactions_path, state["interactions_rows"], chunksize
+    )
+    raw_recipe_data, _, pp_recipes_data = load_raw_data(chunked=True)
+
+    known_ids = set(state["recipe_ids"])
+    new_ids = set(new_interactions["recipe_id"]) | set(
+        raw_recipe_data.loc[raw_recipe_data["submitted"] > state["max_submitted"], "id"]
+    )
+    new_ids = new_ids - known_ids
+    print(f"{len(new_interactions)} new interactions, {len(new_ids)} new recipes")
+
+    # The new recipes go through the whole pipeline with all their interactions
+    grouped = build_grouped_data(
+        raw_recipe_data[raw_recipe_data["id"].isin(new_ids)],
+        read_interactions(
+            interactions_path, lambda chunk: chunk["recipe_id"].isin(new_ids), chunksize
+        ),
+        pp_recipes_data[pp_recipes_data["id"].isin(new_ids)],
+    )
+    candidates = state["minutes_outliers"] + minutes_outliers(
+        grouped[grouped["name"].notna()]
+    )
+    # A troll recipe is not in the clean dataset: when it gets new interactions it
+    # is grouped again as a new recipe, and must only be counted once
+    candidates = (
+        pd.DataFrame(candidates, columns=["recipe_id", "minutes"])
+        .drop_duplicates("recipe_id", keep="last")
+        .values.tolist()
+    )
+    # nlargest keeps the first rows, which are sorted by recipe_id, on ties
+    outliers = sorted(candidates, key=lambda outlier: (-outlier[1], outlier[0]))[:2]
+    if outliers != state["minutes_outliers"]:
+        print("New troll recipes, full rebuild")
+        preprocess(
+            n_jobs=n_jobs,
+            token_cache_path=token_cache_path,
+            token_cache_size=token_cache_size,
+            state_path=state_path,
+            nltk_data_path=nltk_data_path,
+            pos_lexicon_path=pos_lexicon_path,
+            sentiment_cache_path=sentiment_cache_path,
+        )
+        return
+
+    sentiment_cache = None
+    if sentiment_cache_path is not None:
+        sentiment_cache = open_sentiment_cache(sentiment_cache_path)
+    try:
+        new_rows = grouped
+        if len(grouped) > 0:
+            stopwords, token_cache = open_stopwords_and_cache(
+                token_cache_path, token_cache_size, pos_lexicon_path
+            )
+            try:
+                new_rows = clean_grouped_data(
+                    grouped,
+                    stopwords,
+                    n_jobs,
+                    token_cache,
+                    [i for i, _ in outliers],
+                    pos_lexicon_path,
+                    sentiment_cache,
+                )
+            finally:
+                if token_cache is not None:
+                    token_cache.close()
+
+        clean = load_clean_dataset(os.path.join(PATH_DATA, PROCESSED_DATA))
+        known_interactions = new_interactions[
+            new_interactions["recipe_id"].isin(known_ids)
+        ]
+        clean = update_interaction_aggregates(
+            clean, state["recipe_ids"], known_interactions
+        )
+        updated_ids = set(known_interactions["recipe_id"])
+        clean = update_review_sentiment(
+            clean,
+            state["recipe_ids"],
+            read_interactions(
+                interactions_path,
+                lambda chunk: chunk["recipe_id"].isin(updated_ids),
+                chunksize,
+            ),
+            n_jobs,
+            sentiment_cache,
+        )
+    finally:
+        if sentiment_cache is not None:
+            sentiment_cache.close()
+
+    recipe_ids = state["recipe_ids"]
+    if len(new_rows) > 0:
+        recipe_ids = recipe_ids + new_rows["recipe_id"].astype(int).tolist()
+        clean = pd.concat([clean, rename_clean_data(new_rows)], ignore_index=True)
+    order = np.argsort(recipe_ids, kind="stable")
+    clean = clean.iloc[order].reset_index(drop=True)
+    recipe_ids = [recipe_ids[i] for i in order]
+    save_clean_data(clean, recipe_ids)
+
+    max_date = state["max_date"]
+    if len(new_interactions) > 0:
+        max_date = max(max_date, new_interactions["date"].max())
+    write_incremental_state(
+        state_path,
+        max_date,
+        max(state["max_submitted"], raw_recipe_data["submitted"].max()),
+        recipe_ids,
+        outliers,
+        interactions_rows,
+    )
+
+
+def parse_args(argv=None):
+    """Parse the command line arguments of the pipeline
+
+    Args:
+        argv (list): The arguments, sys.argv by default
+
+    Returns:
+        argparse.Namespace : The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Preprocess the Food.com data")
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="stream RAW_interactions by chunks instead of loading it in memory",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_MEMORY_LIMIT_MB,
+        help="memory ceiling for one partition of interactions in chunked mode, "
+        "or for the queries of the duckdb backend",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=DEFAULT_CHUNKSIZE,
+        help="number of interactions read at once in chunked mode",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="pandas",
+        help="run the joins, the groupby and the outlier filters with pandas or as "
+        "DuckDB queries over the CSV files",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="number of processes cleaning the texts and scoring the reviews, "
+        "-1 for one per CPU",
+    )
+    parser.add_argument(
+        "--token-cache",
+        default=os.path.join(PATH_DATA, TOKEN_CACHE),
+        help="persistent cache of the cleaned texts",
+    )
+    parser.add_argument(
+        "--no-token-cache",
+        action="store_true",
+        help="clean every text without reading or filling the token cache",
+    )
+    parser.add_argument(
+        "--token-cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="number of texts kept in the token cache",
+    )
+    parser.add_argument(
+        "--sentiment-cache",
+        default=os.path.join(PATH_DATA, SENTIMENT_CACHE),
+        help="persistent cache of the VADER scores of the reviews",
+    )
+    parser.add_argument(
+        "--no-sentiment-cache",
+        action="store_true",
+        help="score every review without reading or filling the sentiment cache",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process the recipes and interactions added since the last run",
+    )
+    parser.add_argument(
+        "--state",
+        default=os.path.join(PATH_DATA, INCREMENTAL_STATE),
+        help="watermarks recorded for the incremental mode",
+    )
+    parser.add_argument(
+        "--stage-cache",
+        default=os.path.join(PATH_DATA, STAGE_CACHE),
+        help="directory caching the result of each stage",
+    )
+    parser.add_argument(
+        "--no-stage-cache",
+        action="store_true",
+        help="run every stage without reading or filling the stage cache",
+    )
+    parser.add_argument(
+        "--from-stage",
+        choices=STAGES,
+        default=None,
+        help="run this stage and the stages after it even if they are cached",
+    )
+    parser.add_argument(
+        "--nltk-data",
+        default=os.path.join(PATH_DATA, NLTK_DATA),
+        help="local bundle of the nltk resources, read without network access",
+    )
+    parser.add_argument(
+        "--bundle-nltk",
+        action="store_true",
+        help="download the nltk resources into the bundle first (needs the network)",
+    )
+    parser.add_argument(
+        "--pos-lexicon",
+        nargs="?",
+        const=os.path.join(PATH_DATA, POS_LEXICON),
+        default=None,
+        metavar="PATH",
+        help="tag the words with a lexicon built by scripts/pos_lexicon.py instead of "
+        "the perceptron tagger, which is then only used for unknown words",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=os.path.join(PATH_DATA, PROFILE_REPORT),
+        default=None,
+        metavar="PATH",
+        help="write the time, memory and rows of each stage as JSON and as a table",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="with --profile, also keep the cProfile statistics of the slowest stage "
+        "(the times then include the overhead of cProfile)",
+    )
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    preprocess()
+    args = parse_args()
+    token_cache_path = None if args.no_token_cache else args.token_cache
+    stage_cache_path = None if args.no_stage_cache else args.stage_cache
+    sentiment_cache_path = None if args.no_sentiment_cache else args.sentiment_cache
+    if args.bundle_nltk:
+        load_nltk_resources(args.nltk_data)
+    if args.incremental:
+        preprocess_incremental(
+            args.state,
+            chunksize=args.chunksize,
+            n_jobs=args.n_jobs,
+            token_cache_path=token_cache_path,
+            token_cache_size=args.token_cache_size,
+            nltk_data_path=args.nltk_data,
+            pos_lexicon_path=args.pos_lexicon,
+            sentiment_cache_path=sentiment_cache_path,
+        )
+    else:
+        preprocess(
+            chunked=args.chunked,
+            memory_limit_mb=args.memory_limit_mb,
+            chunksize=args.chunksize,
+            n_jobs=args.n_jobs,
+            token_cache_path=token_cache_path,
+            token_cache_size=args.token_cache_size,
+            state_path=args.state,
+            stage_cache_path=stage_cache_path,
+            from_stage=args.from_stage,
+            profile_path=args.profile,
+            profile_cprofile=args.cprofile,
+            backend=args.backend,
+            nltk_data_path=args.nltk_data,
+            pos_lexicon_path=args.pos_lexicon,
+            sentiment_cache_path=sentiment_cache_path,
+        )
@@ -0,0 +1,250 @@
+"""
+Lexicon-based POS tagging for the text cleaning of the preprocessing pipeline.
+
+`clean_and_tokenize` only uses the POS tags to drop some classes of words, so the
+perceptron tagger can be replaced by a lexicon giving the dominant tag of each word,
+built by a one-off run of the tagger over the corpus. Only the texts with words
+missing from the lexicon are still given to the tagger. `tag_agreement` measures how
+far the output of the lexicon is from the output of the tagger.
+
+Usage:
+    python scripts/pos_lexicon.py build [--data DIRECTORY] [--output PATH]
+    python scripts/pos_lexicon.py agreement [--data DIRECTORY] [--lexicon PATH]
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import Counter, defaultdict
+
+import nltk
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+DEFAULT_SAMPLE = 20_000
+
+
+class LexiconTagger:
+    """
+    POS tagger looking the tags up in a lexicon, with the same `tag` method as the
+    nltk taggers.
+
+    When a text has words missing from the lexicon, the fallback tagger tags the
+    whole text (it uses the context of the words) and its tags are kept for the
+    missing words. The fallback is only built the first time it is needed; without
+    fallback, the missing words are tagged None.
+    """
+
+    def __init__(self, lexicon: dict, fallback=None):
+        """
+        :param lexicon: the tag of each word
+        :type lexicon: dict
+        :param fallback: builds the tagger of the missing words, called once
+        :type fallback: callable
+        """
+        self.lexicon = lexicon
+        self.fallback = fallback
+        self.fallback_tagger = None
+        self.words = 0
+        self.missing_words = 0
+
+    def tag(self, tokens: list):
+        """
+        Tag the words of a text.
+
+        :param tokens: the words
+        :type tokens: list
+        :return: the (word, tag) pairs
+        :rtype: list
+        """
+        tags = [self.lexicon.get(token) for token in tokens]
+        self.words += len(tokens)
+        missing = tags.count(None)
+        self.missing_words += missing
+        if missing and self.fallback is not None:
+            if self.fallback_tagger is None:
+                self.fallback_tagger = self.fallback()
+            fallback_tags = self.fallback_tagger.tag(tokens)
+            tags = [
+                fallback_tag if tag is None else tag
+                for tag, (_, fallback_tag) in zip(tags, fallback_tags)
+            ]
+        return list(zip(tokens, tags))
+
+    @property
+    def missing_rate(self):
+        """Proportion of the words tagged so far that were not in the lexicon."""
+        return self.missing_words / self.words if self.words else 0.0
+
+
+def build_lexicon(token_lists, tagger):
+    """
+    Build the lexicon of the dominant tag of each word.
+
+    :param token_lists: the words of each text of the corpus
+    :type token_lists: iterable
+    :param tagger: the reference tagger, with a `tag` method
+    :return: the most frequent tag of each word, the first one seen on ties
+    :rtype: dict
+    """
+    counts = defaultdict(Counter)
+    for tokens in token_lists:
+        for word, tag in tagger.tag(tokens):
+            counts[word][tag] += 1
+    return {word: tags.most_common(1)[0][0] for word, tags in counts.items()}
+
+
+def save_lexicon(path: str, lexicon: dict, texts: int = None):
+    """
+    Write a lexicon as JSON.
+
+    :param path: the path of the lexicon
+    :type path: str
+    :param lexicon: the tag of each word
+    :type lexicon: dict
+    :param texts: the number of texts it was built from
+    :type texts: int
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"nltk_version": nltk.__version__, "texts": texts, "lexicon": lexicon},
+            file,
+            sort_keys=True,
+        )
+
+
+def load_lexicon(path: str):
+    """
+    Read a lexicon written by `save_lexicon`.
+
+    :param path: the path of the lexicon
+    :type path: str
+    :return: the tag of each word
+    :rtype: dict
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["lexicon"]
+
+
+def tag_agreement(token_lists, tagger, reference, excluded_tags):
+    """
+    Compare the tags of a tagger with those of a reference tagger.
+
+    :param token_lists: the words of each text
+    :type token_lists: iterable
+    :param tagger: the compared tagger, with a `tag` method
+    :param reference: the reference tagger, with a `tag` method
+    :param excluded_tags: the tags of the words dropped by the text cleaning
+    :type excluded_tags: frozenset
+    :return: the number of texts and words, the proportion of words with the same
+        tag, of words with the same keep/drop decision and of texts with the same
+        kept words
+    :rtype: dict
+    """
+    texts = words = same_tag = same_decision = same_text = 0
+    for tokens in token_lists:
+        tags = [tag for _, tag in tagger.tag(tokens)]
+        reference_tags = [tag for _, tag in reference.tag(tokens)]
+        decisions = [
+            (tag in excluded_tags) == (reference_tag in excluded_tags)
+            for tag, reference_tag in zip(tags, reference_tags)
+        ]
+        texts += 1
+        words += len(tokens)
+        same_tag += sum(tag == ref for tag, ref in zip(tags, reference_tags))
+        same_decision += sum(decisions)
+        same_text += all(decisions)
+    return {
+        "texts": texts,
+        "words": words,
+        "tag_agreement": same_tag / words if words else 1.0,
+        "filter_agreement": same_decision / words if words else 1.0,
+        "text_agreement": same_text / texts if texts else 1.0,
+    }
+
+
+def corpus_token_lists(data_directory: str, sample: int = None, seed: int = 0):
+    """
+    The words of the names and descriptions of RAW_recipes, as the pipeline cleans
+    them (each distinct text once).
+
+    :param data_directory: the directory of RAW_recipes.csv
+    :type data_directory: str
+    :param sample: the number of texts kept at random, all by default
+    :type sample: int
+    :param seed: the seed of the sample
+    :type seed: int
+    :rtype: list
+    """
+    # Imported here: the pipeline imports this module
+    from scripts import pipeline_preprocess
+
+    recipes = pd.read_csv(os.path.join(data_directory, pipeline_preprocess.RAW_RECIPE))
+    recipes = pipeline_preprocess.change_na_description_by_name(recipes)
+    texts = pd.Series(
+        pd.unique(pd.concat([recipes["name"], recipes["description"]]).astype(str))
+    )
+    if sample is not None and sample < len(texts):
+        texts = texts.sample(sample, random_state=seed)
+    return [pipeline_preprocess.tokenize_text(text) for text in texts]
+
+
+def main(argv=None):
+    """
+    Build a lexicon or measure its agreement with the perceptron tagger.
+
+    :param argv: the arguments, sys.argv by default
+    :type argv: list
+    """
+    from scripts import pipeline_preprocess
+
+    lexicon_path = os.path.join(
+        pipeline_preprocess.PATH_DATA, pipeline_preprocess.POS_LEXICON
+    )
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser(
+        "build", help="tag the corpus once and keep the lexicon"
+    )
+    agreement = subparsers.add_parser(
+        "agreement", help="compare the lexicon with the perceptron tagger"
+    )
+    for subparser in (build, agreement):
+        subparser.add_argument("--data", default=pipeline_preprocess.PATH_DATA)
+        subparser.add_argument("--nltk-data", default=None)
+        subparser.add_argument("--seed", type=int, default=0)
+    build.add_argument(
+        "--sample", type=int, default=None, help="number of texts tagged, all by default"
+    )
+    build.add_argument("--output", default=lexicon_path)
+    agreement.add_argument("--sample", type=int, default=DEFAULT_SAMPLE)
+    agreement.add_argument("--lexicon", default=lexicon_path)
+    args = parser.parse_args(argv)
+
+    pipeline_preprocess.use_nltk_data(args.nltk_data)
+    token_lists = corpus_token_lists(args.data, args.sample, args.seed)
+    tagger = pipeline_preprocess.get_pos_tagger()
+    if args.command == "build":
+        lexicon = build_lexicon(token_lists, tagger)
+        save_lexicon(args.output, lexicon, len(token_lists))
+        print(f"{len(lexicon)} words from {len(token_lists)} texts in {args.output}")
+        return
+
+    lexicon_tagger = pipeline_preprocess.get_pos_tagger(load_lexicon(args.lexicon))
+    measures = tag_agreement(
+        token_lists, lexicon_tagger, tagger, pipeline_preprocess.EXCLUDED_POS_TAGS
+    )
+    measures["missing_rate"] = lexicon_tagger.missing_rate
+    for name, value in measures.items():
+        value = f"{value:.4f}" if isinstance(value, float) else str(value)
+        print(f"{name:<18}{value:>10}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
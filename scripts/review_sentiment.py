@@ -0,0 +1,203 @@
+"""
+Sentiment of the reviews of the recipes, scored with VADER.
+
+Each distinct review is scored once, by batches across a pool of processes, and its
+compound score (between -1 and 1) can be kept in a persistent cache keyed by the
+hash of the review. The scores of the reviews of each recipe are then aggregated
+into their mean and standard deviation.
+"""
+
+import os
+import importlib.metadata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from scripts.token_cache import TokenCache
+
+# Number of reviews sent to a worker at once
+DEFAULT_BATCH_SIZE = 5_000
+# The cache holds the ~1.1M reviews of the dump with room for the next ones
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+# Analyzer of a worker process, set once by `init_sentiment_worker`
+_worker_analyzer = None
+
+
+def init_sentiment_worker():
+    """
+    Initialize a scoring worker process with its own analyzer.
+    """
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def score_batch(texts: list, analyzer: SentimentIntensityAnalyzer = None):
+    """
+    Score a batch of reviews.
+
+    :param texts: the reviews
+    :type texts: list
+    :param analyzer: the analyzer, the one of the worker process by default
+    :type analyzer: SentimentIntensityAnalyzer
+    :return: the compound score of each review, in order
+    :rtype: list
+    """
+    analyzer = analyzer or _worker_analyzer
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def score_texts(texts: list, n_jobs: int = 1, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Score reviews, in the current process or in batches across a pool of processes.
+
+    :param texts: the reviews
+    :type texts: list
+    :param n_jobs: the number of processes, 1 scores in the current process, -1
+        starts one per CPU
+    :type n_jobs: int
+    :param batch_size: the number of reviews sent to a worker at once
+    :type batch_size: int
+    :return: the compound score of each review, in order
+    :rtype: list
+    """
+    if n_jobs == 1 or len(texts) <= batch_size:
+        return score_batch(texts, SentimentIntensityAnalyzer())
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=init_sentiment_worker
+    ) as executor:
+        # map yields the results in the order of the batches
+        return [score for batch in executor.map(score_batch, batches) for score in batch]
+
+
+def sentiment_fingerprint():
+    """
+    Fingerprint of the scoring, so that a cache filled by another version of VADER
+    is invalidated.
+
+    :rtype: str
+    """
+    return "vaderSentiment " + importlib.metadata.version("vaderSentiment")
+
+
+def open_sentiment_cache(path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+    """
+    Open the persistent cache of the review scores.
+
+    :param path: the path of the cache file
+    :type path: str
+    :param max_entries: the number of reviews kept in the cache
+    :type max_entries: int
+    :rtype: TokenCache
+    """
+    return TokenCache(path, sentiment_fingerprint(), max_entries, table="scores")
+
+
+def score_reviews(
+    reviews: list,
+    n_jobs: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: TokenCache = None,
+):
+    """
+    Score reviews, each distinct one once and not at all if it is in the cache.
+
+    :param reviews: the reviews, the values that are not strings (missing reviews)
+        are not scored
+    :type reviews: list
+    :param n_jobs: the number of processes scoring the reviews
+    :type n_jobs: int
+    :param batch_size: the number of reviews sent to a worker at once
+    :type batch_size: int
+    :param cache: persistent cache of the scores, see `open_sentiment_cache`
+    :type cache: TokenCache
+    :return: the score of each review, NaN for the missing ones
+    :rtype: np.ndarray
+    """
+    unique_texts = list(dict.fromkeys(r for r in reviews if isinstance(r, str)))
+    scores = cache.get_many(unique_texts) if cache is not None else {}
+    missing = [text for text in unique_texts if text not in scores]
+    new_scores = score_texts(missing, n_jobs, batch_size)
+    scores.update(zip(missing, new_scores))
+    if cache is not None:
+        cache.set_many(zip(missing, new_scores))
+        print(
+            f"Sentiment cache: {len(unique_texts) - len(missing)} hits, "
+            f"{len(missing)} misses"
+        )
+    return np.array(
+        [scores[r] if isinstance(r, str) else np.nan for r in reviews], dtype=np.float64
+    )
+
+
+def aggregate_sentiment(scores: np.ndarray, lengths: np.ndarray):
+    """
+    Mean and standard deviation of the scores of each recipe, ignoring the missing
+    reviews.
+
+    The sums are accumulated in the order of the reviews, so that the same reviews
+    always give the same values.
+
+    :param scores: the scores of the reviews of all the recipes, one recipe after
+        the other
+    :type scores: np.ndarray
+    :param lengths: the number of reviews of each recipe
+    :type lengths: np.ndarray
+    :return: the mean and the (population) standard deviation of each recipe, NaN
+        for the recipes without review
+    :rtype: tuple(np.ndarray, np.ndarray)
+    """
+    n_recipes = len(lengths)
+    recipes = np.repeat(np.arange(n_recipes), lengths)
+    valid = ~np.isnan(scores)
+    recipes, scores = recipes[valid], scores[valid]
+    counts = np.bincount(recipes, minlength=n_recipes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(recipes, weights=scores, minlength=n_recipes) / counts
+        deviations = (scores - mean[recipes]) ** 2
+        std = np.sqrt(
+            np.bincount(recipes, weights=deviations, minlength=n_recipes) / counts
+        )
+    return mean, std
+
+
+def review_sentiment(
+    review_lists,
+    n_jobs: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: TokenCache = None,
+):
+    """
+    Mean and standard deviation of the sentiment of the reviews of each recipe.
+
+    :param review_lists: the reviews of each recipe
+    :type review_lists: iterable
+    :param n_jobs: the number of processes scoring the reviews
+    :type n_jobs: int
+    :param batch_size: the number of reviews sent to a worker at once
+    :type batch_size: int
+    :param cache: persistent cache of the scores
+    :type cache: TokenCache
+    :return: the mean and the standard deviation of each recipe
+    :rtype: tuple(np.ndarray, np.ndarray)
+    """
+    review_lists = list(review_lists)
+    lengths = np.array([len(reviews) for reviews in review_lists], dtype=np.int64)
+    reviews = [review for reviews in review_lists for review in reviews]
+    scores = score_reviews(reviews, n_jobs, batch_size, cache)
+    return aggregate_sentiment(scores, lengths)
+
+
+def count_reviews(data):
+    """
+    Number of reviews of the recipes, for the throughput of the sentiment stage.
+
+    :param data: the recipes, with their `review` lists
+    :type data: pd.DataFrame
+    :rtype: int
+    """
+    return int(sum(len(reviews) for reviews in data["review"]))
@@ -0,0 +1,411 @@
+"""
+Named stages of the preprocessing pipeline and the on-disk cache of their results.
+
+The cache key of a stage hashes its name, its code (the source of the stage function
+and of the functions, classes and constants of the project it uses), its parameters, the
+content of the files it reads and the keys of the stages producing its inputs. An
+unchanged stage is then loaded from the cache instead of being run, and a change
+anywhere upstream changes the keys of all the stages downstream.
+"""
+
+import os
+import sys
+import glob
+import types
+import pickle
+import marshal
+import hashlib
+import inspect
+import json
+
+import numpy as np
+import pandas as pd
+import nltk
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Pickled results depend on the versions of the libraries
+ENVIRONMENT = [sys.version, pd.__version__, np.__version__, nltk.__version__]
+FILE_BLOCK_SIZE = 1 << 20
+
+
+class Stage:
+    """
+    A step of the pipeline: `function(*inputs, **params, **options)` returns the
+    values named by `outputs` (a tuple when there are several).
+
+    `params` are part of the cache key, `options` must not change the result
+    (number of processes, caches, ...). `files` are the paths the stage reads.
+    `throughput` is a (unit, count) pair, `count(*inputs)` giving the number of
+    items the stage processes, for the throughput reported by the profiler.
+    """
+
+    def __init__(
+        self,
+        name,
+        function,
+        inputs=(),
+        outputs=(),
+        params=None,
+        options=None,
+        files=(),
+        throughput=None,
+    ):
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.options = options or {}
+        self.files = list(files)
+        self.throughput = throughput
+
+    def run(self, values: dict):
+        """
+        Run the stage on its inputs.
+
+        :param values: the values computed so far, by name
+        :type values: dict
+        :return: the outputs of the stage, in the order of `outputs`
+        :rtype: tuple
+        """
+        result = self.function(
+            *[values[name] for name in self.inputs], **self.params, **self.options
+        )
+        if len(self.outputs) == 1:
+            return (result,)
+        return tuple(result)
+
+
+def file_fingerprint(path: str):
+    """
+    Hash of the content of a file.
+
+    :param path: the path of the file
+    :type path: str
+    :return: the sha256 hex digest of the file
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(FILE_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stable_repr(value):
+    """
+    repr of a value that does not depend on the hash seed (sets are sorted).
+
+    :param value: the value
+    :return: the representation
+    :rtype: str
+    """
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(stable_repr(item) for item in value)) + "}"
+    if isinstance(value, dict):
+        items = sorted((stable_repr(k), stable_repr(v)) for k, v in value.items())
+        return "{" + ", ".join(f"{k}: {v}" for k, v in items) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(stable_repr(item) for item in value) + "]"
+    return repr(value)
+
+
+def is_project_code(value):
+    """
+    Tell if a value is a function or a class defined in the project (not in a
+    library).
+
+    :param value: the value
+    :rtype: bool
+    """
+    if isinstance(value, types.FunctionType):
+        path = value.__code__.co_filename
+    elif inspect.isclass(value):
+        path = getattr(sys.modules.get(value.__module__), "__file__", None)
+        if path is None:
+            return False
+    else:
+        return False
+    path = os.path.abspath(path)
+    return path.startswith(ROOT + os.sep) and "site-packages" not in path
+
+
+def class_members(cls: type):
+    """
+    Project functions of a class (methods, static and class methods, properties)
+    and its project base classes.
+
+    :param cls: the class
+    :type cls: type
+    :rtype: list
+    """
+    members = [base for base in cls.__bases__ if is_project_code(base)]
+    for name, value in sorted(vars(cls).items()):
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, property):
+            candidates = [value.fget, value.fset, value.fdel]
+        else:
+            candidates = [value]
+        members += [member for member in candidates if is_project_code(member)]
+    return members
+
+
+def code_names(code: types.CodeType):
+    """
+    Global names used by a code object and the functions nested in it.
+
+    :param code: the code object
+    :type code: types.CodeType
+    :rtype: set
+    """
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= code_names(constant)
+    return names
+
+
+def code_source(code):
+    """
+    Source of a function or a class, or the bytecode of the function (the name of
+    the class, its methods being hashed on their own) when the source is not
+    available.
+
+    :param code: the function or the class
+    :rtype: str
+    """
+    try:
+        return inspect.getsource(code)
+    except (OSError, TypeError):
+        if inspect.isclass(code):
+            return f"{code.__module__}.{code.__qualname__}"
+        return marshal.dumps(code.__code__).hex()
+
+
+def code_fingerprint(function):
+    """
+    Hash of the code of a function, of the project functions and classes it calls,
+    wraps or holds instances of (recursively, methods included) and of the
+    constants it reads.
+
+    :param function: the function
+    :return: the sha256 hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    seen = set()
+    stack = [function]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        digest.update(code_source(current).encode("utf-8"))
+        if inspect.isclass(current):
+            stack.extend(class_members(current))
+            continue
+        for cell in current.__closure__ or ():
+            if is_project_code(cell.cell_contents):
+                stack.append(cell.cell_contents)
+            elif is_project_code(type(cell.cell_contents)):
+                stack.append(type(cell.cell_contents))
+        for name in sorted(code_names(current.__code__)):
+            if name not in current.__globals__:
+                continue
+            value = current.__globals__[name]
+            if is_project_code(value):
+                stack.append(value)
+            elif is_project_code(type(value)):
+                stack.append(type(value))
+            elif isinstance(
+                value, (str, int, float, bool, tuple, list, dict, set, frozenset)
+            ):
+                digest.update(f"{name}={stable_repr(value)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stage_keys(stages: list):
+    """
+    Compute the cache key of every stage, in order.
+
+    :param stages: the stages, each one after the stages producing its inputs
+    :type stages: list
+    :raises ValueError: if an input is not produced by a previous stage
+    :return: the key of each stage, by name
+    :rtype: dict
+    """
+    keys = {}
+    producers = {}
+    for stage in stages:
+        for name in stage.inputs:
+            if name not in producers:
+                raise ValueError(
+                    f"Input {name} of stage {stage.name} is not produced before it."
+                )
+        description = {
+            "environment": ENVIRONMENT,
+            "name": stage.name,
+            "code": code_fingerprint(stage.function),
+            "params": stable_repr(stage.params),
+            "inputs": [[name, keys[producers[name]]] for name in stage.inputs],
+            "files": [file_fingerprint(path) for path in stage.files],
+        }
+        keys[stage.name] = hashlib.sha256(
+            json.dumps(description, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        for name in stage.outputs:
+            producers[name] = stage.name
+    return keys
+
+
+def downstream_stages(stages: list, from_stage: str):
+    """
+    A stage and all the stages depending on it, directly or not.
+
+    :param stages: the stages, each one after the stages producing its inputs
+    :type stages: list
+    :param from_stage: the name of the first stage
+    :type from_stage: str
+    :raises ValueError: if no stage has this name
+    :rtype: set
+    """
+    names = [stage.name for stage in stages]
+    if from_stage not in names:
+        raise ValueError(f"Unknown stage: {from_stage}. Available: {names}")
+    forced = {from_stage}
+    forced_outputs = set()
+    for stage in stages:
+        if stage.name in forced or forced_outputs.intersection(stage.inputs):
+            forced.add(stage.name)
+            forced_outputs.update(stage.outputs)
+    return forced
+
+
+class StageCache:
+    """
+    Directory of pickled stage results, one file per stage and key. Only the last
+    result of each stage is kept.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def __path(self, name: str, key: str):
+        return os.path.join(self.directory, f"{name}-{key}.pkl")
+
+    def contains(self, name: str, key: str):
+        """
+        Tell if the result of a stage is in the cache.
+
+        :param name: the name of the stage
+        :param key: the key of the stage
+        :rtype: bool
+        """
+        return os.path.exists(self.__path(name, key))
+
+    def load(self, name: str, key: str):
+        """
+        Load the result of a stage.
+
+        :param name: the name of the stage
+        :param key: the key of the stage
+        :return: the outputs of the stage, None if they are not in the cache
+        :rtype: tuple
+        """
+        path = self.__path(name, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+    def save(self, name: str, key: str, outputs: tuple):
+        """
+        Save the result of a stage and delete its previous results.
+
+        :param name: the name of the stage
+        :param key: the key of the stage
+        :param outputs: the outputs of the stage
+        :type outputs: tuple
+        """
+        path = self.__path(name, key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(outputs, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        for old_path in glob.glob(os.path.join(glob.escape(self.directory), f"{name}-*.pkl")):
+            if old_path != path:
+                os.remove(old_path)
+
+
+def run_stages(
+    stages: list,
+    targets: list,
+    cache: StageCache = None,
+    from_stage: str = None,
+    profiler=None,
+):
+    """
+    Compute the target values, running only the stages they need.
+
+    With a cache, a stage whose key is in the cache is loaded instead of being run,
+    unless it is `from_stage` or downstream of it.
+
+    :param stages: the stages, each one after the stages producing its inputs
+    :type stages: list
+    :param targets: the names of the values to compute
+    :type targets: list
+    :param cache: the cache of the stage results, none by default
+    :type cache: StageCache
+    :param from_stage: run this stage and the stages downstream even if cached
+    :type from_stage: str
+    :param profiler: records the measures of each stage run or loaded, see
+        `scripts.stage_profiler.StageProfiler`, none by default
+    :return: the target values, in order
+    :rtype: list
+    """
+    producers = {name: stage for stage in stages for name in stage.outputs}
+    forced = set()
+    if from_stage is not None:
+        forced = downstream_stages(stages, from_stage)
+    keys = stage_keys(stages) if cache is not None else {}
+    values = {}
+    done = set()
+
+    def call(stage, function, cached):
+        if profiler is None:
+            return function()
+        inputs = [] if cached else [values[name] for name in stage.inputs]
+        items = None
+        if not cached and stage.throughput is not None:
+            unit, count = stage.throughput
+            items = (unit, count(*inputs))
+        return profiler.measure(stage.name, function, inputs, cached, items)
+
+    def compute(stage):
+        if stage.name in done:
+            return
+        outputs = None
+        if (
+            cache is not None
+            and stage.name not in forced
+            and cache.contains(stage.name, keys[stage.name])
+        ):
+            outputs = call(
+                stage, lambda: cache.load(stage.name, keys[stage.name]), cached=True
+            )
+            print(f"Stage {stage.name}: loaded from the cache")
+        if outputs is None:
+            for name in stage.inputs:
+                compute(producers[name])
+            print(f"Stage {stage.name}: running")
+            outputs = call(stage, lambda: stage.run(values), cached=False)
+            if cache is not None:
+                cache.save(stage.name, keys[stage.name], outputs)
+        values.update(zip(stage.outputs, outputs))
+        done.add(stage.name)
+
+    for name in targets:
+        compute(producers[name])
+    return [values[name] for name in targets]
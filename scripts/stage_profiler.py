@@ -0,0 +1,271 @@
+"""
+Profiling of the stages of the preprocessing pipeline.
+
+For each stage the profiler records the wall and CPU time (including the worker
+processes it waited for), the peak RSS reached above the RSS at its start, and
+the rows and memory of the DataFrames it receives and returns, and for the stages
+counting the items they process, their throughput. The report is
+written as JSON and as a text table, and the slowest stage can be kept as a
+cProfile dump.
+"""
+
+import os
+import time
+import json
+import cProfile
+import pstats
+import threading
+
+import pandas as pd
+import psutil
+
+# Seconds between two RSS samples while a stage runs
+RSS_INTERVAL = 0.01
+
+
+class PeakRss:
+    """
+    Context manager sampling the RSS of the process in a thread, to get its peak
+    while a block runs.
+    """
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start = 0
+        self.peak = 0
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def __sample(self):
+        while not self.__stop.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.start = self.peak = self.process.memory_info().rss
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__sample, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__stop.set()
+        self.__thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return False
+
+    @property
+    def delta(self):
+        """Peak RSS above the RSS at the start of the block, in bytes."""
+        return self.peak - self.start
+
+
+def frames(values):
+    """
+    The DataFrames and Series among some values.
+
+    :param values: the values
+    :type values: iterable
+    :rtype: list
+    """
+    return [value for value in values if isinstance(value, (pd.DataFrame, pd.Series))]
+
+
+def frame_rows(values):
+    """
+    Total number of rows of the DataFrames among some values.
+
+    :param values: the values
+    :type values: iterable
+    :return: the number of rows, None if there is no DataFrame
+    :rtype: int
+    """
+    found = frames(values)
+    if not found:
+        return None
+    return sum(len(frame) for frame in found)
+
+
+def frame_memory(values):
+    """
+    Total memory of the DataFrames among some values, strings and lists included.
+
+    :param values: the values
+    :type values: iterable
+    :return: the memory in bytes, None if there is no DataFrame
+    :rtype: int
+    """
+    found = frames(values)
+    if not found:
+        return None
+    total = 0
+    for frame in found:
+        usage = frame.memory_usage(index=True, deep=True)
+        total += int(usage.sum() if isinstance(frame, pd.DataFrame) else usage)
+    return total
+
+
+def cpu_time():
+    """
+    CPU time of the process and of its terminated children, in seconds.
+
+    :rtype: float
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageProfiler:
+    """
+    Measures of the stages of a run, in the order they ran.
+
+    With `cprofile`, every stage also runs under cProfile (its times then include
+    the overhead of cProfile) and the statistics of the slowest one are kept.
+    """
+
+    def __init__(self, cprofile: bool = False):
+        self.cprofile = cprofile
+        self.records = []
+        self.slowest_stats = None
+
+    def measure(
+        self, name: str, function, inputs=(), cached: bool = False, items=None
+    ):
+        """
+        Run a stage and record its measures.
+
+        :param name: the name of the stage
+        :type name: str
+        :param function: runs the stage without arguments and returns its outputs
+        :param inputs: the values the stage receives
+        :type inputs: list
+        :param cached: whether the outputs are loaded from the stage cache
+        :type cached: bool
+        :param items: the unit and the number of the items the stage processes,
+            none by default
+        :type items: tuple
+        :return: the outputs of the stage, as returned by `function`
+        """
+        profile = cProfile.Profile() if self.cprofile else None
+        # Counted before the run, some stages filter their inputs in place
+        rows_in = frame_rows(inputs)
+        with PeakRss() as rss:
+            wall_start = time.perf_counter()
+            cpu_start = cpu_time()
+            if profile is not None:
+                outputs = profile.runcall(function)
+            else:
+                outputs = function()
+            cpu = cpu_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+        values = outputs if isinstance(outputs, tuple) else (outputs,)
+        unit, count = items if items is not None else (None, None)
+        self.records.append(
+            {
+                "stage": name,
+                "cached": cached,
+                "wall_time": wall,
+                "cpu_time": cpu,
+                "peak_rss_delta": rss.delta,
+                "rows_in": rows_in,
+                "rows_out": frame_rows(values),
+                "memory_out": frame_memory(values),
+                "items": count,
+                "unit": unit,
+                "throughput": count / wall if count is not None and wall > 0 else None,
+            }
+        )
+        if profile is not None and not cached and self.slowest()["stage"] == name:
+            self.slowest_stats = (name, pstats.Stats(profile))
+        return outputs
+
+    def slowest(self):
+        """
+        The record of the slowest stage that was run (not loaded from the cache).
+
+        :return: the record, None if no stage was run
+        :rtype: dict
+        """
+        ran = [record for record in self.records if not record["cached"]]
+        if not ran:
+            return None
+        return max(ran, key=lambda record: record["wall_time"])
+
+    def dump_slowest(self, path: str):
+        """
+        Write the cProfile statistics of the slowest stage.
+
+        :param path: the path of the statistics, readable with `pstats`
+        :type path: str
+        :return: the name of the stage, None if it was not profiled
+        :rtype: str
+        """
+        if self.slowest_stats is None:
+            return None
+        name, stats = self.slowest_stats
+        stats.dump_stats(path)
+        return name
+
+    def table(self):
+        """
+        The measures as a text table, with the total of the times.
+
+        :rtype: str
+        """
+
+        def megabytes(value):
+            return "" if value is None else f"{value / 2**20:.1f}"
+
+        def count(value):
+            return "" if value is None else str(value)
+
+        def throughput(record):
+            if record["throughput"] is None:
+                return ""
+            return f"{record['throughput']:.0f} {record['unit']}/s"
+
+        lines = [
+            f"{'stage':<18}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MB)':>15}"
+            f"{'rows in':>10}{'rows out':>10}{'memory (MB)':>13}{'throughput':>22}"
+        ]
+        for record in self.records:
+            name = record["stage"] + (" (cache)" if record["cached"] else "")
+            lines.append(
+                f"{name:<18}{record['wall_time']:>10.3f}{record['cpu_time']:>10.3f}"
+                f"{megabytes(record['peak_rss_delta']):>15}"
+                f"{count(record['rows_in']):>10}{count(record['rows_out']):>10}"
+                f"{megabytes(record['memory_out']):>13}{throughput(record):>22}"
+            )
+        lines.append(
+            f"{'total':<18}{sum(r['wall_time'] for r in self.records):>10.3f}"
+            f"{sum(r['cpu_time'] for r in self.records):>10.3f}"
+        )
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """
+        Write the measures as JSON to `path` and as a text table next to it (same
+        path with the .txt extension).
+
+        :param path: the path of the JSON report
+        :type path: str
+        :return: the text table
+        :rtype: str
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        slowest = self.slowest()
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "stages": self.records,
+                    "slowest": None if slowest is None else slowest["stage"],
+                },
+                file,
+                indent=2,
+            )
+        table = self.table()
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as file:
+            file.write(table + "\n")
+        return table
@@ -0,0 +1,199 @@
+"""
+Persistent caches of the preprocessing pipeline: the cleaned token lists of the
+texts and the sentiment scores of the reviews.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+# Maximum number of keys in one SQL "IN" clause
+SQL_BATCH_SIZE = 900
+
+
+def text_key(text: str):
+    """
+    Content hash of a text, used as cache key.
+
+    :param text: the text
+    :type text: str
+    :return: the sha256 hex digest of the text
+    :rtype: str
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    SQLite backed cache mapping the content hash of a text to a JSON value computed
+    from it: its cleaned tokens by default, or e.g. its sentiment score. The
+    entries are stored in the table `table`, one file can hold several caches.
+
+    The cache is tied to a fingerprint of the settings computing the values
+    (stopwords, POS filter, library version, ...): opening it with another
+    fingerprint empties it. When it holds more than `max_entries` texts, the least
+    recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fingerprint: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        table: str = "tokens",
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be strictly positive.")
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.__create_table()
+        self.__check_fingerprint()
+        # Logical clock giving the recency order of the entries
+        self.clock = self.connection.execute(
+            f"SELECT COALESCE(MAX(last_used), 0) FROM {table}"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute(
+            f"SELECT COUNT(*) FROM {self.table}"
+        ).fetchone()[0]
+
+    def __create_table(self):
+        """
+        Create the table of the entries, replacing a table of another layout (the
+        token caches written before the values were generalized).
+        """
+        columns = [
+            row[1]
+            for row in self.connection.execute(f"PRAGMA table_info({self.table})")
+        ]
+        with self.connection:
+            if columns and columns != ["key", "value", "last_used"]:
+                self.connection.execute(f"DROP TABLE {self.table}")
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_last_used "
+                f"ON {self.table} (last_used)"
+            )
+
+    def __tick(self):
+        """
+        Advance the logical clock.
+
+        :return: the new time
+        :rtype: int
+        """
+        self.clock += 1
+        return self.clock
+
+    def __check_fingerprint(self):
+        """
+        Empty the cache if it was filled with other settings.
+        """
+        meta_key = f"{self.table} fingerprint"
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (meta_key,)
+        ).fetchone()
+        if row is None or row[0] != self.fingerprint:
+            with self.connection:
+                self.connection.execute(f"DELETE FROM {self.table}")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                    (meta_key, self.fingerprint),
+                )
+
+    def get_many(self, texts: list):
+        """
+        Get the cached values of the texts and mark them as recently used.
+
+        :param texts: the texts to look up
+        :type texts: list
+        :return: the values of the texts found in the cache, by text
+        :rtype: dict
+        """
+        keys = {text_key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        now = self.__tick()
+        with self.connection:
+            for i in range(0, len(key_list), SQL_BATCH_SIZE):
+                batch = key_list[i : i + SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, value FROM {self.table} "
+                    f"WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, value in rows:
+                    found[keys[key]] = json.loads(value)
+                self.connection.execute(
+                    f"UPDATE {self.table} SET last_used = ? "
+                    f"WHERE key IN ({placeholders})",
+                    [now] + batch,
+                )
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        """
+        Store the values of the texts, then evict the least recently used entries.
+
+        :param items: pairs of (text, value), the values must be serializable to JSON
+        :type items: iterable
+        """
+        now = self.__tick()
+        rows = [(text_key(text), json.dumps(value), now) for text, value in items]
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", rows
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries above `max_entries`.
+
+        :return: the number of deleted entries
+        :rtype: int
+        """
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        with self.connection:
+            self.connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        return excess
+
+    def close(self):
+        """
+        Close the connection to the cache file.
+        """
+        self.connection.close()
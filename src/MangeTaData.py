@@ -7,7 +7,11 @@ import streamlit as st
 import pandas as pd
 import logging
 from logging_config import setup_logging
-from utils.load_functions import initialize_recipes_df, load_css
+from utils.load_functions import load_css
+from utils.lazy_dataset import start_prefetch
+from utils.page_timing import page_start, log_first_paint
+
+start = page_start()
 
 st.set_page_config(page_title="MangeTaData", page_icon="images/favicon_mangetadata.png", layout="wide")
 
@@ -19,9 +23,9 @@ logger = logging.getLogger(os.path.basename(__file__))
 # Charger les styles CSS
 load_css("src/style.css")
 
-# Initialiser les donnees dans l'etat de session
-if "recipes_df" not in st.session_state:
-    st.session_state["recipes_df"] = initialize_recipes_df("data/clean_cloud_df.csv")
+# Chargement des donnees en arriere-plan : la page d'accueil ne les utilise pas,
+# les autres pages attendent la fin du chargement
+start_prefetch("data/clean_cloud_df.csv")
 
 
 def main():
@@ -30,6 +34,7 @@ def main():
     with col2:
       st.image("images/MangeTaData.png")
     st.title("Mange ta main")
+    log_first_paint("MangeTaData", start)
 
     st.markdown(
         """
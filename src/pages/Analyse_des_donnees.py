@@ -8,15 +8,15 @@ import streamlit as st
 from utils.bivariate_study import BivariateStudy
 from utils.univariate_study import UnivariateStudy
 from pandas import Timestamp
-from utils.load_functions import compute_trend, load_df, initialize_recipes_df, load_css
+from utils.load_functions import compute_trend, load_df, load_css
+from utils.lazy_dataset import lazy_recipes
+from utils.page_timing import page_start, log_first_paint
 
 st.set_page_config(page_title="MangeTaData", page_icon="images/favicon_mangetadata.png", layout="wide")
 
 logger = logging.getLogger(os.path.basename(__file__))
 
-
-if "recipes_df" not in st.session_state:
-    st.session_state["recipes_df"] = initialize_recipes_df("data/clean_cloud_df.csv")
+start = page_start()
 
 if "first_load" not in st.session_state:
     st.session_state["first_load"] = True
@@ -31,6 +31,11 @@ def main():
     """
     st.title("Analyse des data")
     load_css("src/style.css")
+    log_first_paint("Analyse des données", start)
+
+    # Attend le chargement lancé en arrière-plan, sous le titre de la page
+    if "recipes_df" not in st.session_state:
+        st.session_state["recipes_df"] = lazy_recipes("data/clean_cloud_df.csv")
 
     try:
         # Creation of all the graphs displayed in the page
@@ -12,11 +12,14 @@ from utils.bivariate_study import BivariateStudy
 from utils.univariate_study import UnivariateStudy
 import pandas as pd
 import ast
-from utils.load_functions import initialize_recipes_df, load_css
+from utils.load_functions import load_css
+from utils.lazy_dataset import lazy_recipes
+from utils.page_timing import page_start, log_first_paint
 import logging
 import os
 
 logger = logging.getLogger(os.path.basename(__file__))
+start = page_start()
 
 st.set_page_config(page_title="MangeTaData", page_icon="images/favicon_mangetadata.png", layout="wide")
 
@@ -25,6 +28,7 @@ st.set_page_config(page_title="MangeTaData", page_icon="images/favicon_mangetada
 load_css("src/style.css")
 
 st.title("Analyse interactive des données")
+log_first_paint("DataViz", start)
 
 st.write("Cette page vous permet d'explorer et de visualiser les données de manière interactive. Voici comment vous pouvez l'utiliser :")
 
@@ -75,7 +79,7 @@ if "graph" not in st.session_state:
     st.session_state["graph"] = []
 
 if "recipes_df" not in st.session_state:
-    st.session_state["recipes_df"] = initialize_recipes_df("data/clean_cloud_df.csv")
+    st.session_state["recipes_df"] = lazy_recipes("data/clean_cloud_df.csv")
 
 if "count_graph_total" not in st.session_state:
     st.session_state["count_graph_total"] = 0
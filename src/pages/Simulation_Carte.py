@@ -13,8 +13,11 @@ import altair as alt
 import logging
 import os
 from utils.load_functions import load_css
+from utils.lazy_dataset import lazy_recipes
+from utils.page_timing import page_start, log_first_paint
 
 logger = logging.getLogger(os.path.basename(__file__))
+start = page_start()
 st.set_page_config(
     page_title="MangeTaData", page_icon="images/favicon_mangetadata.png", layout="wide"
 )
@@ -43,10 +46,12 @@ def load_geojson(path):
         return gpd.GeoDataFrame()
 
 
-@st.cache_data
 def load_recipes_data(path):
     """
-    Charge les données de recettes soumises et retourne un DataFrame
+    Charge les dates de publication des recettes et retourne un DataFrame. Seule
+    cette colonne est lue, dans le jeu de données partagé par toutes les sessions
+    (voir `lazy_recipes`) : la fonction n'est pas mise en cache, la colonne l'est
+    déjà.
 
     :param path: chemin vers le fichier CSV
     :type path: str
@@ -54,9 +59,9 @@ def load_recipes_data(path):
     :rtype: pd.DataFrame
     """
     try:
-        df = pd.read_csv(path)
-        df["Date de publication de la recette"] = pd.to_datetime(df["Date de publication de la recette"], errors="coerce")
-        df["année"] = df["Date de publication de la recette"].dt.year
+        dates = lazy_recipes(path)["Date de publication de la recette"]
+        df = pd.DataFrame({"Date de publication de la recette": dates}, copy=False)
+        df["année"] = dates.dt.year
         logger.info(f"Données de recettes chargées avec succès depuis {path}.")
         return df
     except Exception as e:
@@ -119,6 +124,7 @@ def generate_random_points(recettes_par_années, _gdf):
 def main():
 
     st.title("Carte Data Food.com au cours des années")
+    log_first_paint("Carte", start)
 
     st.write(
         """
@@ -12,6 +12,7 @@ from matplotlib.colors import LinearSegmentedColormap
 import matplotlib.pyplot as plt
 from matplotlib.colors import LogNorm
 from utils.base_study import BaseStudy
+from utils.ingredients import with_ingredient_names
 
 
 # Créez un logger spécifique pour ce module
@@ -322,7 +323,7 @@ class BivariateStudy(BaseStudy):
                 display_df = display_df.sort_values(by=self.axis_y, ascending=False)[
                     :10
                 ]
-                st.dataframe(display_df, hide_index=True)
+                st.dataframe(with_ingredient_names(display_df), hide_index=True)
         return True
 
     def display_graph(self, free=False, explanation=None):
@@ -0,0 +1,151 @@
+"""
+Ce module contient la réduction des types du DataFrame des recettes : les entiers
+et les flottants prennent la plus petite taille qui garde leurs valeurs, et les
+chaînes souvent répétées deviennent des catégories. Il est utilisé par le pipeline
+de prétraitement et par le chargement des données de l'application.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Une colonne de chaînes devient une catégorie si elle a au plus cette proportion
+# de valeurs distinctes
+CATEGORICAL_RATIO = 0.5
+# Pas d'entiers sur 8 bits : numpy calcule par exemple np.log d'un int8 en float16
+SIGNED_DTYPES = [np.int16, np.int32, np.int64]
+UNSIGNED_DTYPES = [np.uint16, np.uint32, np.uint64]
+REPORT_COLUMNS = [
+    "dtype_before",
+    "dtype_after",
+    "bytes_before",
+    "bytes_after",
+    "bytes_saved",
+]
+
+
+def smallest_integer_dtype(values):
+    """
+    Le plus petit type entier qui contient toutes les valeurs d'une colonne.
+
+    :param values: La colonne d'entiers.
+    :type values: pd.Series
+    :return: Le type, signé seulement si la colonne l'est.
+    :rtype: np.dtype
+    """
+    if pd.api.types.is_unsigned_integer_dtype(values):
+        candidates = UNSIGNED_DTYPES
+    else:
+        candidates = SIGNED_DTYPES
+    if values.empty:
+        return np.dtype(candidates[0])
+    low, high = values.min(), values.max()
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return values.dtype
+
+
+def compact_series(values, categorical_ratio=CATEGORICAL_RATIO):
+    """
+    Réduit le type d'une colonne sans changer ses valeurs.
+
+    Les entiers prennent le plus petit type qui les contient, les float64 deviennent
+    des float32 si toutes leurs valeurs y sont exactes, et les chaînes deviennent
+    une catégorie si elles sont assez répétées. Les autres colonnes (dates, listes,
+    booléens, catégories) sont gardées telles quelles.
+
+    :param values: La colonne.
+    :type values: pd.Series
+    :param categorical_ratio: La proportion maximale de valeurs distinctes d'une
+        colonne de chaînes convertie en catégorie.
+    :type categorical_ratio: float
+    :return: La colonne, avec son nouveau type.
+    :rtype: pd.Series
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype):
+        return values.astype(smallest_integer_dtype(values))
+    if dtype == np.float64:
+        compact = values.to_numpy().astype(np.float32)
+        exact = np.array_equal(
+            compact.astype(np.float64), values.to_numpy(), equal_nan=True
+        )
+        if exact:
+            return pd.Series(compact, index=values.index, name=values.name)
+        return values
+    if dtype == object and len(values) > 0:
+        if pd.api.types.infer_dtype(values, skipna=True) != "string":
+            return values
+        if values.nunique(dropna=True) <= categorical_ratio * len(values):
+            return values.astype("category")
+    return values
+
+
+def compact_dtypes(df, categorical_ratio=CATEGORICAL_RATIO):
+    """
+    Réduit le type de toutes les colonnes d'un DataFrame, voir `compact_series`.
+
+    :param df: Le DataFrame, qui n'est pas modifié.
+    :type df: pd.DataFrame
+    :param categorical_ratio: La proportion maximale de valeurs distinctes d'une
+        colonne de chaînes convertie en catégorie.
+    :type categorical_ratio: float
+    :return: Le DataFrame réduit et le rapport, une ligne par colonne : types et
+        octets avant et après, octets gagnés.
+    :rtype: tuple(pd.DataFrame, pd.DataFrame)
+    """
+    columns = {}
+    rows = []
+    for column in df.columns:
+        before = df[column]
+        after = compact_series(before, categorical_ratio)
+        columns[column] = after
+        bytes_before = int(before.memory_usage(index=False, deep=True))
+        bytes_after = (
+            bytes_before
+            if after is before
+            else int(after.memory_usage(index=False, deep=True))
+        )
+        rows.append(
+            [
+                str(before.dtype),
+                str(after.dtype),
+                bytes_before,
+                bytes_after,
+                bytes_before - bytes_after,
+            ]
+        )
+    compact = pd.DataFrame(columns, index=df.index)
+    report = pd.DataFrame(
+        rows, index=pd.Index(df.columns, name="column"), columns=REPORT_COLUMNS
+    )
+    return compact, report
+
+
+def format_dtype_report(report):
+    """
+    Met en forme le rapport de `compact_dtypes` : les colonnes dont le type a changé
+    et le total.
+
+    :param report: Le rapport.
+    :type report: pd.DataFrame
+    :return: Le rapport sous forme de tableau texte.
+    :rtype: str
+    """
+    lines = [f"{'column':<36}{'before':>16}{'after':>16}{'saved (MB)':>12}"]
+    changed = report[report["dtype_before"] != report["dtype_after"]]
+    for column, row in changed.iterrows():
+        lines.append(
+            f"{column:<36}{row['dtype_before']:>16}{row['dtype_after']:>16}"
+            f"{row['bytes_saved'] / 2**20:>12.2f}"
+        )
+    total_before = report["bytes_before"].sum()
+    total_after = report["bytes_after"].sum()
+    lines.append(
+        f"{'total':<36}{total_before / 2**20:>13.2f} MB{total_after / 2**20:>13.2f} MB"
+        f"{(total_before - total_after) / 2**20:>12.2f}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+"""
+Ce module contient le vocabulaire des ingrédients et leur représentation compacte :
+chaque ingrédient a un identifiant (sa position dans le vocabulaire, trié par ordre
+alphabétique), et les ingrédients des recettes sont une colonne de listes Arrow
+d'int32, c'est-à-dire un seul tableau d'identifiants et les offsets de chaque
+recette. Les comptages se font alors avec des opérations numpy sur les
+identifiants ; les noms ne sont retrouvés que pour l'affichage.
+
+Le vocabulaire est écrit par le pipeline de prétraitement à côté du jeu de données
+(INGREDIENT_VOCABULARY) et gardé par l'application dans les `attrs` du DataFrame
+des recettes (VOCABULARY_ATTR).
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+INGREDIENT_VOCABULARY = "ingredient_vocabulary.csv"
+INGREDIENTS_COLUMN = "Ingrédients"
+VOCABULARY_ATTR = "ingredient_vocabulary"
+INGREDIENT_IDS_TYPE = pa.list_(pa.int32())
+# Identifiant des ingrédients manquants (None dans les listes de noms)
+MISSING_ID = -1
+
+
+def build_vocabulary(name_lists):
+    """
+    Construit le vocabulaire des ingrédients de recettes.
+
+    :param name_lists: Les ingrédients de chaque recette ; les valeurs qui ne sont
+        pas des chaînes (ingrédients manquants) sont ignorées.
+    :type name_lists: iterable
+    :return: Les noms distincts, triés.
+    :rtype: list
+    """
+    return sorted(
+        {name for names in name_lists for name in names if isinstance(name, str)}
+    )
+
+
+def extend_vocabulary(vocabulary, name_lists):
+    """
+    Ajoute à la fin d'un vocabulaire les ingrédients qui n'y sont pas encore, sans
+    changer les identifiants existants.
+
+    :param vocabulary: Le vocabulaire.
+    :type vocabulary: list
+    :param name_lists: Les ingrédients de chaque recette.
+    :type name_lists: iterable
+    :return: Le vocabulaire complété.
+    :rtype: list
+    """
+    known = set(vocabulary)
+    new_names = [name for name in build_vocabulary(name_lists) if name not in known]
+    return list(vocabulary) + new_names
+
+
+def save_vocabulary(path, vocabulary):
+    """
+    Écrit un vocabulaire en CSV, une ligne (id, name) par ingrédient.
+
+    :param path: Le chemin du fichier.
+    :type path: str
+    :param vocabulary: Le vocabulaire.
+    :type vocabulary: list
+    """
+    pd.DataFrame(
+        {"id": np.arange(len(vocabulary), dtype=np.int32), "name": vocabulary}
+    ).to_csv(path, index=False)
+
+
+def load_vocabulary(path):
+    """
+    Lit un vocabulaire écrit par `save_vocabulary`.
+
+    :param path: Le chemin du fichier.
+    :type path: str
+    :raises FileNotFoundError: Si le fichier n'est pas trouvé.
+    :raises ValueError: Si les identifiants ne sont pas 0, 1, 2...
+    :return: Le vocabulaire.
+    :rtype: list
+    """
+    # Des ingrédients comme "null" doivent rester des chaînes
+    table = pd.read_csv(path, keep_default_na=False, dtype={"name": str})
+    if not np.array_equal(table["id"].to_numpy(), np.arange(len(table))):
+        raise ValueError(f"Les identifiants de {path} ne se suivent pas.")
+    return table["name"].tolist()
+
+
+def encode_ingredients(name_lists, vocabulary, index=None):
+    """
+    Convertit les listes de noms d'ingrédients en listes d'identifiants.
+
+    :param name_lists: Les ingrédients de chaque recette.
+    :type name_lists: iterable
+    :param vocabulary: Le vocabulaire.
+    :type vocabulary: list
+    :param index: L'index de la colonne créée.
+    :type index: pd.Index
+    :raises KeyError: Si un ingrédient n'est pas dans le vocabulaire.
+    :return: La colonne des identifiants, les ingrédients manquants étant nuls.
+    :rtype: pd.Series
+    """
+    name_lists = list(name_lists)
+    lengths = np.fromiter((len(names) for names in name_lists), np.int64, len(name_lists))
+    names = [name for names in name_lists for name in names]
+    ids = pd.Index(vocabulary, dtype=object).get_indexer(names)
+    unknown = [name for name, i in zip(names, ids) if i < 0 and isinstance(name, str)]
+    if unknown:
+        raise KeyError(unknown[0])
+    return ids_to_series(ids, np.concatenate(([0], np.cumsum(lengths))), index)
+
+
+def ids_to_series(ids, offsets, index=None):
+    """
+    Construit la colonne de listes Arrow des identifiants.
+
+    :param ids: Les identifiants de toutes les recettes, MISSING_ID pour les
+        ingrédients manquants.
+    :type ids: np.ndarray
+    :param offsets: Le début de chaque recette dans `ids`, et la fin de la dernière.
+    :type offsets: np.ndarray
+    :param index: L'index de la colonne.
+    :type index: pd.Index
+    :rtype: pd.Series
+    """
+    ids = np.asarray(ids, dtype=np.int32)
+    values = pa.array(ids, mask=ids == MISSING_ID, type=pa.int32())
+    lists = pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+    return pd.Series(pd.arrays.ArrowExtensionArray(lists), index=index)
+
+
+def is_ingredient_ids(values):
+    """
+    Indique si une colonne contient des listes d'identifiants.
+
+    :param values: La colonne.
+    :type values: pd.Series
+    :rtype: bool
+    """
+    dtype = values.dtype
+    return isinstance(dtype, pd.ArrowDtype) and dtype.pyarrow_dtype == INGREDIENT_IDS_TYPE
+
+
+def ingredient_arrays(values):
+    """
+    Le tableau des identifiants d'une colonne et ses offsets.
+
+    :param values: La colonne des identifiants.
+    :type values: pd.Series
+    :return: Les identifiants de toutes les recettes (MISSING_ID pour les
+        ingrédients manquants) et le début de chaque recette, suivi de la fin de la
+        dernière.
+    :rtype: tuple(np.ndarray, np.ndarray)
+    """
+    lists = pa.array(values)
+    offsets = lists.offsets.to_numpy().astype(np.int64)
+    ids = lists.flatten().fill_null(MISSING_ID).to_numpy(zero_copy_only=False)
+    return ids.astype(np.int32, copy=False), offsets - offsets[0]
+
+
+def ingredient_lengths(values):
+    """
+    Compte les ingrédients de chaque recette.
+
+    :param values: La colonne des identifiants.
+    :type values: pd.Series
+    :rtype: np.ndarray
+    """
+    return pc.list_value_length(pa.array(values)).to_numpy().astype(np.int64)
+
+
+def decode_ingredients(values, vocabulary):
+    """
+    Retrouve les noms des ingrédients de chaque recette.
+
+    :param values: La colonne des identifiants.
+    :type values: pd.Series
+    :param vocabulary: Le vocabulaire.
+    :type vocabulary: list
+    :return: Les noms de chaque recette, None pour les ingrédients manquants.
+    :rtype: list
+    """
+    ids, offsets = ingredient_arrays(values)
+    # MISSING_ID prend le dernier élément, None
+    names = np.array(list(vocabulary) + [None], dtype=object)[ids].tolist()
+    return [names[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def most_common_ingredients(values, vocabulary, n=None):
+    """
+    Les ingrédients les plus fréquents, dans le même ordre que `Counter.most_common`
+    sur les listes de noms (à égalité, le premier rencontré d'abord). Les
+    ingrédients manquants ne sont pas comptés.
+
+    :param values: La colonne des identifiants.
+    :type values: pd.Series
+    :param vocabulary: Le vocabulaire.
+    :type vocabulary: list
+    :param n: Le nombre d'ingrédients à garder, tous par défaut.
+    :type n: int
+    :return: Les couples (ingrédient, nombre d'occurrences).
+    :rtype: list
+    """
+    ids, _ = ingredient_arrays(values)
+    ids = ids[ids != MISSING_ID]
+    counts = np.bincount(ids, minlength=len(vocabulary))
+    # Ordre de première apparition, puis tri stable par nombre décroissant
+    seen = pd.unique(ids)
+    order = seen[np.argsort(-counts[seen], kind="stable")][:n]
+    return [(vocabulary[i], int(counts[i])) for i in order]
+
+
+def with_ingredient_names(df, vocabulary=None):
+    """
+    Remplace les identifiants des ingrédients d'un DataFrame par leurs noms, pour
+    l'affichage.
+
+    :param df: Le DataFrame, qui n'est pas modifié.
+    :type df: pd.DataFrame
+    :param vocabulary: Le vocabulaire, celui des `attrs` du DataFrame par défaut.
+    :type vocabulary: list
+    :return: Le DataFrame avec les noms, ou `df` s'il n'a pas d'identifiants.
+    :rtype: pd.DataFrame
+    """
+    if INGREDIENTS_COLUMN not in df.columns or not is_ingredient_ids(
+        df[INGREDIENTS_COLUMN]
+    ):
+        return df
+    if vocabulary is None:
+        vocabulary = df.attrs[VOCABULARY_ATTR]
+    df = df.copy()
+    df[INGREDIENTS_COLUMN] = decode_ingredients(df[INGREDIENTS_COLUMN], vocabulary)
+    return df
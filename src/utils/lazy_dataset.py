@@ -0,0 +1,391 @@
+"""
+Ce module contient le jeu de données des recettes à chargement paresseux : seules
+les colonnes demandées par une page sont lues, à leur premier accès, puis gardées
+une par une en mémoire. Les colonnes ont les mêmes noms et les mêmes types qu'avec
+`load_df`.
+
+Les colonnes sont lues depuis l'instantané Arrow du CSV (voir `utils.snapshot`),
+projeté en mémoire, ou directement depuis le fichier Parquet. Un CSV sans
+instantané à jour est chargé une fois en entier par `load_df`, qui écrit
+l'instantané.
+
+Le chargement peut être lancé dès le démarrage de l'application, dans un thread
+(`start_prefetch`) : les pages qui utilisent les recettes n'attendent alors que la
+fin de ce chargement (`lazy_recipes`).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import concurrent.futures
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from utils.dtype_functions import compact_series
+from utils.ingredients import (
+    INGREDIENTS_COLUMN,
+    INGREDIENT_IDS_TYPE,
+    VOCABULARY_ATTR,
+    encode_ingredients,
+    ingredient_lengths,
+)
+from utils.load_functions import (
+    arrow_lists_to_python,
+    freeze_column,
+    load_df,
+    load_ingredient_vocabulary,
+    read_recipes_df,
+    recipes_sources,
+)
+from utils.snapshot import read_snapshot
+from utils.techniques import TECHNIQUES_MASK_COLUMN, popcount
+from utils.time_series import (
+    MONTHLY_COLUMNS,
+    arrow_date_months,
+    date_months,
+    monthly_counts,
+)
+
+logger = logging.getLogger(os.path.basename(__file__))
+
+TECHNIQUES_COLUMN = "Techniques utilisées"
+# Colonnes calculées au chargement, absentes des fichiers Parquet
+INGREDIENT_COUNT_COLUMN = "Nombre d'ingrédients"
+TECHNIQUE_COUNT_COLUMN = "Nombre de techniques utilisées"
+# Colonnes lues d'avance par le préchargement : les axes des graphiques des pages
+PREFETCH_COLUMNS = [
+    "Note moyenne",
+    "Nombre de commentaires",
+    "Date de publication de la recette",
+    "Durée de la recette (minutes)",
+    "Calories",
+    "Nombre d'étapes",
+    INGREDIENT_COUNT_COLUMN,
+    TECHNIQUE_COUNT_COLUMN,
+]
+
+_prefetch_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="recipes-prefetch"
+)
+
+
+class LazyRecipes:
+    """
+    Le jeu de données des recettes, dont les colonnes sont lues à la demande.
+
+    `dataset[column]` renvoie une colonne, `dataset[columns]` un DataFrame de ces
+    seules colonnes et `dataset[mask]` les recettes sélectionnées, avec toutes les
+    colonnes. Les colonnes sont en lecture seule, le jeu de données pouvant être
+    partagé par toutes les sessions (voir `lazy_recipes`).
+    """
+
+    def __init__(self, file_path):
+        """
+        Ouvre le fichier des recettes, sans lire ses colonnes.
+
+        :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
+        :type file_path: str
+        :raises FileNotFoundError: Si le fichier n'est pas trouvé.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        self.file_path = file_path
+        self.__lock = threading.RLock()
+        self.__columns = {}
+        self.__monthly = {}
+        self.__vocabulary = None
+        self.__table = None
+        self.__parquet = None
+        self.__frame = None
+        if file_path.endswith(".parquet"):
+            self.__parquet = pq.ParquetFile(file_path)
+            schema = self.__parquet.schema_arrow
+            self.__length = self.__parquet.metadata.num_rows
+        else:
+            sources = recipes_sources(file_path)
+            self.__table = read_snapshot(file_path, sources)
+            if self.__table is None:
+                frame = load_df(file_path)
+                self.__table = read_snapshot(file_path, sources)
+                if self.__table is None:
+                    # Instantané non écrit : les colonnes viennent du DataFrame
+                    self.__frame = frame
+            if self.__table is not None:
+                schema = self.__table.schema
+                self.__length = self.__table.num_rows
+        if self.__frame is not None:
+            self.__length = len(self.__frame)
+            self.__names = list(self.__frame.columns)
+            self.__vocabulary = self.__frame.attrs.get(VOCABULARY_ATTR)
+        else:
+            self.__names = list(schema.names)
+            for name in [INGREDIENT_COUNT_COLUMN, TECHNIQUE_COUNT_COLUMN]:
+                if name not in self.__names:
+                    self.__names.append(name)
+            if schema.metadata and b"ingredients" in schema.metadata:
+                self.__vocabulary = json.loads(schema.metadata[b"ingredients"])
+
+    @property
+    def columns(self):
+        """
+        Les noms des colonnes, lues ou non.
+
+        :rtype: pd.Index
+        """
+        return pd.Index(self.__names)
+
+    @property
+    def loaded_columns(self):
+        """
+        Les noms des colonnes déjà lues.
+
+        :rtype: list
+        """
+        return list(self.__columns)
+
+    @property
+    def index(self):
+        """
+        L'index des recettes, le même que celui de `load_df`.
+
+        :rtype: pd.Index
+        """
+        if self.__frame is not None:
+            return self.__frame.index
+        return pd.RangeIndex(self.__length)
+
+    @property
+    def empty(self):
+        """
+        Indique si le jeu de données n'a aucune recette ou aucune colonne.
+
+        :rtype: bool
+        """
+        return self.__length == 0 or not self.__names
+
+    @property
+    def vocabulary(self):
+        """
+        Le vocabulaire des ingrédients, en tuple, que pandas ne copie pas en
+        recopiant les `attrs` dans chaque DataFrame dérivé.
+
+        :rtype: tuple
+        """
+        if self.__vocabulary is None:
+            # Fichier Parquet sans identifiants : le vocabulaire est construit en
+            # lisant les ingrédients
+            self.column(INGREDIENTS_COLUMN)
+        return tuple(self.__vocabulary)
+
+    @property
+    def attrs(self):
+        """
+        Les `attrs` du DataFrame de `load_df`, avec le vocabulaire des ingrédients.
+
+        :rtype: dict
+        """
+        if INGREDIENTS_COLUMN not in self.__names:
+            return {}
+        return {VOCABULARY_ATTR: self.vocabulary}
+
+    def __len__(self):
+        return self.__length
+
+    def __contains__(self, column):
+        return column in self.__names
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, (list, tuple, pd.Index)):
+            return self.frame(key)
+        return self.frame()[key]
+
+    def column(self, name):
+        """
+        Une colonne, lue à son premier accès.
+
+        :param name: Le nom de la colonne.
+        :type name: str
+        :raises KeyError: Si la colonne n'existe pas.
+        :rtype: pd.Series
+        """
+        if name not in self.__names:
+            raise KeyError(name)
+        with self.__lock:
+            if name not in self.__columns:
+                values = self.__read_column(name)
+                self.__columns[name] = pd.Series(
+                    freeze_column(values), index=self.index, name=name, copy=False
+                )
+            return self.__columns[name]
+
+    def monthly_series(self, name):
+        """
+        La série mensuelle d'une colonne de dates (voir `utils.time_series`),
+        calculée à son premier accès. La colonne elle-même n'est pas gardée : les
+        dates sont lues directement depuis l'instantané ou le fichier Parquet.
+
+        :param name: Le nom de la colonne des dates.
+        :type name: str
+        :raises KeyError: Si la colonne n'existe pas.
+        :rtype: MonthlySeries
+        """
+        if name not in self.__names:
+            raise KeyError(name)
+        with self.__lock:
+            if name not in self.__monthly:
+                if name in self.__columns or self.__frame is not None:
+                    months = date_months(self.column(name))
+                elif self.__parquet is not None:
+                    months = arrow_date_months(
+                        self.__parquet.read(columns=[name]).column(0)
+                    )
+                else:
+                    months = arrow_date_months(self.__table.column(name))
+                self.__monthly[name] = monthly_counts(months)
+            return self.__monthly[name]
+
+    def frame(self, columns=None):
+        """
+        Un DataFrame de colonnes du jeu de données, sans copie.
+
+        :param columns: Les noms des colonnes, toutes par défaut.
+        :type columns: list
+        :rtype: pd.DataFrame
+        """
+        if columns is None:
+            columns = self.__names
+        df = pd.DataFrame(
+            {name: self.column(name) for name in columns}, index=self.index, copy=False
+        )
+        if INGREDIENTS_COLUMN in df.columns:
+            df.attrs = self.attrs
+        return df
+
+    def __read_column(self, name):
+        """
+        Lit une colonne et la convertit comme `load_df`.
+
+        :param name: Le nom de la colonne.
+        :type name: str
+        :rtype: pd.Series
+        """
+        if self.__frame is not None:
+            return self.__frame[name]
+        if self.__parquet is not None and name not in self.__parquet.schema_arrow.names:
+            return compact_series(pd.Series(self.__count(name)))
+        if self.__parquet is not None:
+            values = self.__parquet.read(columns=[name]).column(0)
+        else:
+            values = self.__table.column(name)
+        logger.info("Colonne lue : %s", name)
+        if name == INGREDIENTS_COLUMN:
+            return self.__ingredients(values)
+        if pa.types.is_list(values.type):
+            return pd.Series(arrow_lists_to_python(values))
+        series = values.to_pandas()
+        if self.__parquet is not None:
+            series = compact_series(series)
+        return series
+
+    def __ingredients(self, values):
+        """
+        La colonne des identifiants des ingrédients.
+
+        :param values: La colonne lue.
+        :type values: pa.ChunkedArray
+        :rtype: pd.Series
+        """
+        if values.type == INGREDIENT_IDS_TYPE:
+            return pd.Series(pd.arrays.ArrowExtensionArray(values.combine_chunks()))
+        name_lists = arrow_lists_to_python(values)
+        self.__vocabulary = load_ingredient_vocabulary(self.file_path, name_lists)
+        return encode_ingredients(name_lists, self.__vocabulary)
+
+    def __count(self, name):
+        """
+        Les colonnes calculées au chargement des fichiers Parquet.
+
+        :param name: Le nom de la colonne.
+        :type name: str
+        :rtype: np.ndarray
+        """
+        if name == INGREDIENT_COUNT_COLUMN:
+            return ingredient_lengths(self.column(INGREDIENTS_COLUMN))
+        if TECHNIQUES_MASK_COLUMN in self.__names:
+            return popcount(self.column(TECHNIQUES_MASK_COLUMN).to_numpy())
+        return self.column(TECHNIQUES_COLUMN).apply(len).to_numpy()
+
+
+def prefetch_recipes(file_path, columns=PREFETCH_COLUMNS):
+    """
+    Ouvre le jeu de données des recettes, lit d'avance ses colonnes les plus
+    utilisées et calcule ses séries mensuelles. Appelée dans un thread par
+    `start_prefetch`.
+
+    :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
+    :type file_path: str
+    :param columns: Les colonnes lues d'avance, quand elles existent.
+    :type columns: list
+    :rtype: LazyRecipes
+    """
+    start = time.perf_counter()
+    dataset = LazyRecipes(file_path)
+    for column in columns:
+        if column in dataset:
+            dataset.column(column)
+    for column in MONTHLY_COLUMNS:
+        if column in dataset:
+            dataset.monthly_series(column)
+    logger.info(
+        "Recettes de '%s' préchargées en %.2f s.", file_path, time.perf_counter() - start
+    )
+    return dataset
+
+
+@st.cache_resource(show_spinner=False)
+def start_prefetch(file_path):
+    """
+    Lance, une fois pour tout le processus, le chargement des recettes dans un
+    thread, sans l'attendre.
+
+    :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
+    :type file_path: str
+    :return: Le résultat à venir de `prefetch_recipes`.
+    :rtype: concurrent.futures.Future
+    """
+    logger.info("Préchargement des recettes de '%s' lancé.", file_path)
+    return _prefetch_executor.submit(prefetch_recipes, file_path)
+
+
+def lazy_recipes(file_path):
+    """
+    Le jeu de données paresseux des recettes, ouvert une fois pour tout le
+    processus et partagé par toutes les sessions.
+
+    Le chargement est celui lancé par `start_prefetch` (il est lancé s'il ne l'a
+    pas été) ; tant qu'il n'est pas terminé, la page affiche un indicateur de
+    chargement. Un chargement en échec (fichier absent ou en cours d'écriture au
+    démarrage) n'est pas gardé : il est relancé à l'appel suivant.
+
+    :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
+    :type file_path: str
+    :return: Le jeu de données, ou un DataFrame vide en cas d'erreur.
+    :rtype: LazyRecipes
+    """
+    future = start_prefetch(file_path)
+    if future.done() and future.exception() is not None:
+        logger.warning(
+            "Nouveau chargement des recettes de '%s' après un échec.", file_path
+        )
+        start_prefetch.clear()
+        future = start_prefetch(file_path)
+    if not future.done():
+        with st.spinner("Chargement des recettes..."):
+            concurrent.futures.wait([future])
+    return read_recipes_df(file_path, loader=lambda path: future.result())
@@ -0,0 +1,137 @@
+"""
+Ce module contient un parseur rapide des listes écrites sous forme de texte dans les
+fichiers CSV (`"['salt', 'pepper']"`, `"[51.5, 0.0]"`), utilisé à la place de
+`ast.literal_eval` par le pipeline de prétraitement et par l'application.
+"""
+
+import re
+import ast
+import pandas as pd
+
+# Chaîne entre apostrophes ou entre guillemets, telle qu'écrite par repr
+STRING = (
+    r"'([^'\\\n\r\0]*(?:\\.[^'\\\n\r\0]*)*)'"
+    r"|\"([^\"\\\n\r\0]*(?:\\.[^\"\\\n\r\0]*)*)\""
+)
+NUMBER = (
+    r"-?(?:[0-9]+\.[0-9]*(?:[eE][-+]?[0-9]+)?|\.[0-9]+(?:[eE][-+]?[0-9]+)?"
+    r"|[0-9]+[eE][-+]?[0-9]+|0|[1-9][0-9]*)"
+)
+
+
+def list_pattern(element):
+    """
+    Construit l'expression régulière d'une liste dont tous les éléments suivent
+    le motif donné.
+
+    :param element: Le motif d'un élément.
+    :type element: str
+    :return: L'expression régulière compilée de la liste complète.
+    :rtype: re.Pattern
+    """
+    element = f"(?:{element})"
+    return re.compile(rf"\[ *(?:{element}(?: *, *{element})* *,? *)?\][ \t\r\n]*")
+
+
+STRING_LIST = list_pattern(STRING)
+NUMBER_LIST = list_pattern(NUMBER)
+STRING_ELEMENT = re.compile(STRING)
+NUMBER_ELEMENT = re.compile(NUMBER)
+ESCAPE = re.compile(r"\\(.)")
+# Échappements produits par repr sur du texte courant
+ESCAPES = {"\\": "\\", "'": "'", '"': '"', "n": "\n", "t": "\t", "r": "\r"}
+
+
+class UnsupportedEscape(Exception):
+    """
+    Séquence d'échappement que le parseur rapide ne traite pas.
+    """
+
+
+def unescape(text):
+    """
+    Remplace les séquences d'échappement d'une chaîne par leurs caractères.
+
+    :param text: Le contenu de la chaîne, sans les délimiteurs.
+    :type text: str
+    :raises UnsupportedEscape: Si une séquence n'est pas dans ESCAPES.
+    :return: La chaîne décodée.
+    :rtype: str
+    """
+
+    def replace(match):
+        try:
+            return ESCAPES[match.group(1)]
+        except KeyError as e:
+            raise UnsupportedEscape(match.group(0)) from e
+
+    return ESCAPE.sub(replace, text)
+
+
+def parse_number(token):
+    """
+    Convertit un nombre écrit comme un littéral Python.
+
+    :param token: Le nombre.
+    :type token: str
+    :return: Un float s'il contient un point ou un exposant, un int sinon.
+    :rtype: int ou float
+    """
+    if "." in token or "e" in token or "E" in token:
+        return float(token)
+    return int(token)
+
+
+def parse_list(text):
+    """
+    Convertit le texte d'une liste de chaînes ou d'une liste de nombres en liste
+    Python, avec le même résultat que `ast.literal_eval`.
+
+    Les textes que le parseur rapide ne reconnaît pas (listes imbriquées ou mixtes,
+    échappements rares, valeurs manquantes, ...) sont confiés à `ast.literal_eval`,
+    qui lève les mêmes erreurs qu'avant pour les cellules mal formées.
+
+    :param text: Le texte de la liste.
+    :type text: str
+    :return: La liste.
+    :rtype: list
+    """
+    if isinstance(text, str):
+        if STRING_LIST.fullmatch(text):
+            if "\\" not in text:
+                return [
+                    single + double for single, double in STRING_ELEMENT.findall(text)
+                ]
+            try:
+                return [
+                    unescape(single + double)
+                    for single, double in STRING_ELEMENT.findall(text)
+                ]
+            except UnsupportedEscape:
+                pass
+        elif NUMBER_LIST.fullmatch(text):
+            return [parse_number(token) for token in NUMBER_ELEMENT.findall(text)]
+    return ast.literal_eval(text)
+
+
+def parse_list_column(values):
+    """
+    Convertit une colonne entière de listes écrites sous forme de texte.
+
+    Chaque texte distinct n'est analysé qu'une fois ; chaque ligne reçoit sa propre
+    copie de la liste, comme avec `ast.literal_eval` appliqué cellule par cellule.
+
+    :param values: La colonne à convertir.
+    :type values: pd.Series
+    :return: La colonne de listes, avec le même index.
+    :rtype: pd.Series
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = [parse_list(text) for text in uniques]
+    return pd.Series(
+        [list(parsed[code]) for code in codes],
+        index=values.index,
+        name=values.name,
+        dtype=object,
+    )
@@ -3,15 +3,36 @@ Ce module contient des fonctions pour charger des fichiers, manipuler des donné
 """
 
 import os
-import ast
+import json
 import logging
 import pandas as pd
-import statsmodels.api as sm
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import streamlit as st
 import base64 
+from utils.list_parser import parse_list_column
+from utils.dtype_functions import compact_dtypes, format_dtype_report
+from utils.techniques import TECHNIQUES_MASK_COLUMN, popcount
+from utils.ingredients import (
+    INGREDIENT_VOCABULARY,
+    INGREDIENTS_COLUMN,
+    INGREDIENT_IDS_TYPE,
+    VOCABULARY_ATTR,
+    build_vocabulary,
+    extend_vocabulary,
+    load_vocabulary,
+    encode_ingredients,
+    ingredient_lengths,
+)
+from utils.snapshot import read_snapshot, source_key, write_snapshot
+from utils.time_series import SUBMISSION_DATES_COLUMN, monthly_series, seasonal_components
 
 logger = logging.getLogger(os.path.basename(__file__))
 
+# Mémoire au-delà de laquelle le DataFrame des recettes est signalé dans les logs
+MEMORY_BUDGET_MB = 256
+
 
 def load_csv(file_path):
     """
@@ -75,22 +96,254 @@ def load_background():
     return True
 
 
-def load_df(file_path):
+def compact_recipes_df(df, memory_budget_mb=MEMORY_BUDGET_MB):
+    """
+    Réduit les types du DataFrame des recettes et journalise les octets gagnés
+    par colonne.
+
+    :param df: Le DataFrame des recettes.
+    :type df: pd.DataFrame
+    :param memory_budget_mb: La mémoire attendue du DataFrame, en Mo ; un
+        avertissement est journalisé au-delà.
+    :type memory_budget_mb: float
+    :return: Le DataFrame réduit.
+    :rtype: pd.DataFrame
+    """
+    df, report = compact_dtypes(df)
+    logger.info("Réduction des types :\n%s", format_dtype_report(report))
+    memory_mb = report["bytes_after"].sum() / 2**20
+    if memory_mb > memory_budget_mb:
+        logger.warning(
+            "Le DataFrame des recettes occupe %.1f Mo, au-delà du budget de %.1f Mo.",
+            memory_mb,
+            memory_budget_mb,
+        )
+    return df
+
+
+def load_ingredient_vocabulary(file_path, name_lists):
+    """
+    Le vocabulaire des ingrédients d'un jeu de données : celui écrit par le pipeline
+    dans le dossier du fichier, complété des ingrédients qu'il ne contient pas, ou à
+    défaut celui des ingrédients du jeu de données.
+
+    :param file_path: Le chemin du jeu de données.
+    :type file_path: str
+    :param name_lists: Les ingrédients de chaque recette.
+    :type name_lists: pd.Series
+    :return: Le vocabulaire.
+    :rtype: list
+    """
+    path = os.path.join(os.path.dirname(file_path), INGREDIENT_VOCABULARY)
+    if os.path.exists(path):
+        return extend_vocabulary(load_vocabulary(path), name_lists)
+    return build_vocabulary(name_lists)
+
+
+def recipes_sources(file_path):
+    """
+    Les fichiers dont provient le DataFrame des recettes chargé par `load_df` : le
+    fichier lui-même et, s'il existe, le vocabulaire des ingrédients à côté.
+
+    :param file_path: Le chemin du fichier CSV.
+    :type file_path: str
+    :rtype: list
+    """
+    vocabulary_path = os.path.join(os.path.dirname(file_path), INGREDIENT_VOCABULARY)
+    if os.path.exists(vocabulary_path):
+        return [file_path, vocabulary_path]
+    return [file_path]
+
+
+def save_recipes_snapshot(df, file_path, keys):
+    """
+    Écrit l'instantané du DataFrame des recettes à côté du fichier CSV (voir
+    `utils.snapshot`). Une erreur d'écriture (dossier en lecture seule, colonne
+    non convertible en Arrow) est journalisée sans interrompre le chargement.
+
+    :param df: Le DataFrame chargé par `load_df`.
+    :type df: pd.DataFrame
+    :param file_path: Le chemin du fichier CSV.
+    :type file_path: str
+    :param keys: Les clés des fichiers sources, calculées avant de les lire.
+    :type keys: list
+    """
+    try:
+        # Les ingrédients sont ajoutés hors des métadonnées pandas, dont pyarrow
+        # ne sait pas relire le type ArrowDtype des listes
+        table = pa.Table.from_pandas(df.drop(columns=INGREDIENTS_COLUMN))
+        table = table.add_column(
+            df.columns.get_loc(INGREDIENTS_COLUMN),
+            INGREDIENTS_COLUMN,
+            pa.array(df[INGREDIENTS_COLUMN]),
+        )
+        metadata = dict(table.schema.metadata)
+        metadata[b"ingredients"] = json.dumps(list(df.attrs[VOCABULARY_ATTR]))
+        path = write_snapshot(table.replace_schema_metadata(metadata), file_path, keys)
+        logger.info("Instantané écrit : %s", path)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Instantané de %s non écrit : %s", file_path, e)
+
+
+def load_recipes_snapshot(file_path, sources):
+    """
+    Relit le DataFrame des recettes depuis son instantané, s'il est à jour.
+
+    Les colonnes numériques et les dates restent dans le fichier projeté en
+    mémoire (elles sont donc en lecture seule) ; seules les listes autres que les
+    ingrédients sont converties en listes Python, comme avec `load_df`.
+
+    :param file_path: Le chemin du fichier CSV.
+    :type file_path: str
+    :param sources: Les fichiers dont provient le DataFrame.
+    :type sources: list
+    :return: Le DataFrame, ou None s'il n'y a pas d'instantané à jour.
+    :rtype: pd.DataFrame
+    """
+    table = read_snapshot(file_path, sources)
+    if table is None:
+        return None
+    vocabulary = json.loads(table.schema.metadata[b"ingredients"])
+    list_columns = [
+        field.name
+        for field in table.schema
+        if pa.types.is_list(field.type) and field.name != INGREDIENTS_COLUMN
+    ]
+    df = table.drop_columns(list_columns).to_pandas(
+        split_blocks=True,
+        types_mapper=lambda t: pd.ArrowDtype(t) if t == INGREDIENT_IDS_TYPE else None,
+    )
+    for column in list_columns:
+        df.insert(
+            table.column_names.index(column),
+            column,
+            arrow_lists_to_python(table.column(column)),
+        )
+    df.attrs[VOCABULARY_ATTR] = vocabulary
+    logger.info("DataFrame relu depuis l'instantané de %s", file_path)
+    return df
+
+
+def load_df(file_path, snapshot=True):
     """
     Charge un fichier CSV, applique des transformations
     sur les colonnes et retourne un DataFrame pandas.
 
+    Les ingrédients sont gardés sous forme d'identifiants int32 (voir
+    `utils.ingredients`), le vocabulaire étant dans `df.attrs[VOCABULARY_ATTR]`.
+
+    Le premier chargement écrit un instantané binaire du résultat à côté du
+    fichier ; les suivants le relisent, tant que le fichier et le vocabulaire des
+    ingrédients n'ont pas changé.
+
     :param file_path: Le chemin du fichier CSV à charger.
     :type file_path: str
+    :param snapshot: Utiliser (et écrire) l'instantané.
+    :type snapshot: bool
     :return: Le fichier CSV transformé sous forme de DataFrame pandas.
     :rtype: pd.DataFrame
     """
+    if snapshot and os.path.exists(file_path):
+        sources = recipes_sources(file_path)
+        df = load_recipes_snapshot(file_path, sources)
+        if df is not None:
+            return df
+        keys = [source_key(source) for source in sources]
     df = load_csv(file_path)
-    df["Ingrédients"] = df["Ingrédients"].apply(ast.literal_eval)
-    df["Nombre d'ingrédients"] = df["Ingrédients"].apply(len)
-    df["Techniques utilisées"] = df["Techniques utilisées"].apply(ast.literal_eval)
-    df["Nombre de techniques utilisées"] = df["Techniques utilisées"].apply(len)
+    name_lists = parse_list_column(df[INGREDIENTS_COLUMN])
+    vocabulary = load_ingredient_vocabulary(file_path, name_lists)
+    df[INGREDIENTS_COLUMN] = encode_ingredients(name_lists, vocabulary, df.index)
+    del name_lists
+    df["Nombre d'ingrédients"] = ingredient_lengths(df[INGREDIENTS_COLUMN])
+    df["Techniques utilisées"] = parse_list_column(df["Techniques utilisées"])
+    if TECHNIQUES_MASK_COLUMN in df.columns:
+        df[TECHNIQUES_MASK_COLUMN] = df[TECHNIQUES_MASK_COLUMN].astype("uint64")
+        df["Nombre de techniques utilisées"] = popcount(df[TECHNIQUES_MASK_COLUMN])
+    else:
+        df["Nombre de techniques utilisées"] = df["Techniques utilisées"].apply(len)
     df["Date de publication de la recette"] = pd.to_datetime(df["Date de publication de la recette"])
+    df = compact_recipes_df(df)
+    df.attrs[VOCABULARY_ATTR] = vocabulary
+    if snapshot:
+        save_recipes_snapshot(df, file_path, keys)
+    return df
+
+
+def arrow_lists_to_python(column):
+    """
+    Convertit une colonne de listes Arrow en listes Python.
+
+    Les valeurs sont converties en une seule fois puis découpées selon les offsets
+    de la colonne, ce qui est bien plus rapide que `to_pylist` valeur par valeur.
+    Les timestamps deviennent des `datetime.datetime`.
+
+    :param column: La colonne de listes.
+    :type column: pa.ChunkedArray
+    :return: Les listes de la colonne.
+    :rtype: list
+    """
+    column = column.combine_chunks()
+    offsets = column.offsets.to_numpy()
+    offsets = offsets - offsets[0]
+    values = column.flatten().to_numpy(zero_copy_only=False)
+    if pa.types.is_timestamp(column.type.value_type):
+        values = values.astype("datetime64[us]")
+    values = values.tolist()
+    return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def load_df_parquet(file_path):
+    """
+    Charge un fichier Parquet écrit par le pipeline de prétraitement et retourne
+    un DataFrame pandas avec les mêmes colonnes que `load_df`.
+
+    Les listes et les dates y sont déjà typées : aucune liste n'est à analyser
+    depuis du texte. Les ingrédients y sont déjà des identifiants int32 quand le
+    fichier contient leur vocabulaire (métadonnées "ingredients").
+
+    :param file_path: Le chemin du fichier Parquet à charger.
+    :type file_path: str
+    :raises FileNotFoundError: Si le fichier n'est pas trouvé.
+    :return: Le fichier Parquet sous forme de DataFrame pandas.
+    :rtype: pd.DataFrame
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    table = pq.read_table(file_path)
+    ingredients = table.column(INGREDIENTS_COLUMN)
+    if ingredients.type == INGREDIENT_IDS_TYPE:
+        vocabulary = json.loads(table.schema.metadata[b"ingredients"])
+        ingredients = pd.arrays.ArrowExtensionArray(ingredients)
+    else:
+        name_lists = arrow_lists_to_python(ingredients)
+        vocabulary = load_ingredient_vocabulary(file_path, name_lists)
+        ingredients = encode_ingredients(name_lists, vocabulary).array
+        del name_lists
+    list_columns = [
+        field.name for field in table.schema if pa.types.is_list(field.type)
+    ]
+    df = table.drop_columns(list_columns).to_pandas()
+    for column in list_columns:
+        if column == INGREDIENTS_COLUMN:
+            values = ingredients
+        else:
+            # Listes Python, comme avec load_df, plutôt que des tableaux numpy
+            values = arrow_lists_to_python(table.column(column))
+        df.insert(table.column_names.index(column), column, values)
+    df["Nombre d'ingrédients"] = ingredient_lengths(df[INGREDIENTS_COLUMN])
+    if TECHNIQUES_MASK_COLUMN in df.columns:
+        df["Nombre de techniques utilisées"] = popcount(df[TECHNIQUES_MASK_COLUMN])
+    else:
+        df["Nombre de techniques utilisées"] = (
+            pc.list_value_length(table.column("Techniques utilisées"))
+            .to_numpy()
+            .astype("int64")
+        )
+    del table
+    # Rend au système la mémoire des buffers Arrow, qui ne servent plus
+    pa.default_memory_pool().release_unused()
+    df = compact_recipes_df(df)
+    df.attrs[VOCABULARY_ATTR] = vocabulary
     return df
 
 
@@ -119,18 +372,25 @@ def load_data(path_data, file_name):
         return pd.DataFrame()
 
 
-@st.cache_data
-def initialize_recipes_df(file_path):
+def read_recipes_df(file_path, loader=None):
     """
-    Initialise un DataFrame à partir d'un fichier CSV.
+    Lit le DataFrame des recettes depuis un fichier CSV ou Parquet, sans cache.
 
-    :param file_path: Chemin vers le fichier CSV.
+    :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
     :type file_path: str
+    :param loader: La fonction de chargement du fichier, par défaut `load_df` ou
+        `load_df_parquet` selon son extension.
+    :type loader: callable
     :return: Le DataFrame chargé ou un DataFrame vide en cas d'erreur.
     :rtype: pd.DataFrame
     """
     try:
-        dataframe = load_df(file_path)
+        if loader is not None:
+            dataframe = loader(file_path)
+        elif file_path.endswith(".parquet"):
+            dataframe = load_df_parquet(file_path)
+        else:
+            dataframe = load_df(file_path)
         logger.info("DataFrame chargé avec succès depuis '%s'.", file_path)
         return dataframe
     except FileNotFoundError:
@@ -153,46 +413,85 @@ def initialize_recipes_df(file_path):
         return pd.DataFrame()
 
 
-def compute_trend(nb_recette_par_annee_df):
+@st.cache_data
+def initialize_recipes_df(file_path):
     """
-    Calcule la tendance du nombre de recettes soumises par mois.
+    Initialise un DataFrame à partir d'un fichier CSV ou Parquet.
 
-    :param nb_recette_par_annee_df: DataFrame contenant les données des recettes soumises.
-    :type nb_recette_par_annee_df: pd.DataFrame
-    :return: Un DataFrame contenant les tendances calculées
-    ou un DataFrame vide si les données sont insuffisantes.
+    Chaque appel renvoie une copie du DataFrame mis en cache ; les pages de
+    l'application utilisent plutôt le jeu de données partagé de
+    `utils.lazy_dataset.lazy_recipes`.
+
+    :param file_path: Chemin vers le fichier CSV ou Parquet (extension .parquet).
+    :type file_path: str
+    :return: Le DataFrame chargé ou un DataFrame vide en cas d'erreur.
     :rtype: pd.DataFrame
     """
-    if nb_recette_par_annee_df.empty:
-        return pd.DataFrame()
+    return read_recipes_df(file_path)
+
+
+def freeze_column(values):
+    """
+    Les données d'une colonne, en lecture seule et sans copie.
+
+    Les tableaux numpy (et les codes des colonnes catégorielles) sont marqués non
+    modifiables ; les tableaux Arrow le sont déjà.
 
-    if "Date de publication de la recette" in nb_recette_par_annee_df.columns:
-        nb_recette_par_annee_df["Date de publication de la recette"] = pd.to_datetime(
-            nb_recette_par_annee_df["Date de publication de la recette"], errors="coerce"
+    :param values: La colonne.
+    :type values: pd.Series
+    :rtype: np.ndarray or pd.api.extensions.ExtensionArray
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Les codes renvoyés par .cat.codes sont déjà en lecture seule
+        return pd.Categorical.from_codes(
+            values.cat.codes.to_numpy(), dtype=values.dtype, validate=False
         )
+    if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        return values.array
+    array = values.to_numpy()
+    array.flags.writeable = False
+    return array
 
-    if nb_recette_par_annee_df["Date de publication de la recette"].isnull().all():
-        return pd.DataFrame()
 
-    nb_recette_par_annee_df["year"] = nb_recette_par_annee_df["Date de publication de la recette"].dt.year
-    nb_recette_par_annee_df["month"] = nb_recette_par_annee_df["Date de publication de la recette"].dt.month
-    nb_recette_par_annee_df["submitted_by_month"] = (
-        nb_recette_par_annee_df["Date de publication de la recette"].dt.to_period("M").dt.to_timestamp()
-    )
-    submissions_groupmonth = (
-        nb_recette_par_annee_df["submitted_by_month"].value_counts().sort_index()
-    )
+def compute_trend(nb_recette_par_annee_df, model="additive", period=12):
+    """
+    Calcule la tendance du nombre de recettes soumises par mois.
+
+    Le DataFrame n'est pas modifié : la tendance vient de la série mensuelle des
+    recettes (voir `utils.time_series`), calculée une seule fois pour le jeu de
+    données partagé, et de sa décomposition saisonnière, mise en cache.
 
-    if len(submissions_groupmonth) < 12:
+    Les mois sans recette font partie de la série, avec un effectif nul : la
+    tendance a une valeur pour chaque mois entre la première et la dernière
+    publication. Les mois vides ne sont donc plus ignorés, ce qui change la
+    tendance des données qui en ont.
+
+    :param nb_recette_par_annee_df: DataFrame contenant les données des recettes soumises.
+    :type nb_recette_par_annee_df: pd.DataFrame or LazyRecipes
+    :param model: Le modèle de la décomposition saisonnière, "additive" ou
+        "multiplicative" (seulement sans mois vide).
+    :type model: str
+    :param period: La période de la saisonnalité, en mois.
+    :type period: int
+    :raises ValueError: Si le modèle est multiplicatif et qu'un mois est vide.
+    :return: Un DataFrame contenant les tendances calculées
+    ou un DataFrame vide si les données sont insuffisantes.
+    :rtype: pd.DataFrame
+    """
+    if (
+        nb_recette_par_annee_df.empty
+        or SUBMISSION_DATES_COLUMN not in nb_recette_par_annee_df.columns
+    ):
         return pd.DataFrame()
 
-    decomposition = sm.tsa.seasonal_decompose(
-        submissions_groupmonth, model="additive", period=12
-    )
+    series = monthly_series(nb_recette_par_annee_df, SUBMISSION_DATES_COLUMN)
+    components = seasonal_components(series, model, period)
+    if components.empty:
+        return pd.DataFrame()
     trend = pd.DataFrame(
         {
-            "Date": decomposition.trend.index,  # X-axis: Time or index
-            "Moyenne glissante": decomposition.trend.values,  # Y-axis: Trend values
+            "Date": components["Date"],  # X-axis: Time or index
+            "Moyenne glissante": components["Tendance"],  # Y-axis: Trend values
         }
     )
     return trend
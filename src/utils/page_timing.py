@@ -0,0 +1,55 @@
+"""
+Ce module mesure le temps de premier affichage des pages de l'application : le
+temps entre le début de l'exécution du script d'une page et l'affichage de son
+premier contenu, journalisé une fois par page et par session, ainsi que, pour le
+premier affichage du processus, le temps écoulé depuis le démarrage du serveur.
+"""
+
+import os
+import time
+import logging
+import threading
+
+import psutil
+import streamlit as st
+
+logger = logging.getLogger(os.path.basename(__file__))
+
+_process_painted = threading.Event()
+
+
+def page_start():
+    """
+    L'instant du début de l'exécution du script d'une page.
+
+    :rtype: float
+    """
+    return time.perf_counter()
+
+
+def log_first_paint(page, start):
+    """
+    Journalise le temps de premier affichage d'une page, à appeler juste après
+    l'affichage de son premier contenu.
+
+    :param page: Le nom de la page.
+    :type page: str
+    :param start: Le début de l'exécution du script, voir `page_start`.
+    :type start: float
+    :return: Le temps de premier affichage, en secondes.
+    :rtype: float
+    """
+    elapsed = time.perf_counter() - start
+    if not _process_painted.is_set():
+        _process_painted.set()
+        since_server_start = time.time() - psutil.Process().create_time()
+        logger.info(
+            "Premier affichage du processus (%s) %.2f s après le démarrage du serveur.",
+            page,
+            since_server_start,
+        )
+    key = f"first_paint_logged_{page}"
+    if not st.session_state.get(key, False):
+        st.session_state[key] = True
+        logger.info("Premier affichage de la page %s en %.3f s.", page, elapsed)
+    return elapsed
@@ -0,0 +1,169 @@
+"""
+Ce module contient les instantanés binaires du DataFrame des recettes : après un
+premier chargement depuis le CSV, le DataFrame est écrit à côté du fichier au format
+Arrow IPC, sans compression, pour être relu par projection en mémoire (memory map)
+aux chargements suivants, sans analyser à nouveau les listes ni les dates.
+
+Un instantané est associé aux fichiers dont il provient (le CSV et le vocabulaire
+des ingrédients) : leur chemin, leur taille, leur date de modification et le hachage
+de leur contenu sont écrits dans ses métadonnées. Il n'est utilisé que si ces
+fichiers n'ont pas changé depuis.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+import pyarrow as pa
+
+logger = logging.getLogger(os.path.basename(__file__))
+
+SNAPSHOT_SUFFIX = ".snapshot.arrow"
+# À incrémenter quand le contenu des instantanés change (colonnes calculées, types)
+SNAPSHOT_VERSION = 1
+SNAPSHOT_METADATA = b"snapshot"
+# Taille des blocs lus pour le hachage des fichiers
+HASH_BLOCK_SIZE = 2**20
+
+
+def snapshot_path(file_path):
+    """
+    Le chemin de l'instantané d'un fichier, dans le même dossier.
+
+    :param file_path: Le chemin du fichier.
+    :type file_path: str
+    :rtype: str
+    """
+    return file_path + SNAPSHOT_SUFFIX
+
+
+def content_hash(file_path):
+    """
+    Le hachage du contenu d'un fichier.
+
+    :param file_path: Le chemin du fichier.
+    :type file_path: str
+    :return: Le condensé sha256 du fichier, en hexadécimal.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(file_path, with_hash=True):
+    """
+    La clé d'un fichier source d'un instantané.
+
+    :param file_path: Le chemin du fichier.
+    :type file_path: str
+    :param with_hash: Ajouter le hachage du contenu, qui demande de lire le fichier.
+    :type with_hash: bool
+    :return: Le chemin absolu, la taille, la date de modification (ns) et le
+        hachage du fichier.
+    :rtype: dict
+    """
+    stat = os.stat(file_path)
+    key = {
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if with_hash:
+        key["sha256"] = content_hash(file_path)
+    return key
+
+
+def is_up_to_date(keys, sources):
+    """
+    Indique si des fichiers sources n'ont pas changé depuis l'écriture d'un
+    instantané.
+
+    La taille et la date de modification suffisent quand elles n'ont pas changé ;
+    sinon (fichier copié ou touché), le hachage du contenu est recalculé.
+
+    :param keys: Les clés des sources écrites dans l'instantané.
+    :type keys: list
+    :param sources: Les chemins des fichiers sources.
+    :type sources: list
+    :rtype: bool
+    """
+    if len(keys) != len(sources):
+        return False
+    for key, source in zip(keys, sources):
+        if not os.path.exists(source):
+            return False
+        current = source_key(source, with_hash=False)
+        if current["path"] != key["path"] or current["size"] != key["size"]:
+            return False
+        if current["mtime_ns"] != key["mtime_ns"] and (
+            content_hash(source) != key["sha256"]
+        ):
+            return False
+    return True
+
+
+def write_snapshot(table, file_path, keys):
+    """
+    Écrit l'instantané d'un fichier. Le fichier est écrit à côté puis renommé, pour
+    que les processus qui lisent l'instantané ne le voient jamais à moitié écrit.
+
+    :param table: Le contenu de l'instantané.
+    :type table: pa.Table
+    :param file_path: Le chemin du fichier dont c'est l'instantané.
+    :type file_path: str
+    :param keys: Les clés (voir `source_key`) des fichiers dont le contenu
+        provient, calculées avant de les lire : un fichier modifié pendant le
+        chargement rend ainsi l'instantané périmé.
+    :type keys: list
+    :return: Le chemin de l'instantané.
+    :rtype: str
+    """
+    metadata = dict(table.schema.metadata or {})
+    metadata[SNAPSHOT_METADATA] = json.dumps(
+        {"version": SNAPSHOT_VERSION, "sources": keys}
+    )
+    table = table.replace_schema_metadata(metadata)
+    path = snapshot_path(file_path)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(temporary_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return path
+
+
+def read_snapshot(file_path, sources):
+    """
+    Lit l'instantané d'un fichier par projection en mémoire : les colonnes de la
+    table restent dans le fichier, le système ne lit que les pages utilisées.
+
+    :param file_path: Le chemin du fichier dont c'est l'instantané.
+    :type file_path: str
+    :param sources: Les chemins des fichiers dont le contenu provient.
+    :type sources: list
+    :return: La table, ou None s'il n'y a pas d'instantané à jour.
+    :rtype: pa.Table
+    """
+    path = snapshot_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        snapshot = json.loads(table.schema.metadata[SNAPSHOT_METADATA])
+    except (pa.ArrowInvalid, OSError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Instantané illisible %s : %s", path, e)
+        return None
+    if snapshot["version"] != SNAPSHOT_VERSION or not is_up_to_date(
+        snapshot["sources"], sources
+    ):
+        logger.info("Instantané périmé : %s", path)
+        return None
+    return table
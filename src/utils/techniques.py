@@ -0,0 +1,192 @@
+"""
+Ce module contient le vocabulaire des techniques de cuisine de PP_recipes et leur
+représentation compacte : un masque de bits uint64 par recette, le bit i étant la
+technique TECHNIQUES_LIST[i]. Les comptages se font alors avec des opérations
+numpy sur les masques ; la liste des mots reste disponible à la demande.
+"""
+
+import numpy as np
+
+# Ordre des techniques dans les vecteurs 0/1 de PP_recipes
+TECHNIQUES_LIST = [
+    "bake",
+    "barbecue",
+    "blanch",
+    "blend",
+    "boil",
+    "braise",
+    "brine",
+    "broil",
+    "caramelize",
+    "combine",
+    "crock pot",
+    "crush",
+    "deglaze",
+    "devein",
+    "dice",
+    "distill",
+    "drain",
+    "emulsify",
+    "ferment",
+    "freez",
+    "fry",
+    "grate",
+    "griddle",
+    "grill",
+    "knead",
+    "leaven",
+    "marinate",
+    "mash",
+    "melt",
+    "microwave",
+    "parboil",
+    "pickle",
+    "poach",
+    "pour",
+    "pressure cook",
+    "puree",
+    "refrigerat",
+    "roast",
+    "saute",
+    "scald",
+    "scramble",
+    "shred",
+    "simmer",
+    "skillet",
+    "slow cook",
+    "smoke",
+    "smooth",
+    "soak",
+    "sous-vide",
+    "steam",
+    "stew",
+    "strain",
+    "tenderize",
+    "thicken",
+    "toast",
+    "toss",
+    "whip",
+    "whisk",
+]
+TECHNIQUES_MASK_COLUMN = "Masque des techniques"
+
+
+def masks_to_bits(masks):
+    """
+    Déplie les masques en une matrice de 0/1, une colonne par technique.
+
+    :param masks: Les masques des recettes.
+    :type masks: np.ndarray
+    :return: La matrice (recettes x techniques).
+    :rtype: np.ndarray
+    """
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    bits = np.unpackbits(
+        masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+    )
+    return bits[:, : len(TECHNIQUES_LIST)]
+
+
+def bits_to_masks(bits):
+    """
+    Replie une matrice de 0/1 (recettes x techniques) en masques.
+
+    :param bits: La matrice, une colonne par technique.
+    :type bits: np.ndarray
+    :return: Les masques des recettes.
+    :rtype: np.ndarray
+    """
+    padded = np.zeros((len(bits), 64), dtype=bool)
+    padded[:, : bits.shape[1]] = bits
+    packed = np.packbits(padded, axis=1, bitorder="little")
+    return packed.view("<u8").reshape(-1).astype(np.uint64)
+
+
+def vectors_to_masks(vectors):
+    """
+    Convertit les vecteurs 0/1 de PP_recipes en masques. Seules les valeurs égales à
+    1 comptent, et les éléments au-delà de TECHNIQUES_LIST sont ignorés.
+
+    :param vectors: Les vecteurs des recettes.
+    :type vectors: iterable
+    :return: Les masques des recettes.
+    :rtype: np.ndarray
+    """
+    n_techniques = len(TECHNIQUES_LIST)
+    vectors = list(vectors)
+    try:
+        matrix = np.array(vectors, dtype=np.int64)
+    except ValueError:
+        matrix = None
+    if matrix is None or matrix.ndim != 2:
+        # Vecteurs de longueurs différentes
+        matrix = np.zeros((len(vectors), n_techniques), dtype=np.int64)
+        for i, vector in enumerate(vectors):
+            values = np.asarray(vector[:n_techniques], dtype=np.int64)
+            matrix[i, : len(values)] = values
+    return bits_to_masks(matrix[:, :n_techniques] == 1)
+
+
+def masks_to_words(masks):
+    """
+    Retrouve la liste des techniques de chaque masque, dans l'ordre de
+    TECHNIQUES_LIST.
+
+    :param masks: Les masques des recettes.
+    :type masks: np.ndarray
+    :return: Les techniques de chaque recette.
+    :rtype: list
+    """
+    bits = masks_to_bits(masks)
+    rows, columns = np.nonzero(bits)
+    offsets = np.concatenate(([0], np.cumsum(bits.sum(axis=1, dtype=np.int64))))
+    words = np.array(TECHNIQUES_LIST, dtype=object)[columns].tolist()
+    return [words[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+# Constantes du comptage des bits à 1 de `popcount`
+SWAR_1 = np.uint64(0x5555555555555555)
+SWAR_2 = np.uint64(0x3333333333333333)
+SWAR_4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+SWAR_8 = np.uint64(0x0101010101010101)
+
+
+def popcount(masks):
+    """
+    Compte les techniques de chaque recette.
+
+    :param masks: Les masques des recettes.
+    :type masks: np.ndarray
+    :return: Le nombre de techniques de chaque recette.
+    :rtype: np.ndarray
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).astype(np.int64)
+    # Comptage SWAR sur les masques eux-mêmes, sans matrice de bits (numpy < 2)
+    masks = masks - ((masks >> np.uint64(1)) & SWAR_1)
+    masks = (masks & SWAR_2) + ((masks >> np.uint64(2)) & SWAR_2)
+    masks = (masks + (masks >> np.uint64(4))) & SWAR_4
+    return ((masks * SWAR_8) >> np.uint64(56)).astype(np.int64)
+
+
+def most_common_techniques(masks, n=None):
+    """
+    Les techniques les plus fréquentes, dans le même ordre que `Counter.most_common`
+    sur les listes de techniques (à égalité, la première rencontrée d'abord).
+
+    :param masks: Les masques des recettes.
+    :type masks: np.ndarray
+    :param n: Le nombre de techniques à garder, toutes par défaut.
+    :type n: int
+    :return: Les couples (technique, nombre de recettes).
+    :rtype: list
+    """
+    bits = masks_to_bits(masks)
+    if len(bits) == 0:
+        return []
+    counts = bits.sum(axis=0, dtype=np.int64)
+    first_rows = bits.argmax(axis=0)
+    used = np.flatnonzero(counts)
+    order = used[np.lexsort((used, first_rows[used], -counts[used]))][:n]
+    return [(TECHNIQUES_LIST[i], int(counts[i])) for i in order]
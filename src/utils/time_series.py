@@ -0,0 +1,209 @@
+"""
+Ce module contient les séries mensuelles d'activité du site : le nombre de recettes
+publiées et le nombre de commentaires écrits chaque mois. Une série est gardée sous
+forme compacte (le premier mois et un tableau int32 des effectifs, mois vides
+compris) et calculée une fois par jeu de données (voir
+`LazyRecipes.monthly_series`) ; sa décomposition saisonnière est mise en cache par
+série, modèle et période.
+"""
+
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import statsmodels.api as sm
+import streamlit as st
+
+logger = logging.getLogger(os.path.basename(__file__))
+
+SUBMISSION_DATES_COLUMN = "Date de publication de la recette"
+COMMENT_DATES_COLUMN = "Dates des commentaires"
+# Colonnes dont les séries mensuelles sont calculées au chargement
+MONTHLY_COLUMNS = [SUBMISSION_DATES_COLUMN, COMMENT_DATES_COLUMN]
+# Les listes de dates du CSV, écrites par le pipeline, ex. "[datetime.date(2009, 12, 9)]"
+DATE_REPR_PREFIX = "datetime.date("
+DATE_REPR = r"^(?P<year>\d+), (?P<month>\d+),"
+
+
+class MonthlySeries:
+    """
+    Le nombre d'événements par mois, du premier au dernier mois observé.
+
+    Les effectifs sont en lecture seule : la série peut être partagée par toutes
+    les sessions.
+    """
+
+    def __init__(self, start, counts):
+        """
+        :param start: Le premier mois.
+        :type start: np.datetime64
+        :param counts: Le nombre d'événements de chaque mois.
+        :type counts: np.ndarray
+        """
+        self.start = np.datetime64(start, "M")
+        self.counts = np.asarray(counts, dtype=np.int32)
+        self.counts.flags.writeable = False
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __reduce__(self):
+        # Utilisé par st.cache_data pour calculer la clé du cache
+        return (MonthlySeries, (self.start, self.counts))
+
+    @property
+    def months(self):
+        """
+        Le premier jour de chaque mois de la série.
+
+        :rtype: pd.DatetimeIndex
+        """
+        months = self.start + np.arange(len(self.counts))
+        return pd.DatetimeIndex(months.astype("datetime64[ns]"), freq="MS")
+
+    def to_series(self):
+        """
+        La série, indexée par le premier jour de chaque mois.
+
+        :rtype: pd.Series
+        """
+        return pd.Series(self.counts, index=self.months)
+
+
+def monthly_counts(months):
+    """
+    Compte les événements de chaque mois.
+
+    :param months: Le mois de chaque événement.
+    :type months: np.ndarray
+    :rtype: MonthlySeries
+    """
+    months = np.asarray(months, dtype="datetime64[M]")
+    months = months[~np.isnat(months)]
+    if len(months) == 0:
+        return MonthlySeries(np.datetime64("1970-01", "M"), [])
+    numbers = months.astype(np.int64)
+    start = numbers.min()
+    return MonthlySeries(months.min(), np.bincount(numbers - start))
+
+
+def repr_months(values):
+    """
+    Le mois de chaque date de listes de dates écrites comme dans le CSV. Le texte
+    est découpé et analysé par Arrow, sans passer par des objets Python.
+
+    :param values: Les listes de dates, en texte.
+    :type values: pa.Array or pa.ChunkedArray
+    :rtype: np.ndarray
+    """
+    parts = pc.list_flatten(pc.split_pattern(values, DATE_REPR_PREFIX))
+    parts = parts.filter(pc.match_substring_regex(parts, DATE_REPR))
+    dates = pc.extract_regex(parts, DATE_REPR)
+    years = pc.struct_field(dates, "year").cast(pa.int64()).to_numpy()
+    months = pc.struct_field(dates, "month").cast(pa.int64()).to_numpy()
+    return ((years - 1970) * 12 + months - 1).astype("datetime64[M]")
+
+
+def date_months(values):
+    """
+    Le mois de chaque date d'une colonne de dates, ou de listes de dates.
+
+    :param values: La colonne : des dates, des listes de dates ou, comme dans le
+        CSV, leur représentation textuelle.
+    :type values: pd.Series
+    :rtype: np.ndarray
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values.to_numpy("datetime64[M]")
+    strings = values[values.map(type) == str]
+    if len(strings) and strings.iloc[0].startswith("["):
+        return repr_months(pa.array(strings, pa.string()))
+    lists = [dates for dates in values if isinstance(dates, (list, tuple, np.ndarray))]
+    if lists:
+        return np.array(
+            [date for dates in lists for date in dates], dtype="datetime64[M]"
+        )
+    return pd.to_datetime(values, errors="coerce").to_numpy("datetime64[M]")
+
+
+def arrow_date_months(values):
+    """
+    Le mois de chaque date d'une colonne Arrow, sans la convertir en objets Python.
+
+    :param values: La colonne : des timestamps, des listes de timestamps ou des
+        textes, comme `date_months`.
+    :type values: pa.ChunkedArray
+    :rtype: np.ndarray
+    """
+    if pa.types.is_list(values.type) or pa.types.is_large_list(values.type):
+        values = pc.list_flatten(values)
+    if pa.types.is_timestamp(values.type) or pa.types.is_date(values.type):
+        values = values.cast(pa.timestamp("ns"))
+        return values.to_numpy(zero_copy_only=False).astype("datetime64[M]")
+    return date_months(values.to_pandas())
+
+
+def monthly_series(dataset, column=SUBMISSION_DATES_COLUMN):
+    """
+    La série mensuelle d'une colonne de dates d'un jeu de données. Celle d'un
+    `LazyRecipes` est calculée une seule fois, celle d'un DataFrame à chaque appel.
+
+    :param dataset: Les recettes.
+    :type dataset: pd.DataFrame or LazyRecipes
+    :param column: La colonne des dates.
+    :type column: str
+    :rtype: MonthlySeries
+    """
+    if hasattr(dataset, "monthly_series"):
+        return dataset.monthly_series(column)
+    return monthly_counts(date_months(dataset[column]))
+
+
+@st.cache_data(show_spinner=False)
+def seasonal_components(series, model="additive", period=12):
+    """
+    La décomposition saisonnière d'une série mensuelle, calculée une fois par
+    série, modèle et période.
+
+    Les mois sans événement comptent pour 0 : la série est régulière, comme
+    l'attend `seasonal_decompose`, mais le modèle multiplicatif, qui divise par
+    les effectifs, ne s'applique qu'aux séries sans mois vide.
+
+    :param series: La série.
+    :type series: MonthlySeries
+    :param model: Le modèle de `seasonal_decompose`, "additive" ou "multiplicative".
+    :type model: str
+    :param period: La période de la saisonnalité, en mois.
+    :type period: int
+    :raises ValueError: Si le modèle est multiplicatif et qu'un mois est vide.
+    :return: La tendance et la composante saisonnière de chaque mois, ou un
+        DataFrame vide si la série compte moins de deux périodes.
+    :rtype: pd.DataFrame
+    """
+    if len(series) < 2 * period:
+        return pd.DataFrame()
+    if model == "multiplicative" and (series.counts == 0).any():
+        raise ValueError(
+            "Le modèle multiplicatif demande un effectif non nul chaque mois : "
+            f"{int((series.counts == 0).sum())} mois sans événement."
+        )
+    decomposition = sm.tsa.seasonal_decompose(
+        series.to_series(), model=model, period=period
+    )
+    logger.info(
+        "Décomposition saisonnière calculée (%s, période %d, %d mois).",
+        model,
+        period,
+        len(series),
+    )
+    return pd.DataFrame(
+        {
+            "Date": series.months,
+            "Tendance": decomposition.trend.to_numpy(),
+            "Saisonnalité": decomposition.seasonal.to_numpy(),
+        }
+    )
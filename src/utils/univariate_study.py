@@ -12,6 +12,13 @@ import seaborn as sns
 import streamlit as st
 import matplotlib.pyplot as plt
 from utils.base_study import BaseStudy
+from utils.techniques import TECHNIQUES_MASK_COLUMN, most_common_techniques
+from utils.ingredients import (
+    VOCABULARY_ATTR,
+    is_ingredient_ids,
+    most_common_ingredients,
+    with_ingredient_names,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -206,9 +213,15 @@ class UnivariateStudy(BaseStudy):
         :return: data points for axis x, count of elements, and recipe_id
         :rtype: tuple
         """
-        columns = [axis_x] + chosen_filters
+        use_masks = (
+            axis_x == "Techniques utilisées"
+            and TECHNIQUES_MASK_COLUMN in self.dataframe.columns
+        )
+        # The technique bitmasks replace the word lists, which are not read
+        columns = [TECHNIQUES_MASK_COLUMN if use_masks else axis_x] + chosen_filters
         if "recipe_id" in self.dataframe.columns:
             columns += ["recipe_id"]
+        use_ids = not use_masks and is_ingredient_ids(self.dataframe[axis_x])
         df = df[columns]
 
         # Apply filters
@@ -228,14 +241,23 @@ class UnivariateStudy(BaseStudy):
             self.default_values["chosen_filters"] = self.chosen_filters
 
         # Count top elements
-        elements_list = []
-        for item_list in df[axis_x]:
-            elements_list.extend(item_list)
-
-        element_counts = Counter(elements_list)
-        top_elements = element_counts.most_common(range_axis_x)
+        if use_masks:
+            # Popcount of the technique bitmasks, same order as Counter.most_common
+            top_elements = most_common_techniques(
+                df[TECHNIQUES_MASK_COLUMN].to_numpy(), range_axis_x
+            )
+        elif use_ids:
+            # Counts of the int32 ingredient ids, same order as Counter.most_common
+            top_elements = most_common_ingredients(
+                df[axis_x], self.dataframe.attrs[VOCABULARY_ATTR], range_axis_x
+            )
+        else:
+            elements_list = []
+            for item_list in df[axis_x]:
+                elements_list.extend(item_list)
+            top_elements = Counter(elements_list).most_common(range_axis_x)
         nb_elts_display = [element[0] for element in top_elements]
-        count_elts = [element_counts[elt] for elt in nb_elts_display]
+        count_elts = [element[1] for element in top_elements]
 
         if "recipe_id" in self.dataframe.columns:
             return nb_elts_display, count_elts, df["recipe_id"].values
@@ -379,7 +401,7 @@ class UnivariateStudy(BaseStudy):
             with st.expander(
                 "Recettes avec le plus de commentaires (avec les filtres actuels)"
             ):
-                st.dataframe(display_df, hide_index=True)
+                st.dataframe(with_ingredient_names(display_df), hide_index=True)
         return True
 
     def axis_graph(self, fig, ax):
@@ -7,9 +7,9 @@ from src.MangeTaData import main
 
 @patch("src.MangeTaData.st")
 @patch("src.MangeTaData.setup_logging")
-@patch("src.MangeTaData.initialize_recipes_df")
+@patch("src.MangeTaData.start_prefetch")
 @patch("src.MangeTaData.load_css")
-def test_main(mock_st, mock_setup_logging, mock_initialize_recipes_df, mock_load_css):
+def test_main(mock_st, mock_setup_logging, mock_start_prefetch, mock_load_css):
     with patch("src.MangeTaData.st", mock_st):
         col1, col2, col3 = MagicMock(), MagicMock(), MagicMock()
         mock_st.columns.return_value = [col1, col2, col3]
@@ -2,6 +2,7 @@ from streamlit.testing.v1 import AppTest
 from unittest.mock import patch
 import pytest
 from unittest.mock import MagicMock, patch
+import numpy as np
 import pandas as pd
 import pandas.testing as pdt
 import streamlit as st
@@ -14,6 +15,7 @@ from src.pages.Simulation_Carte import (
     load_recipes_data,
     generate_random_points,
 )
+from utils.lazy_dataset import lazy_recipes
 
 
 
@@ -34,21 +36,34 @@ def test_load_geojson(mock_geojson_read):
         mock_read_file.assert_called_once_with(path)
 
 
-def test_load_recipes_data():
-    mock_csv_read = pd.DataFrame(
+def test_load_recipes_data(tmp_path):
+    path = str(tmp_path / "clean_cloud_df.csv")
+    pd.DataFrame(
         {
-            "Date de publication de la recette": ["2021-01-01", "2021-01-02"],
+            "Nom": ["soup", "stew"],
+            "Ingrédients": ["['salt']", "['sugar']"],
+            "Techniques utilisées": ["['bake']", "[]"],
+            "Date de publication de la recette": ["2021-01-01", "2022-01-02"],
         }
-    )
-    with patch("pandas.read_csv", return_value=mock_csv_read) as mock_read_csv:
-        path = "data/clean_cloud_df.csv"
-        result = load_recipes_data(path)
+    ).to_csv(path, index=False)
 
-        print("Result:", result)
-        print("Mock CSV Read:", mock_csv_read)
+    result = load_recipes_data(path)
 
-        pd.testing.assert_frame_equal(result, mock_csv_read)
-        mock_read_csv.assert_called_once_with(path)
+    expected = pd.DataFrame(
+        {
+            "Date de publication de la recette": pd.to_datetime(
+                ["2021-01-01", "2022-01-02"]
+            ),
+            "année": pd.Series([2021, 2022], dtype="int32"),
+        }
+    )
+    pd.testing.assert_frame_equal(result, expected)
+    assert "Nom" not in lazy_recipes(path).loaded_columns
+    # La colonne des dates est celle du jeu de données partagé, sans copie
+    shared = lazy_recipes(path)["Date de publication de la recette"]
+    assert np.shares_memory(
+        result["Date de publication de la recette"].to_numpy(), shared.to_numpy()
+    )
 
 
 @pytest.fixture
@@ -16,7 +16,9 @@ def mock_session_state():
     session_state = {
         "recipes_df": pd.DataFrame(
             {
-                "submitted": pd.date_range(start="1999-01-01", periods=100, freq="YE"),
+                "Date de publication de la recette": pd.date_range(
+                    start="1999-01-01", periods=100, freq="YE"
+                ),
                 "comment_count": range(100),
                 "mean_rating": [4.5] * 100,
                 "minutes": [30] * 100,
@@ -62,7 +64,9 @@ def test_main(
     mock_st.session_state = {
         "recipes_df": pd.DataFrame(
             {
-                "submitted": pd.date_range(start="1999-01-01", periods=100, freq="YE"),
+                "Date de publication de la recette": pd.date_range(
+                    start="1999-01-01", periods=100, freq="YE"
+                ),
                 "comment_count": range(100),
                 "mean_rating": [4.5] * 100,
                 "minutes": [30] * 100,
@@ -82,7 +86,8 @@ def test_main(
 
         # Assertions pour vérifier les appels attendus
         mock_load_css.assert_called_once_with("src/style.css")
-        mock_compute_trend.assert_called_once_with(mock_st.session_state["recipes_df"])
+        mock_compute_trend.assert_called_once()
+        assert mock_compute_trend.call_args.args[0] is mock_st.session_state["recipes_df"]
 
         # Vérifier que les classes BivariateStudy et UnivariateStudy ont été appelées correctement
         assert mock_bivariate_study.call_count == 7
@@ -189,6 +194,7 @@ def test_main_exception_handling(
     """
     # Mock des fonctions utilisées dans main()
     mock_load_css.return_value = None
+    st.session_state["recipes_df"] = mock_session_state["recipes_df"]
 
     # Simuler une exception dans compute_trend
     mock_compute_trend.side_effect = Exception("Erreur dans compute_trend")
@@ -203,7 +209,8 @@ def test_main_exception_handling(
     mock_load_css.assert_called_once_with("src/style.css")
 
     # Vérifier que compute_trend a été appelé avec le bon argument
-    mock_compute_trend.assert_called_once_with(st.session_state["recipes_df"])
+    mock_compute_trend.assert_called_once()
+    assert mock_compute_trend.call_args.args[0] is st.session_state["recipes_df"]
 
     # Vérifier que les études bivariées et univariées ne sont pas créées en cas d'exception
     assert len(st.session_state["locked_graphs"]) == 0
@@ -0,0 +1,102 @@
+# tests/test_benchmark_suite.py
+
+import sys
+import os
+import json
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import benchmark_suite
+from scripts.benchmark_suite import (
+    compare,
+    format_comparison,
+    measure,
+    measure_sessions,
+    run_scale,
+)
+from scripts.generate_synthetic_data import SampleProfile, REAL_RECIPES
+
+
+def make_run(time, peak_rss):
+    return {"results": {"0.01": {"load_df": {"time": time, "peak_rss": peak_rss}}}}
+
+
+def test_measure_calls_setup_before_each_run():
+    calls = []
+    result = measure(lambda: (len(calls),), calls.append, repeat=3)
+    assert calls == [0, 1, 2]
+    assert set(result) == {"time", "median_time", "peak_rss"}
+    assert result["time"] <= result["median_time"]
+
+
+@pytest.mark.parametrize(
+    "time, peak_rss, expected",
+    [
+        (1.1, 100 * 2**20, []),
+        (1.5, 100 * 2**20, ["time"]),
+        (1.0, 200 * 2**20, ["memory"]),
+        (1.5, 200 * 2**20, ["time", "memory"]),
+    ],
+)
+def test_compare_flags_regressions(time, peak_rss, expected):
+    rows = compare(make_run(1.0, 100 * 2**20), make_run(time, peak_rss), 0.2, 0.3)
+    assert [row["regressions"] for row in rows] == [expected]
+    assert ("regression" in format_comparison(rows)) == bool(expected)
+
+
+def test_compare_ignores_noise_and_new_benchmarks():
+    baseline = make_run(0.001, 1000)
+    assert compare(baseline, make_run(0.003, 3000))[0]["regressions"] == []
+    current = make_run(1.0, 0)
+    current["results"]["0.01"]["new"] = {"time": 1.0, "peak_rss": 0}
+    current["results"]["0.5"] = {"load_df": {"time": 1.0, "peak_rss": 0}}
+    assert [row["name"] for row in compare(baseline, current)] == ["load_df"]
+
+
+def test_main_compare_exit_status(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    current = tmp_path / "current.json"
+    baseline.write_text(json.dumps(make_run(1.0, 0)))
+    current.write_text(json.dumps(make_run(1.0, 0)))
+    assert benchmark_suite.main(["compare", str(baseline), str(current)]) == 0
+    current.write_text(json.dumps(make_run(2.0, 0)))
+    assert benchmark_suite.main(["compare", str(baseline), str(current)]) == 1
+
+
+def test_run_scale(monkeypatch):
+    monkeypatch.setattr("scripts.pipeline_preprocess.get_stopwords", lambda: {"the"})
+    monkeypatch.setattr(
+        "scripts.pipeline_preprocess.clean_and_tokenize",
+        lambda text, stopwords: [w for w in text.split() if w not in stopwords],
+    )
+    monkeypatch.setattr("scripts.pipeline_preprocess.PATH_DATA", "../data/")
+
+    results = run_scale(200 / REAL_RECIPES, 1, SampleProfile.from_samples())
+
+    assert "preprocess.texts" in results
+    for name in [
+        "load_df",
+        "load_df.snapshot",
+        "initialize_recipes_df",
+        "LazyRecipes.column",
+        "compute_trend",
+        "score_functions",
+        "UnivariateStudy.get_data_points_ingredients",
+        "BivariateStudy.get_data_points",
+        "generate_random_points",
+        "session.initialize_recipes_df",
+        "session.lazy_recipes",
+    ]:
+        assert results[name]["time"] > 0
+
+
+def test_measure_sessions_keeps_each_session():
+    setups = []
+    result = measure_sessions(lambda: setups.append(1), lambda: np.ones(2**20), 4)
+    assert setups == [1]
+    assert set(result) == {"time", "median_time", "peak_rss"}
+    # 8 MB per session
+    assert 8 * 2**20 <= result["peak_rss"] < 9 * 2**20
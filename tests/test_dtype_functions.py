@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from utils.dtype_functions import (
+    compact_series,
+    compact_dtypes,
+    format_dtype_report,
+)
+
+
+def test_compact_series_integers():
+    assert compact_series(pd.Series([1, 2, 3])).dtype == np.int16
+    assert compact_series(pd.Series([-1, 40000])).dtype == np.int32
+    assert compact_series(pd.Series([0, 2**40])).dtype == np.int64
+    masks = pd.Series(np.array([1, 2**60], dtype=np.uint64))
+    assert compact_series(masks).dtype == np.uint64
+    assert compact_series(pd.Series([1, 2], dtype=np.uint64)).dtype == np.uint16
+
+
+def test_compact_series_floats_keep_their_values():
+    exact = pd.Series([0.5, 138.25, np.nan])
+    pd.testing.assert_series_equal(
+        compact_series(exact), exact.astype(np.float32), check_dtype=True
+    )
+    inexact = pd.Series([0.1, 4.333333333333333])
+    assert compact_series(inexact) is inexact
+
+
+def test_compact_series_strings_and_others():
+    repeated = pd.Series(["a", "b", "a", "a", None, "b"])
+    assert isinstance(compact_series(repeated).dtype, pd.CategoricalDtype)
+    unique = pd.Series(["a", "b", "c"])
+    assert compact_series(unique) is unique
+    lists = pd.Series([["a"], ["a"], ["a"]])
+    assert compact_series(lists) is lists
+    dates = pd.Series(pd.to_datetime(["2020-01-01", "2020-01-02"]))
+    assert compact_series(dates) is dates
+
+
+def test_compact_dtypes_report():
+    df = pd.DataFrame(
+        {
+            "Nom": ["a", "b", "c", "d"],
+            "Durée": np.array([10, 20, 30, 40], dtype=np.int64),
+            "Calories": [1.5, 2.5, 3.5, 4.5],
+        }
+    )
+    compact, report = compact_dtypes(df)
+
+    assert df["Durée"].dtype == np.int64
+    assert list(compact.dtypes) == [np.dtype(object), np.int16, np.float32]
+    pd.testing.assert_frame_equal(compact, df, check_dtype=False)
+    assert report.loc["Durée", "bytes_saved"] == 4 * (8 - 2)
+    assert report.loc["Calories", "bytes_saved"] == 4 * (8 - 4)
+    assert report.loc["Nom", "bytes_saved"] == 0
+    text = format_dtype_report(report)
+    assert "Durée" in text and "Nom" not in text and "total" in text
@@ -0,0 +1,80 @@
+# tests/test_generate_synthetic_data.py
+
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.generate_synthetic_data import (
+    SampleProfile,
+    generate,
+    REAL_RECIPES,
+    RECIPE_COLUMNS,
+    INTERACTION_COLUMNS,
+    PP_COLUMNS,
+)
+from utils.list_parser import parse_list_column
+from utils.techniques import TECHNIQUES_LIST
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return SampleProfile.from_samples()
+
+
+def test_generate_schema_and_distributions(tmp_path, profile):
+    scale = 2000 / REAL_RECIPES
+    n_recipes, n_interactions = generate(
+        str(tmp_path), scale, seed=1, chunk_recipes=300, profile=profile
+    )
+    recipes = pd.read_csv(tmp_path / "RAW_recipes.csv")
+    interactions = pd.read_csv(tmp_path / "RAW_interactions.csv")
+    pp_recipes = pd.read_csv(tmp_path / "PP_recipes.csv")
+    ingredients = pd.read_csv(tmp_path / "ingredients.csv")
+
+    assert list(recipes.columns) == RECIPE_COLUMNS
+    assert list(interactions.columns) == INTERACTION_COLUMNS
+    assert list(pp_recipes.columns) == PP_COLUMNS
+    assert len(recipes) == len(pp_recipes) == n_recipes == 2000
+    assert len(interactions) == n_interactions
+    assert recipes["id"].is_unique and recipes["id"].is_monotonic_increasing
+    assert pp_recipes["i"].tolist() == list(range(n_recipes))
+    assert interactions["recipe_id"].isin(recipes["id"]).all()
+    assert 3 < n_interactions / n_recipes < 7
+
+    tags = parse_list_column(recipes["tags"])
+    assert set().union(*tags) <= set(profile.tags)
+    assert abs(tags.map(len).mean() - profile.tag_counts.mean()) < 2
+    ingredient_lists = parse_list_column(recipes["ingredients"])
+    assert (ingredient_lists.map(len) == recipes["n_ingredients"]).all()
+    assert set().union(*ingredient_lists) <= set(ingredients["raw_ingr"])
+    assert (parse_list_column(recipes["steps"]).map(len) == recipes["n_steps"]).all()
+    techniques = parse_list_column(pp_recipes["techniques"])
+    assert (techniques.map(len) == len(TECHNIQUES_LIST)).all()
+
+    # Ratings keep their skew toward 5
+    ratings = interactions["rating"].value_counts(normalize=True)
+    expected = dict(zip(profile.ratings, profile.ratings_p))
+    assert abs(ratings[5] - expected[5]) < 0.05
+    # Reviews come after the publication of the recipe
+    submitted = recipes.set_index("id")["submitted"]
+    assert (
+        pd.to_datetime(interactions["date"])
+        >= pd.to_datetime(interactions["recipe_id"].map(submitted))
+    ).all()
+    assert pd.to_datetime(interactions["date"]).max() <= profile.last_date
+    assert np.isin(recipes["minutes"], profile.minutes).all()
+
+
+def test_generate_is_reproducible(tmp_path, profile):
+    scale = 500 / REAL_RECIPES
+    generate(str(tmp_path / "a"), scale, seed=3, chunk_recipes=100, profile=profile)
+    generate(str(tmp_path / "b"), scale, seed=3, chunk_recipes=100, profile=profile)
+    for name in ["RAW_recipes.csv", "RAW_interactions.csv", "PP_recipes.csv"]:
+        assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+    with pytest.raises(ValueError):
+        generate(str(tmp_path / "c"), 0, profile=profile)
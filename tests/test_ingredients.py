@@ -0,0 +1,79 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils.ingredients import (
+    VOCABULARY_ATTR,
+    build_vocabulary,
+    extend_vocabulary,
+    save_vocabulary,
+    load_vocabulary,
+    encode_ingredients,
+    decode_ingredients,
+    ingredient_lengths,
+    most_common_ingredients,
+    with_ingredient_names,
+)
+
+
+def random_name_lists(n_recipes, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"ingredient {i}" for i in range(40)]
+    return [
+        [names[i] for i in rng.integers(0, len(names), rng.integers(0, 8))]
+        for _ in range(n_recipes)
+    ]
+
+
+def test_encode_decode_round_trip():
+    name_lists = random_name_lists(200) + [["salt", None]]
+    vocabulary = build_vocabulary(name_lists)
+    ids = encode_ingredients(name_lists, vocabulary)
+
+    assert str(ids.dtype) == "list<item: int32>[pyarrow]"
+    assert decode_ingredients(ids, vocabulary) == name_lists
+    assert ingredient_lengths(ids).tolist() == [len(names) for names in name_lists]
+    # Les sélections de lignes gardent les identifiants
+    assert decode_ingredients(ids[ids.index % 3 == 1], vocabulary) == name_lists[1::3]
+
+
+def test_encode_unknown_ingredient():
+    with pytest.raises(KeyError):
+        encode_ingredients([["salt", "pepper"]], ["salt"])
+
+
+def test_extend_vocabulary_keeps_ids():
+    assert extend_vocabulary(["salt", "flour"], [["sugar", "salt", "egg"]]) == [
+        "salt", "flour", "egg", "sugar"
+    ]
+
+
+def test_save_and_load_vocabulary(tmp_path):
+    path = str(tmp_path / "vocabulary.csv")
+    save_vocabulary(path, ["null", "salt"])
+
+    assert load_vocabulary(path) == ["null", "salt"]
+
+
+def test_most_common_ingredients_matches_counter():
+    name_lists = random_name_lists(300)
+    vocabulary = build_vocabulary(name_lists)
+    ids = encode_ingredients(name_lists, vocabulary)
+    counter = Counter(name for names in name_lists for name in names)
+
+    assert most_common_ingredients(ids, vocabulary, 10) == counter.most_common(10)
+    assert most_common_ingredients(ids, vocabulary) == counter.most_common()
+
+
+def test_with_ingredient_names():
+    vocabulary = ["pepper", "salt"]
+    df = pd.DataFrame({"Nom": ["soup", "stew"]}, index=[3, 5])
+    df["Ingrédients"] = encode_ingredients([["salt"], ["pepper", "salt"]], vocabulary, df.index)
+    df.attrs[VOCABULARY_ATTR] = vocabulary
+
+    names = with_ingredient_names(df)
+    assert names["Ingrédients"].tolist() == [["salt"], ["pepper", "salt"]]
+    assert list(df["Ingrédients"].iloc[0]) == [1]
+    plain = pd.DataFrame({"Ingrédients": [["salt"]]})
+    assert with_ingredient_names(plain) is plain
@@ -0,0 +1,211 @@
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from utils import lazy_dataset, load_functions
+from utils.ingredients import VOCABULARY_ATTR, with_ingredient_names
+from utils.lazy_dataset import LazyRecipes, lazy_recipes, start_prefetch
+from utils.load_functions import load_df, load_df_parquet
+from utils.techniques import TECHNIQUES_MASK_COLUMN
+from utils.univariate_study import UnivariateStudy
+
+RECIPES = {
+    "Nom": ["soup", "cake", "stew"],
+    "Ingrédients": ["['salt', 'pepper']", "[]", "['salt']"],
+    "Techniques utilisées": ["['bake']", "['fry', 'boil']", "[]"],
+    "Date de publication de la recette": ["2023-01-01", "2023-01-02", "2024-05-01"],
+    "Note moyenne": [4.5, 3.0, None],
+    "Dates des commentaires": [
+        "[datetime.date(2023, 1, 5), datetime.date(2023, 3, 1)]",
+        "[]",
+        "[datetime.date(2023, 3, 2)]",
+    ],
+}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "clean.csv")
+    pd.DataFrame(RECIPES).to_csv(path, index=False)
+    return path
+
+
+def test_lazy_recipes_reads_requested_columns(csv_path):
+    dataset = LazyRecipes(csv_path)
+    expected = load_df(csv_path, snapshot=False)
+
+    assert list(dataset.columns) == list(expected.columns)
+    assert len(dataset) == 3
+    assert dataset.loaded_columns == []
+    pd.testing.assert_series_equal(dataset["Note moyenne"], expected["Note moyenne"])
+    assert dataset.loaded_columns == ["Note moyenne"]
+    # Chaque colonne n'est lue qu'une fois
+    assert dataset["Note moyenne"] is dataset["Note moyenne"]
+
+    pd.testing.assert_frame_equal(
+        dataset[["Nom", "Note moyenne"]], expected[["Nom", "Note moyenne"]]
+    )
+    assert sorted(dataset.loaded_columns) == ["Nom", "Note moyenne"]
+
+
+def test_lazy_recipes_matches_load_df(csv_path):
+    dataset = LazyRecipes(csv_path)
+    expected = load_df(csv_path, snapshot=False)
+
+    pd.testing.assert_frame_equal(dataset.frame(), expected, check_flags=False)
+    assert list(dataset.attrs[VOCABULARY_ATTR]) == expected.attrs[VOCABULARY_ATTR]
+    mask = dataset["Note moyenne"] > 4
+    assert with_ingredient_names(dataset[mask])["Ingrédients"].tolist() == [
+        ["salt", "pepper"]
+    ]
+
+
+def test_lazy_recipes_is_read_only(csv_path):
+    dataset = LazyRecipes(csv_path)
+
+    with pytest.raises(ValueError):
+        dataset["Note moyenne"].iloc[0] = 1.0
+    # Les DataFrames construits à partir des colonnes restent modifiables
+    df = dataset[["Note moyenne"]]
+    df["Note"] = df["Note moyenne"] * 2
+    assert "Note" not in dataset.columns
+
+
+@pytest.mark.parametrize("ingredient_ids", [False, True])
+def test_lazy_recipes_parquet(tmp_path, ingredient_ids):
+    path = str(tmp_path / "clean.parquet")
+    ingredients = pa.array([["salt", "pepper"], [], ["salt"]], pa.list_(pa.string()))
+    metadata = None
+    if ingredient_ids:
+        ingredients = pa.array([[1, 0], [], [1]], pa.list_(pa.int32()))
+        metadata = {b"ingredients": b'["pepper", "salt"]'}
+    table = pa.table(
+        {
+            "Nom": RECIPES["Nom"],
+            "Ingrédients": ingredients,
+            "Techniques utilisées": [["bake"], ["fry", "boil"], []],
+            "Date de publication de la recette": pa.array(
+                pd.to_datetime(RECIPES["Date de publication de la recette"])
+            ),
+        }
+    ).replace_schema_metadata(metadata)
+    pq.write_table(table, path)
+
+    dataset = LazyRecipes(path)
+    assert dataset["Nombre de techniques utilisées"].tolist() == [1, 2, 0]
+    assert dataset.loaded_columns == [
+        "Techniques utilisées", "Nombre de techniques utilisées"
+    ]
+    expected = load_df_parquet(path)
+    pd.testing.assert_frame_equal(dataset.frame(), expected, check_flags=False)
+    assert dataset.vocabulary == tuple(expected.attrs[VOCABULARY_ATTR])
+    assert dataset.monthly_series("Date de publication de la recette").counts[0] == 2
+
+
+def test_lazy_recipes_without_snapshot(csv_path, monkeypatch):
+    def fail_write_snapshot(*args):
+        raise OSError("read-only")
+
+    monkeypatch.setattr(load_functions, "write_snapshot", fail_write_snapshot)
+    dataset = LazyRecipes(csv_path)
+
+    pd.testing.assert_frame_equal(
+        dataset.frame(), load_df(csv_path, snapshot=False), check_flags=False
+    )
+
+
+def test_lazy_recipes_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LazyRecipes(str(tmp_path / "missing.csv"))
+    assert lazy_recipes(str(tmp_path / "missing.csv")).empty
+
+
+def test_lazy_recipes_in_univariate_study(csv_path):
+    dataset = lazy_recipes(csv_path)
+    study = UnivariateStudy("lazy", dataset, "bar_ingredients")
+
+    elements, counts, _ = study.get_data_points_ingredients(
+        dataset, "Ingrédients", 2, [], []
+    )
+
+    assert elements == ["salt", "pepper"]
+    assert counts == [2, 1]
+    assert "Nom" not in dataset.loaded_columns
+    assert not dataset["Nombre d'ingrédients"].to_numpy().flags.writeable
+
+
+def test_univariate_study_counts_techniques_from_masks(tmp_path):
+    path = str(tmp_path / "clean.csv")
+    # bake, boil et fry : bits 0, 4 et 20
+    masks = {TECHNIQUES_MASK_COLUMN: [1, (1 << 4) | (1 << 20), 0]}
+    pd.DataFrame({**RECIPES, **masks}).to_csv(path, index=False)
+    dataset = LazyRecipes(path)
+    study = UnivariateStudy("lazy", dataset, "bar_techniques")
+
+    elements, counts, _ = study.get_data_points_ingredients(
+        dataset, "Techniques utilisées", 2, [], []
+    )
+
+    assert elements == ["bake", "boil"]
+    assert counts == [1, 1]
+    assert "Techniques utilisées" not in dataset.loaded_columns
+
+
+def test_prefetch_recipes(csv_path):
+    future = start_prefetch(csv_path)
+    assert start_prefetch(csv_path) is future
+
+    dataset = lazy_recipes(csv_path)
+    assert dataset is future.result()
+    assert "Date de publication de la recette" in dataset.loaded_columns
+    assert "Nom" not in dataset.loaded_columns
+
+
+def test_lazy_recipes_monthly_series(csv_path):
+    dataset = LazyRecipes(csv_path)
+
+    submissions = dataset.monthly_series("Date de publication de la recette")
+    comments = dataset.monthly_series("Dates des commentaires")
+
+    assert submissions.counts.tolist() == [2] + [0] * 15 + [1]
+    assert str(comments.start) == "2023-01"
+    assert comments.counts.tolist() == [1, 0, 2]
+    # Calculées une seule fois, sans garder la colonne des commentaires
+    assert dataset.monthly_series("Dates des commentaires") is comments
+    assert "Dates des commentaires" not in dataset.loaded_columns
+
+
+def test_lazy_recipes_waits_for_prefetch(csv_path, monkeypatch):
+    release = threading.Event()
+
+    def slow_prefetch(file_path):
+        release.wait()
+        return LazyRecipes(file_path)
+
+    monkeypatch.setattr(lazy_dataset, "prefetch_recipes", slow_prefetch)
+    future = start_prefetch(csv_path)
+    assert not future.done()
+    threading.Timer(0.05, release.set).start()
+
+    assert lazy_recipes(csv_path) is future.result()
+
+
+def test_lazy_recipes_retries_failed_prefetch(csv_path, monkeypatch):
+    calls = []
+
+    def failing_once_prefetch(file_path):
+        calls.append(file_path)
+        if len(calls) == 1:
+            raise OSError("file being written")
+        return LazyRecipes(file_path)
+
+    monkeypatch.setattr(lazy_dataset, "prefetch_recipes", failing_once_prefetch)
+    start_prefetch.clear()
+
+    assert lazy_recipes(csv_path).empty
+    dataset = lazy_recipes(csv_path)
+    assert isinstance(dataset, LazyRecipes)
+    assert lazy_recipes(csv_path) is dataset
+    assert len(calls) == 2
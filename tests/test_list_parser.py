@@ -0,0 +1,63 @@
+import ast
+import os
+import pytest
+import pandas as pd
+from utils.list_parser import parse_list, parse_list_column
+
+SAMPLE_RECIPES = os.path.join(
+    os.path.dirname(__file__), "..", "data", "RAW_recipes_sample.csv"
+)
+
+
+def assert_same_lists(result, expected):
+    assert len(result) == len(expected)
+    for result_list, expected_list in zip(result, expected):
+        assert result_list == expected_list
+        assert [type(x) for x in result_list] == [type(x) for x in expected_list]
+
+
+@pytest.mark.parametrize("column", ["tags", "steps", "nutrition", "ingredients"])
+def test_parse_list_column_matches_literal_eval_on_sample(column):
+    values = pd.read_csv(SAMPLE_RECIPES)[column]
+    assert_same_lists(
+        parse_list_column(values).tolist(), values.apply(ast.literal_eval).tolist()
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "[]",
+        "['salt', 'pepper']",
+        "[\"it's\", 'a \"quote\"']",
+        "['back\\\\slash', 'it\\'s', 'new\\nline']",
+        "[266.3, 12.0, -1, 0, .5, 1e3]",
+        "[1, 2,]",
+        "[ 'a' ,'b' ]",
+        "['\\x41\\u00e9']",
+        "[00]",
+        "['a' 'b']",
+        "[[1], [2]]",
+        "['a', 1]",
+        "[True, None]",
+    ],
+)
+def test_parse_list_matches_literal_eval(text):
+    assert_same_lists([parse_list(text)], [ast.literal_eval(text)])
+
+
+@pytest.mark.parametrize("text", ["[01]", "['a', ", "salt", float("nan")])
+def test_parse_list_malformed(text):
+    with pytest.raises((ValueError, SyntaxError)):
+        ast.literal_eval(text)
+    with pytest.raises((ValueError, SyntaxError)):
+        parse_list(text)
+
+
+def test_parse_list_column_copies_duplicates():
+    values = pd.Series(["['a']", "['a']"], index=[3, 5], name="tags")
+    result = parse_list_column(values)
+    assert result.index.tolist() == [3, 5]
+    assert result.name == "tags"
+    result.iloc[0].append("b")
+    assert result.iloc[1] == ["a"]
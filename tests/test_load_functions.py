@@ -1,15 +1,27 @@
 import pytest
+import numpy as np
 import pandas as pd
 import os
 import ast
+import pyarrow as pa
+import pyarrow.parquet as pq
 from utils.load_functions import (
     load_csv,
     load_css,
     load_df,
+    load_df_parquet,
     load_data,
     initialize_recipes_df,
+    freeze_column,
     compute_trend,
 )
+from utils.snapshot import snapshot_path
+from utils.ingredients import (
+    VOCABULARY_ATTR,
+    save_vocabulary,
+    encode_ingredients,
+    with_ingredient_names,
+)
 
 
 def test_load_csv_valid_file(tmp_path):
@@ -66,7 +78,9 @@ def test_load_df_valid_file(tmp_path):
     )
     df.to_csv(file_path, index=False)
     loaded_df = load_df(str(file_path))
-    assert loaded_df["Ingrédients"].iloc[0] == ["salt", "pepper"]
+    assert loaded_df.attrs[VOCABULARY_ATTR] == ["pepper", "salt", "sugar"]
+    assert list(loaded_df["Ingrédients"].iloc[0]) == [1, 0]
+    assert with_ingredient_names(loaded_df)["Ingrédients"].iloc[0] == ["salt", "pepper"]
     assert loaded_df["Nombre d'ingrédients"].iloc[0] == 2
     assert loaded_df["Techniques utilisées"].iloc[0] == ["bake"]
     assert loaded_df["Nombre de techniques utilisées"]    .iloc[0] == 1
@@ -81,6 +95,115 @@ def test_load_df_file_not_found(tmp_path):
         load_df(str(file_path))
 
 
+def test_load_df_snapshot(tmp_path, monkeypatch):
+    file_path = tmp_path / "test.csv"
+    df = pd.DataFrame(
+        {
+            "Ingrédients": ["['salt', 'pepper']", "['sugar']"],
+            "Techniques utilisées": ["['bake']", "[]"],
+            "Date de publication de la recette": ["2023-01-01", "2023-01-02"],
+            "Note moyenne": [4.5, None],
+            "Catégorie": ["a", "a"],
+        }
+    )
+    df.to_csv(file_path, index=False)
+    expected = load_df(str(file_path))
+    assert os.path.exists(snapshot_path(str(file_path)))
+
+    def fail_load_csv(*args, **kwargs):
+        raise AssertionError("Le CSV ne doit pas être relu")
+
+    with monkeypatch.context() as patch_context:
+        patch_context.setattr("utils.load_functions.load_csv", fail_load_csv)
+        loaded_df = load_df(str(file_path))
+        pd.testing.assert_frame_equal(loaded_df, expected)
+        assert loaded_df.attrs == expected.attrs
+        # Même contenu, autre date de modification : l'instantané reste valide
+        os.utime(file_path, ns=(0, 0))
+        pd.testing.assert_frame_equal(load_df(str(file_path)), expected)
+
+    # Un nouveau vocabulaire ou un CSV modifié rendent l'instantané périmé
+    save_vocabulary(str(tmp_path / "ingredient_vocabulary.csv"), ["sugar", "salt"])
+    assert list(load_df(str(file_path))["Ingrédients"].iloc[1]) == [0]
+    df.head(1).to_csv(file_path, index=False)
+    assert len(load_df(str(file_path))) == 1
+    assert len(load_df(str(file_path), snapshot=False)) == 1
+
+
+def test_load_df_parquet_matches_load_df(tmp_path):
+    csv_path = tmp_path / "test.csv"
+    parquet_path = tmp_path / "test.parquet"
+    pd.DataFrame(
+        {
+            "Nom": ["soup", "cake"],
+            "Ingrédients": ["['salt', 'pepper']", "[]"],
+            "Techniques utilisées": ["['bake']", "['fry', 'boil']"],
+            "Date de publication de la recette": ["2023-01-01", "2023-01-02"],
+        }
+    ).to_csv(csv_path, index=False)
+    table = pa.table(
+        {
+            "Nom": ["soup", "cake"],
+            "Ingrédients": pa.array([["salt", "pepper"], []], pa.list_(pa.string())),
+            "Techniques utilisées": [["bake"], ["fry", "boil"]],
+            "Date de publication de la recette": pa.array(
+                pd.to_datetime(["2023-01-01", "2023-01-02"])
+            ),
+        }
+    )
+    pq.write_table(table, parquet_path)
+
+    loaded_df = load_df_parquet(str(parquet_path))
+    pd.testing.assert_frame_equal(loaded_df, load_df(str(csv_path)))
+    assert loaded_df.attrs == load_df(str(csv_path)).attrs
+    assert with_ingredient_names(loaded_df)["Ingrédients"].iloc[0] == ["salt", "pepper"]
+
+
+def test_load_df_uses_ingredient_vocabulary(tmp_path):
+    file_path = tmp_path / "test.csv"
+    pd.DataFrame(
+        {
+            "Ingrédients": ["['salt', 'pepper']", "['sugar']"],
+            "Techniques utilisées": ["['bake']", "['fry']"],
+            "Date de publication de la recette": ["2023-01-01", "2023-01-02"],
+        }
+    ).to_csv(file_path, index=False)
+    save_vocabulary(str(tmp_path / "ingredient_vocabulary.csv"), ["salt", "flour"])
+
+    loaded_df = load_df(str(file_path))
+    # Les ingrédients absents du vocabulaire sont ajoutés à la fin
+    assert loaded_df.attrs[VOCABULARY_ATTR] == ["salt", "flour", "pepper", "sugar"]
+    assert list(loaded_df["Ingrédients"].iloc[0]) == [0, 2]
+
+
+def test_load_df_parquet_ingredient_ids(tmp_path):
+    vocabulary = ["pepper", "salt"]
+    table = pa.table(
+        {
+            "Ingrédients": pa.array(
+                encode_ingredients([["salt", "pepper"], ["salt"]], vocabulary)
+            ),
+            "Techniques utilisées": [["bake"], ["fry", "boil"]],
+            "Date de publication de la recette": pa.array(
+                pd.to_datetime(["2023-01-01", "2023-01-02"])
+            ),
+        }
+    ).replace_schema_metadata({"ingredients": '["pepper", "salt"]'})
+    pq.write_table(table, tmp_path / "test.parquet")
+
+    loaded_df = load_df_parquet(str(tmp_path / "test.parquet"))
+    assert loaded_df.attrs[VOCABULARY_ATTR] == vocabulary
+    assert loaded_df["Nombre d'ingrédients"].tolist() == [2, 1]
+    assert with_ingredient_names(loaded_df)["Ingrédients"].tolist() == [
+        ["salt", "pepper"], ["salt"]
+    ]
+
+
+def test_load_df_parquet_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_df_parquet(str(tmp_path / "non_existent.parquet"))
+
+
 def test_load_data_valid_file(tmp_path):
     file_path = tmp_path / "test.csv"
     df = pd.DataFrame({"col1": [1, 2], "col2": [3, 4]})
@@ -120,7 +243,7 @@ def test_initialize_recipes_df_valid_file(tmp_path):
     )
     df.to_csv(file_path, index=False)
     loaded_df = initialize_recipes_df(str(file_path))
-    assert loaded_df["Ingrédients"].iloc[0] == ["salt", "pepper"]
+    assert with_ingredient_names(loaded_df)["Ingrédients"].iloc[0] == ["salt", "pepper"]
     assert loaded_df["Nombre d'ingrédients"].iloc[0] == 2
     assert loaded_df["Techniques utilisées"].iloc[0] == ["bake"]
     assert loaded_df["Nombre de techniques utilisées"].iloc[0] == 1
@@ -169,6 +292,26 @@ def test_initialize_recipes_df_unexpected_error(tmp_path, monkeypatch, caplog):
     )
 
 
+def test_freeze_column_is_read_only():
+    df = pd.DataFrame(
+        {
+            "Note moyenne": [4.5, 3.0],
+            "Nombre d'étapes": pd.Series([3, 5], dtype="int8"),
+            "Catégorie": pd.Categorical(["a", "b"]),
+            "Date de publication de la recette": pd.to_datetime(["2023-01-01", "2023-01-02"]),
+        }
+    )
+    df["Ingrédients"] = encode_ingredients([["salt"], ["sugar"]], ["salt", "sugar"])
+
+    frozen = pd.DataFrame(
+        {column: freeze_column(df[column]) for column in df.columns}, copy=False
+    )
+    pd.testing.assert_frame_equal(frozen, df, check_flags=False)
+    for column in ["Note moyenne", "Nombre d'étapes", "Catégorie"]:
+        with pytest.raises(ValueError):
+            frozen.loc[0, column] = frozen.loc[1, column]
+
+
 def test_compute_trend_valid_data():
     df = pd.DataFrame(
         {
@@ -182,6 +325,51 @@ def test_compute_trend_valid_data():
     assert len(trend_df.dropna()) > 0
 
 
+def test_compute_trend_does_not_modify_df():
+    df = pd.DataFrame(
+        {
+            "Date de publication de la recette": pd.date_range(
+                start="2021-01-01", periods=48, freq="15D"
+            ),
+        }
+    )
+    expected = df.copy()
+
+    trend_df = compute_trend(df)
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert trend_df["Date"].iloc[0] == pd.Timestamp("2021-01-01")
+    assert len(trend_df) == 24
+
+
+def test_compute_trend_counts_empty_months():
+    # Une recette par jour pendant 36 mois, sauf en mars 2021
+    dates = pd.date_range(start="2021-01-01", end="2023-12-31", freq="D")
+    dates = dates[~((dates.year == 2021) & (dates.month == 3))]
+    df = pd.DataFrame({"Date de publication de la recette": dates})
+
+    trend_df = compute_trend(df)
+
+    # Mars 2021 fait partie de la série, avec un effectif nul
+    months = pd.date_range(start="2021-01-01", periods=36, freq="MS")
+    assert trend_df["Date"].tolist() == months.tolist()
+    counts = (
+        df["Date de publication de la recette"]
+        .dt.to_period("M")
+        .value_counts()
+        .reindex(months.to_period("M"), fill_value=0)
+    )
+    assert counts.iloc[2] == 0
+    # La tendance est la moyenne mobile centrée sur 12 mois de ces effectifs
+    weights = np.array([0.5] + [1] * 11 + [0.5]) / 12
+    expected = np.full(36, np.nan)
+    expected[6:-6] = np.convolve(counts.to_numpy(), weights, mode="valid")
+    np.testing.assert_allclose(trend_df["Moyenne glissante"], expected)
+    # Le modèle multiplicatif ne s'applique pas à une série avec un mois vide
+    with pytest.raises(ValueError):
+        compute_trend(df, model="multiplicative")
+
+
 def test_compute_trend_empty_data():
     df = pd.DataFrame(columns=["Date de publication de la recette", "count"])
     trend_df = compute_trend(df)
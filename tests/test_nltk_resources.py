@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+
+import nltk
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(root)
+
+from scripts.nltk_resources import NltkResources, resource_files, MANIFEST
+
+RESOURCES = {"stopwords": "corpora/stopwords", "punkt_tab": "tokenizers/punkt_tab"}
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    downloaded = []
+
+    def download(name, download_dir, quiet):
+        downloaded.append(name)
+        path = os.path.join(download_dir, RESOURCES[name], "english")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(f"{name} data")
+
+    monkeypatch.setattr("scripts.nltk_resources.nltk.download", download)
+    return downloaded
+
+
+@pytest.fixture
+def nltk_path(monkeypatch):
+    monkeypatch.setattr(nltk.data, "path", list(nltk.data.path))
+    return nltk.data.path
+
+
+def test_bundle_writes_manifest(tmp_path, fake_download):
+    manifest = NltkResources(str(tmp_path), RESOURCES).bundle()
+
+    assert fake_download == ["stopwords", "punkt_tab"]
+    assert manifest["nltk_version"] == nltk.__version__
+    assert manifest["resources"]["stopwords"]["path"] == "corpora/stopwords"
+    assert list(manifest["resources"]["stopwords"]["files"]) == [
+        "corpora/stopwords/english"
+    ]
+    assert json.loads((tmp_path / MANIFEST).read_text()) == manifest
+
+
+def test_bundle_skips_valid_resources(tmp_path, fake_download):
+    NltkResources(str(tmp_path), RESOURCES).bundle()
+    (tmp_path / "corpora" / "stopwords" / "english").write_text("changed")
+
+    NltkResources(str(tmp_path), RESOURCES).bundle()
+    assert fake_download == ["stopwords", "punkt_tab", "stopwords"]
+
+    NltkResources(str(tmp_path), RESOURCES).bundle(["punkt_tab"], force=True)
+    assert fake_download[-1] == "punkt_tab"
+
+
+def test_bundle_missing_resource(tmp_path, monkeypatch):
+    monkeypatch.setattr("scripts.nltk_resources.nltk.download", lambda *a, **k: False)
+    with pytest.raises(LookupError):
+        NltkResources(str(tmp_path), RESOURCES).bundle()
+
+
+def test_require_uses_bundle(tmp_path, fake_download, nltk_path):
+    NltkResources(str(tmp_path), RESOURCES).bundle()
+    resources = NltkResources(str(tmp_path), RESOURCES)
+
+    resources.require("stopwords")
+    assert nltk_path[0] == str(tmp_path)
+    assert resources.loaded == {"stopwords"}
+    resources.require("stopwords", "punkt_tab")
+    assert nltk_path.count(str(tmp_path)) == 1
+
+
+def test_require_checks_checksums(tmp_path, fake_download, nltk_path):
+    NltkResources(str(tmp_path), RESOURCES).bundle()
+    (tmp_path / "tokenizers" / "punkt_tab" / "english").write_text("corrupted")
+    resources = NltkResources(str(tmp_path), RESOURCES)
+
+    # Only the resources that are required are checked
+    resources.require("stopwords")
+    with pytest.raises(ValueError):
+        resources.require("punkt_tab")
+
+
+def test_require_without_bundle(tmp_path, nltk_path):
+    before = list(nltk_path)
+    resources = NltkResources(str(tmp_path / "missing"), RESOURCES)
+
+    resources.require("stopwords")
+    assert nltk_path == before
+
+
+def test_resource_files_zip(tmp_path):
+    (tmp_path / "corpora").mkdir()
+    (tmp_path / "corpora" / "wordnet.zip").write_bytes(b"zip")
+
+    assert resource_files(str(tmp_path), "corpora/wordnet") == ["corpora/wordnet.zip"]
+    assert resource_files(str(tmp_path), "corpora/stopwords") == []
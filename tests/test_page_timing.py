@@ -0,0 +1,23 @@
+import logging
+
+import streamlit as st
+from utils import page_timing
+from utils.page_timing import page_start, log_first_paint
+
+
+def test_log_first_paint_once_per_page(caplog, monkeypatch):
+    monkeypatch.setattr(page_timing, "_process_painted", page_timing.threading.Event())
+    caplog.set_level(logging.INFO)
+    for key in ["first_paint_logged_Accueil", "first_paint_logged_Carte"]:
+        if key in st.session_state:
+            del st.session_state[key]
+
+    start = page_start()
+    assert log_first_paint("Accueil", start) >= 0
+    log_first_paint("Accueil", page_start())
+    log_first_paint("Carte", page_start())
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert sum("après le démarrage du serveur" in m for m in messages) == 1
+    assert sum("Premier affichage de la page Accueil" in m for m in messages) == 1
+    assert sum("Premier affichage de la page Carte" in m for m in messages) == 1
@@ -4,6 +4,10 @@ import sys
 import os
 import pytest
 import pandas as pd
+import numpy as np
+import math
+import ast
+import pstats
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -89,19 +93,31 @@ from unittest.mock import patch
 from scripts.pipeline_preprocess import load_nltk_resources
 
 
-def test_load_nltk_resources():
+def test_load_nltk_resources(tmp_path):
+    from scripts.nltk_resources import RESOURCES
+
+    def fake_download(name, download_dir, quiet):
+        path = os.path.join(download_dir, RESOURCES[name])
+        os.makedirs(path)
+        with open(os.path.join(path, "data.txt"), "w") as file:
+            file.write(name)
+
     # Patch `nltk.download` pour éviter les téléchargements réels
-    with patch("scripts.pipeline_preprocess.nltk.download") as mock_download:
-        # Exécuter la fonction
-        load_nltk_resources()
+    with patch("scripts.pipeline_preprocess.nltk.download", side_effect=fake_download) as mock_download:
+        manifest = load_nltk_resources(str(tmp_path))
 
         # Vérifier que `nltk.download` a été appelée pour chaque ressource
-        mock_download.assert_any_call("punkt_tab")
-        mock_download.assert_any_call("averaged_perceptron_tagger")
-        mock_download.assert_any_call("wordnet")
-        mock_download.assert_any_call("stopwords")
+        mock_download.assert_any_call("punkt_tab", download_dir=str(tmp_path), quiet=True)
+        mock_download.assert_any_call(
+            "averaged_perceptron_tagger_eng", download_dir=str(tmp_path), quiet=True
+        )
+        mock_download.assert_any_call("wordnet", download_dir=str(tmp_path), quiet=True)
+        mock_download.assert_any_call("stopwords", download_dir=str(tmp_path), quiet=True)
+        assert mock_download.call_count == 4
+        assert sorted(manifest["resources"]) == sorted(RESOURCES)
 
-        # Vérifier que `nltk.download` a été appelée exactement 4 fois
+        # Les ressources déjà dans le paquet ne sont plus téléchargées
+        load_nltk_resources(str(tmp_path))
         assert mock_download.call_count == 4
 
 
@@ -380,6 +396,41 @@ def test_ingredient_to_ingredient_processed():
     assert result_replaced == expected_replaced
 
 
+from scripts.pipeline_preprocess import processed_ingredient
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "apply"])
+def test_processed_ingredient_engines(engine, monkeypatch):
+    ingredients_data = pd.DataFrame({
+        "raw_ingr": ["pink salt", "roman salad", "flour", "pink salt"],
+        "processed": ["salt", "salad", np.nan, "pink salt"],
+        "replaced": ["salt", "salad", "wheat flour", "salt"],
+    })
+    monkeypatch.setattr(
+        "scripts.pipeline_preprocess.load_data", lambda path: ingredients_data.copy()
+    )
+    data = pd.DataFrame(
+        {"ingredients": [["flour", "letuce", "pink salt"], [], ["roman salad"]]},
+        index=[4, 7, 9],
+    )
+
+    result = processed_ingredient(data, engine=engine)
+
+    assert result.index.tolist() == [4, 7, 9]
+    processed = result["ingredients_processed"].tolist()
+    assert processed[0][0] is np.nan or math.isnan(processed[0][0])
+    assert processed[0][1:] == [None, "pink salt"]
+    assert processed[1:] == [[], ["salad"]]
+    assert result["ingredients_replaced"].tolist() == [
+        ["wheat flour", None, "salt"], [], ["salad"]
+    ]
+
+
+def test_processed_ingredient_unknown_engine():
+    with pytest.raises(ValueError):
+        processed_ingredient(pd.DataFrame({"ingredients": [[]]}), engine="spark")
+
+
 from scripts.pipeline_preprocess import save_data
 
 
@@ -406,6 +457,36 @@ def test_save_data_json(tmp_path):
     pd.testing.assert_frame_equal(result_df, test_df)
 
 
+from scripts.pipeline_preprocess import save_data_parquet
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date
+
+
+def test_save_data_parquet(tmp_path):
+    test_df = pd.DataFrame({
+        "Nom": ["soup", "cake"],
+        "Note moyenne": [4.5, 3.0],
+        "Date de publication de la recette": [date(2005, 1, 2), date(2006, 3, 4)],
+        "Ingrédients": [["salt", None], []],
+        "Techniques utilisées": [[], ["bake"]],
+        "Dates des commentaires": [[date(2007, 1, 1)], []],
+    })
+    test_parquet_path = tmp_path / "test_data.parquet"
+
+    save_data_parquet(test_df, test_parquet_path, recipe_ids=[10, 12])
+
+    table = pq.read_table(test_parquet_path)
+    assert table.schema.field("recipe_id").type == pa.int64()
+    assert table.schema.field("Date de publication de la recette").type == pa.timestamp("ns")
+    assert table.schema.field("Ingrédients").type == pa.list_(pa.string())
+    assert table.schema.field("Techniques utilisées").type == pa.list_(pa.string())
+    assert table.schema.field("Dates des commentaires").type == pa.list_(pa.timestamp("ns"))
+    assert table.column("recipe_id").to_pylist() == [10, 12]
+    assert table.column("Ingrédients").to_pylist() == [["salt", None], []]
+    assert table.column("Dates des commentaires").to_pylist()[0][0].date() == date(2007, 1, 1)
+
+
 from scripts.pipeline_preprocess import explicit_nutriments
 
 
@@ -462,7 +543,8 @@ def test_change_techniques_to_words():
         "techniques": [
             ["bake"],
             ["barbecue"]
-        ]
+        ],
+        "techniques_mask": np.array([1, 2], dtype=np.uint64),
     })
 
     pd.testing.assert_frame_equal(result, expected)
@@ -508,6 +590,35 @@ def test_explicit_nutriments_invalid_format():
         explicit_nutriments(data)
 
 
+from scripts.pipeline_preprocess import nutrition_matrix
+
+
+def test_nutrition_matrix_texts_and_lists():
+    texts = pd.Series(["[51.5, 0.0, 13.0, 0.0, 2.0, 0.0, 4.0]", "[1e3, 1, 2, 3, 4, 5, .5]"])
+    expected = np.array([[51.5, 0, 13, 0, 2, 0, 4], [1000, 1, 2, 3, 4, 5, 0.5]])
+
+    result = nutrition_matrix(texts, np.float32)
+    assert result.dtype == np.float32
+    assert result.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(result, expected.astype(np.float32))
+    np.testing.assert_array_equal(nutrition_matrix(texts.map(ast.literal_eval)), expected)
+    # Texts the numpy parser does not read go through the list parser
+    np.testing.assert_array_equal(
+        nutrition_matrix(pd.Series(["[51.5, 0.0, 13.0, 0.0, 2.0, 0.0, 4.0]  ", texts[1]])),
+        expected,
+    )
+    with pytest.raises(ValueError):
+        nutrition_matrix(pd.Series(["[1, 2, 3, 4, 5, 6]", "[1, 2, 3, 4, 5, 6, 7, 8]"]))
+
+
+def test_explicit_nutriments_kept_columns():
+    data = pd.DataFrame({"nutrition": ["[100.4, 10, 5, 200, 15, 3, 50]"]})
+    result = explicit_nutriments(data, ["calories"], np.float32)
+    assert list(result.columns) == ["nutrition", "calories"]
+    assert result["calories"].dtype == np.float32
+    assert result["calories"].iloc[0] == np.float32(100.4)
+
+
 from scripts.pipeline_preprocess import create_colums_count
 from scripts.pipeline_preprocess import create_mean_rating
 
@@ -557,7 +668,8 @@ from unittest.mock import patch, MagicMock
 @patch("scripts.pipeline_preprocess.rename_column")
 @patch("scripts.pipeline_preprocess.create_mean_rating")
 @patch("scripts.pipeline_preprocess.create_colums_count")
-@patch("scripts.pipeline_preprocess.load_nltk_resources")
+@patch("scripts.pipeline_preprocess.nltk.download")
+@patch("scripts.pipeline_preprocess.use_nltk_data")
 @patch("scripts.pipeline_preprocess.load_data")
 @patch("scripts.pipeline_preprocess.change_to_date_time_format")
 @patch("scripts.pipeline_preprocess.change_to_list")
@@ -576,7 +688,11 @@ from unittest.mock import patch, MagicMock
 @patch("scripts.pipeline_preprocess.delete_outliers_calories")
 @patch("scripts.pipeline_preprocess.save_data")
 @patch("scripts.pipeline_preprocess.save_data_json")
+@patch("scripts.pipeline_preprocess.save_data_parquet")
+@patch("scripts.pipeline_preprocess.save_ingredient_vocabulary")
 def test_preprocess(
+    mock_save_ingredient_vocabulary,
+    mock_save_data_parquet,
     mock_save_data_json,
     mock_save_data,
     mock_delete_outliers_calories,
@@ -595,7 +711,8 @@ def test_preprocess(
     mock_change_to_list,
     mock_change_to_date_time_format,
     mock_load_data,
-    mock_load_nltk_resources,
+    mock_use_nltk_data,
+    mock_download,
     mock_create_colums_count,
     mock_create_mean_rating,
     mock_rename_column,
@@ -609,10 +726,12 @@ def test_preprocess(
 
     preprocess()
 
-    mock_load_nltk_resources.assert_called_once()
+    mock_use_nltk_data.assert_called_once()
+    # Le démarrage ne télécharge plus rien
+    mock_download.assert_not_called()
     assert mock_load_data.call_count == 3
     assert mock_change_to_date_time_format.call_count == 2
-    assert mock_change_to_list.call_count == 5
+    assert mock_change_to_list.call_count == 4
     mock_merge_dataframe.assert_called()
     mock_groupby.assert_called_once()
     mock_change_na_description_by_name.assert_called_once()
@@ -628,6 +747,636 @@ def test_preprocess(
     mock_delete_outliers_calories.assert_called_once()
     mock_save_data.assert_called_once()
     mock_save_data_json.assert_called_once()
+    mock_save_data_parquet.assert_called_once()
+    mock_save_ingredient_vocabulary.assert_called_once()
     mock_create_colums_count.assert_called_once()
     mock_create_mean_rating.assert_called_once()
     mock_rename_column.assert_called_once()
+
+
+from scripts.pipeline_preprocess import groupby_chunked, get_number_of_partitions
+
+
+def make_raw_tables():
+    raw_recipes = pd.DataFrame({
+        "name": ["soup", "cake", "salad", "stew"],
+        "id": [10, 11, 12, 13],
+        "minutes": [30, 60, 10, 120],
+        "contributor_id": [1, 2, 3, 4],
+        "submitted": ["2002-01-01", "2003-05-06", "2004-07-08", "2005-09-10"],
+        "tags": ["['a']", "['b', 'c']", "['d']", "['e']"],
+        "nutrition": ["[100.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]"] * 4,
+        "n_steps": [2, 3, 1, 4],
+        "steps": ["['boil']", "['mix', 'bake']", "['cut']", "['stew']"],
+        "description": ["hot soup", None, "fresh salad", "long stew"],
+        "ingredients": ["['water']", "['flour', 'sugar']", "['lettuce']", "['beef']"],
+        "n_ingredients": [1, 2, 1, 1],
+    })
+    raw_interactions = pd.DataFrame({
+        "user_id": [100, 101, 102, 103, 104, 105, 106],
+        "recipe_id": [11, 10, 11, 12, 10, 99, 11],
+        "date": ["2004-01-01", "2004-02-01", "2004-03-01", "2005-01-01",
+                 "2006-01-01", "2006-02-01", "2007-01-01"],
+        "rating": [5, 4, 3, 5, 2, 1, 4],
+        "review": ["great", "good", None, "fresh", "meh", "lost", "nice"],
+    })
+    pp_recipes = pd.DataFrame({
+        "id": [10, 11, 12, 13],
+        "i": [0, 1, 2, 3],
+        "name_tokens": ["[1]", "[2]", "[3]", "[4]"],
+        "ingredient_tokens": ["[[1]]", "[[2]]", "[[3]]", "[[4]]"],
+        "steps_tokens": ["[5]", "[6]", "[7]", "[8]"],
+        "techniques": ["[1, 0]", "[0, 1]", "[1, 1]", "[0, 0]"],
+        "calorie_level": [0, 1, 2, 0],
+        "ingredient_ids": ["[1]", "[2, 3]", "[4]", "[5]"],
+    })
+    return raw_recipes, raw_interactions, pp_recipes
+
+
+def parse_raw_tables(raw_recipes, raw_interactions, pp_recipes):
+    raw_recipes = change_to_date_time_format(raw_recipes, "submitted")
+    for column in ["tags", "steps", "ingredients"]:
+        raw_recipes = change_to_list(raw_recipes, column)
+    pp_recipes = change_to_list(pp_recipes, "techniques")
+    if raw_interactions is not None:
+        raw_interactions = change_to_date_time_format(raw_interactions, "date")
+    return raw_recipes, raw_interactions, pp_recipes
+
+
+def test_get_number_of_partitions(tmp_path):
+    path = tmp_path / "interactions.csv"
+    path.write_bytes(b"x" * 1024 * 1024)
+
+    assert get_number_of_partitions(path, 1024) == 1
+    assert get_number_of_partitions(path, 1) == 4
+    with pytest.raises(ValueError):
+        get_number_of_partitions(path, 0)
+
+
+def test_groupby_chunked_matches_in_memory(tmp_path):
+    raw_recipes, raw_interactions, pp_recipes = make_raw_tables()
+    interactions_path = tmp_path / "RAW_interactions.csv"
+    raw_interactions.to_csv(interactions_path, index=False)
+
+    recipes, interactions, pp = parse_raw_tables(
+        raw_recipes.copy(), pd.read_csv(interactions_path), pp_recipes.copy()
+    )
+    df = merge_dataframe(recipes, interactions, "id", "recipe_id")
+    df = merge_dataframe(pp, df, "id", "recipe_id")
+    expected = groupby(df)
+
+    recipes, _, pp = parse_raw_tables(raw_recipes.copy(), None, pp_recipes.copy())
+    # A tiny memory ceiling and chunksize force several partitions and chunks
+    result = groupby_chunked(
+        recipes, pp, interactions_path, memory_limit_mb=0.0005, chunksize=2,
+        tmp_dir=tmp_path,
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.to_csv(index=False) == expected.to_csv(index=False)
+
+
+from scripts.pipeline_preprocess import group_offsets, offsets_to_lists
+
+
+def test_group_offsets():
+    order, keys, offsets = group_offsets(np.array([3, 1, 3, 2, 1]))
+
+    assert list(order) == [1, 4, 3, 0, 2]
+    assert list(keys) == [1, 2, 3]
+    assert list(offsets) == [0, 2, 3, 5]
+    assert offsets_to_lists(np.array([10, 40, 30, 0, 20]), offsets) == [
+        [10, 40], [30], [0, 20]
+    ]
+
+
+def test_group_offsets_empty():
+    order, keys, offsets = group_offsets(np.array([], dtype=np.int64))
+
+    assert len(keys) == 0
+    assert offsets_to_lists(np.array([]), offsets) == []
+
+
+def test_groupby_engines_match():
+    raw_recipes, raw_interactions, pp_recipes = make_raw_tables()
+    recipes, interactions, pp = parse_raw_tables(
+        raw_recipes, raw_interactions, pp_recipes
+    )
+    df = merge_dataframe(recipes, interactions, "id", "recipe_id")
+    df = merge_dataframe(pp, df, "id", "recipe_id")
+
+    expected = groupby(df, engine="pandas")
+    result = groupby(df, engine="vectorized")
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_groupby_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown groupby engine"):
+        groupby(pd.DataFrame({"recipe_id": [1]}), engine="spark")
+
+
+class FakeTagger:
+    """Tag the words starting with "the" as determiners, the others as nouns"""
+
+    def tag(self, tokens):
+        return [(token, "DT" if token.startswith("the") else "NN") for token in tokens]
+
+
+@patch("nltk.word_tokenize", side_effect=str.split)
+@patch("scripts.pipeline_preprocess.get_pos_tagger", return_value=FakeTagger())
+def test_clean_colonne_parallel_keeps_order(mock_get_pos_tagger, mock_word_tokenize):
+    texts = [f"the soup number {i} chicken" for i in range(25)] + ["the", "stew"]
+    data = pd.DataFrame({"text_column": texts}, index=range(100, 127))
+
+    result = clean_colonne(
+        data.copy(), "text_column", {"number"}, n_jobs=2, batch_size=4
+    )
+
+    expected = [clean_and_tokenize(text, {"number"}, tagger=FakeTagger()) for text in texts]
+    assert result["cleaned_text_column"].tolist() == expected
+    assert list(result.index) == list(data.index)
+    assert result["cleaned_text_column"].iloc[0] == ["soup", "chicken"]
+
+
+from scripts.pipeline_preprocess import open_token_cache, token_cache_fingerprint
+
+
+@patch("scripts.pipeline_preprocess.clean_and_tokenize")
+def test_clean_colonne_dedupes_and_uses_cache(mock_clean_and_tokenize, tmp_path):
+    mock_clean_and_tokenize.side_effect = lambda text, stopwords: text.split()
+    stopwords = {"to"}
+    cache_path = str(tmp_path / "tokens.sqlite")
+    data = pd.DataFrame({"name": ["stir fry", "beef stew", "stir fry"]})
+
+    with open_token_cache(cache_path, stopwords) as cache:
+        result = clean_colonne(data.copy(), "name", stopwords, cache=cache)
+    assert result["cleaned_name"].tolist() == [["stir", "fry"], ["beef", "stew"], ["stir", "fry"]]
+    assert mock_clean_and_tokenize.call_count == 2
+
+    data = pd.DataFrame({"name": ["beef stew", "pot roast"]})
+    with open_token_cache(cache_path, stopwords) as cache:
+        result = clean_colonne(data.copy(), "name", stopwords, cache=cache)
+    assert result["cleaned_name"].tolist() == [["beef", "stew"], ["pot", "roast"]]
+    mock_clean_and_tokenize.assert_called_with("pot roast", stopwords)
+    assert mock_clean_and_tokenize.call_count == 3
+
+
+def test_token_cache_fingerprint():
+    assert token_cache_fingerprint({"a", "b"}) == token_cache_fingerprint({"b", "a"})
+    assert token_cache_fingerprint({"a"}) != token_cache_fingerprint({"a", "b"})
+
+
+from scripts.pipeline_preprocess import preprocess_incremental, parse_date_list
+import json
+from utils.ingredients import load_vocabulary
+from datetime import date
+
+
+def make_dump(new=False, troll=False, troll_interaction=False, same_day=False):
+    ids = list(range(10, 18)) + ([18] if new else []) + ([19] if troll else [])
+    minutes = [30, 60, 10, 120, 5000, 9000, 45, 20, 25, 100000][: len(ids)]
+    recipes = pd.DataFrame({
+        "name": [f"recipe {i}" for i in ids],
+        "id": ids,
+        "minutes": minutes,
+        "contributor_id": [1] * len(ids),
+        "submitted": ["2001-01-01"] * 8 + ["2007-01-01"] * (len(ids) - 8),
+        "tags": ["['tag']"] * len(ids),
+        "nutrition": [f"[{100.5 + i}, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]" for i in ids],
+        "n_steps": [2] * len(ids),
+        "steps": ["['step']"] * len(ids),
+        "description": [None if i == 11 else f"the description {i}" for i in ids],
+        "ingredients": ["['salt', 'flour', 'unknown']"] * len(ids),
+        "n_ingredients": [3] * len(ids),
+    })
+    old = [(10, "2002-01-01", 5), (11, "2002-02-01", 4), (10, "2003-01-01", 4),
+           (12, "2003-06-01", 3), (13, "2004-01-01", 5), (14, "2004-02-01", 1),
+           (15, "2005-01-01", 2), (17, "2005-12-31", 5)]
+    rows = old
+    if new:
+        rows = rows + [(10, "2006-01-01", 4), (16, "2006-02-01", 4), (18, "2007-02-01", 5),
+                       (99, "2007-03-01", 5), (17, "2008-01-01", 4)]
+    if troll:
+        rows = rows + [(19, "2008-02-01", 5)]
+    if troll_interaction:
+        # A new interaction of the troll recipe 15
+        rows = rows + [(15, "2008-03-01", 3)]
+    if same_day:
+        # Appended on the day of the last interaction of the old dump
+        rows = rows + [(12, "2005-12-31", 2)]
+    reviews = ["Great recipe!", "Too salty, not good.", "We loved it", "review"]
+    interactions = pd.DataFrame({
+        "user_id": range(len(rows)),
+        "recipe_id": [r[0] for r in rows],
+        "date": [r[1] for r in rows],
+        "rating": [r[2] for r in rows],
+        # The only review of recipe 11 is missing
+        "review": [None if i == 1 else reviews[i % 4] for i in range(len(rows))],
+    })
+    pp = pd.DataFrame({
+        "id": ids,
+        "i": range(len(ids)),
+        "name_tokens": ["[1]"] * len(ids),
+        "ingredient_tokens": ["[[1]]"] * len(ids),
+        "steps_tokens": ["[1]"] * len(ids),
+        "techniques": ["[1, 0, 1]"] * len(ids),
+        "calorie_level": [0] * len(ids),
+        "ingredient_ids": ["[1]"] * len(ids),
+    })
+    ingredients = pd.DataFrame({
+        "raw_ingr": ["salt", "flour"],
+        "processed": ["salt", "flour"],
+        "replaced": ["salt", "wheat flour"],
+    })
+    return recipes, interactions, pp, ingredients
+
+
+def write_dump(directory, dump):
+    recipes, interactions, pp, ingredients = dump
+    recipes.to_csv(directory / "RAW_recipes.csv", index=False)
+    interactions.to_csv(directory / "RAW_interactions.csv", index=False)
+    pp.to_csv(directory / "PP_recipes.csv", index=False)
+    ingredients.to_csv(directory / "ingredients.csv", index=False)
+
+
+@pytest.fixture
+def offline_pipeline(monkeypatch):
+    monkeypatch.setattr("scripts.pipeline_preprocess.get_stopwords", lambda: {"the"})
+    monkeypatch.setattr(
+        "scripts.pipeline_preprocess.clean_and_tokenize",
+        lambda text, stopwords: [w for w in text.split() if w not in stopwords],
+    )
+
+    def use_data_dir(directory):
+        monkeypatch.setattr("scripts.pipeline_preprocess.PATH_DATA", str(directory) + os.sep)
+
+    return use_data_dir
+
+
+def run_full_and_incremental(tmp_path, use_data_dir, old_dump, new_dump):
+    incremental_dir = tmp_path / "incremental"
+    full_dir = tmp_path / "full"
+    incremental_dir.mkdir()
+    full_dir.mkdir()
+
+    use_data_dir(incremental_dir)
+    write_dump(incremental_dir, old_dump)
+    preprocess(state_path=str(incremental_dir / "state.json"))
+    write_dump(incremental_dir, new_dump)
+    preprocess_incremental(str(incremental_dir / "state.json"))
+
+    use_data_dir(full_dir)
+    write_dump(full_dir, new_dump)
+    preprocess(state_path=str(full_dir / "state.json"))
+    return incremental_dir, full_dir
+
+
+def assert_same_outputs(incremental_dir, full_dir):
+    for name in [
+        "clean_recipe_df.csv", "clean_recipe_df.json", "ingredient_vocabulary.csv"
+    ]:
+        assert (incremental_dir / name).read_bytes() == (full_dir / name).read_bytes()
+    incremental_table = pq.read_table(incremental_dir / "clean_recipe_df.parquet")
+    assert incremental_table.equals(pq.read_table(full_dir / "clean_recipe_df.parquet"))
+    incremental_state = json.loads((incremental_dir / "state.json").read_text())
+    full_state = json.loads((full_dir / "state.json").read_text())
+    assert incremental_state == full_state
+
+
+def test_preprocess_incremental_matches_full_rebuild(tmp_path, offline_pipeline):
+    incremental_dir, full_dir = run_full_and_incremental(
+        tmp_path, offline_pipeline, make_dump(), make_dump(new=True)
+    )
+    assert_same_outputs(incremental_dir, full_dir)
+
+    clean = pd.read_csv(full_dir / "clean_recipe_df.csv")
+    # 14 and 15 are the troll recipes, 99 is not a recipe
+    assert clean["Nom"].tolist() == [
+        "recipe 10", "recipe 11", "recipe 12", "recipe 13",
+        "recipe 16", "recipe 17", "recipe 18",
+    ]
+    assert clean["Nombre de commentaires"].tolist() == [3, 1, 1, 1, 1, 2, 1]
+    assert clean["Note moyenne"].iloc[0] == pytest.approx(13 / 3)
+    # Recipe 10 gets a new review, recipe 11 has no review
+    sentiment = clean["Sentiment moyen des commentaires"]
+    assert clean["Écart-type du sentiment des commentaires"].iloc[0] > 0
+    assert np.isnan(sentiment.iloc[1])
+    assert sentiment.iloc[[0, 2, 3, 4, 5, 6]].notna().all()
+    table = pq.read_table(full_dir / "clean_recipe_df.parquet")
+    assert table.column("recipe_id").to_pylist() == [10, 11, 12, 13, 16, 17, 18]
+    # The parquet file stores the ingredients as ids into the vocabulary
+    vocabulary = load_vocabulary(str(full_dir / "ingredient_vocabulary.csv"))
+    assert vocabulary == ["salt", "wheat flour"]
+    assert json.loads(table.schema.metadata[b"ingredients"]) == vocabulary
+    assert table.column("Ingrédients").to_pylist()[0] == [0, 1, None]
+
+
+def test_preprocess_incremental_falls_back_on_new_troll_recipe(tmp_path, offline_pipeline):
+    incremental_dir, full_dir = run_full_and_incremental(
+        tmp_path, offline_pipeline, make_dump(), make_dump(new=True, troll=True)
+    )
+    assert_same_outputs(incremental_dir, full_dir)
+    state = json.loads((full_dir / "state.json").read_text())
+    assert [recipe_id for recipe_id, _ in state["minutes_outliers"]] == [19, 15]
+
+
+def test_preprocess_incremental_new_interaction_of_troll_recipe(
+    tmp_path, offline_pipeline, monkeypatch
+):
+    full_rebuilds = []
+    full_preprocess = pipeline_preprocess.preprocess
+
+    def record_full_rebuild(**kwargs):
+        full_rebuilds.append(kwargs)
+        full_preprocess(**kwargs)
+
+    # Only the fallbacks of preprocess_incremental go through the module attribute
+    monkeypatch.setattr(pipeline_preprocess, "preprocess", record_full_rebuild)
+    incremental_dir, full_dir = run_full_and_incremental(
+        tmp_path,
+        offline_pipeline,
+        make_dump(),
+        make_dump(new=True, troll_interaction=True),
+    )
+    # The troll recipe 15 is only counted once
+    assert full_rebuilds == []
+    assert_same_outputs(incremental_dir, full_dir)
+
+
+def test_preprocess_incremental_interaction_on_max_date(tmp_path, offline_pipeline):
+    incremental_dir, full_dir = run_full_and_incremental(
+        tmp_path, offline_pipeline, make_dump(), make_dump(new=True, same_day=True)
+    )
+    assert_same_outputs(incremental_dir, full_dir)
+    clean = pd.read_csv(full_dir / "clean_recipe_df.csv")
+    assert clean.loc[clean["Nom"] == "recipe 12", "Nombre de commentaires"].item() == 2
+
+
+def test_preprocess_incremental_without_changes(tmp_path, offline_pipeline):
+    incremental_dir, full_dir = run_full_and_incremental(
+        tmp_path, offline_pipeline, make_dump(), make_dump()
+    )
+    assert_same_outputs(incremental_dir, full_dir)
+
+
+def test_parse_date_list():
+    assert parse_date_list("[datetime.date(2009, 12, 9), datetime.date(2010, 1, 2)]") == [
+        date(2009, 12, 9), date(2010, 1, 2)
+    ]
+    assert parse_date_list("[]") == []
+
+
+from scripts import pipeline_preprocess, review_sentiment
+
+
+def test_preprocess_stage_cache(tmp_path, offline_pipeline, monkeypatch):
+    offline_pipeline(tmp_path)
+    write_dump(tmp_path, make_dump())
+    loaded = []
+    load_data = pipeline_preprocess.load_data
+
+    def counted_load_data(path):
+        loaded.append(os.path.basename(path))
+        return load_data(path)
+
+    monkeypatch.setattr("scripts.pipeline_preprocess.load_data", counted_load_data)
+    stage_cache = str(tmp_path / "stages")
+    outputs = ["clean_recipe_df.csv", "clean_recipe_df.json"]
+
+    preprocess(stage_cache_path=stage_cache)
+    expected = [(tmp_path / name).read_bytes() for name in outputs]
+    assert len(loaded) == 4
+
+    loaded.clear()
+    preprocess(stage_cache_path=stage_cache)
+    assert loaded == []
+    assert [(tmp_path / name).read_bytes() for name in outputs] == expected
+
+    preprocess(stage_cache_path=stage_cache, from_stage="ingredients")
+    assert loaded == ["ingredients.csv"]
+    assert [(tmp_path / name).read_bytes() for name in outputs] == expected
+
+
+def test_preprocess_profile(tmp_path, offline_pipeline):
+    offline_pipeline(tmp_path)
+    write_dump(tmp_path, make_dump())
+    outputs = ["clean_recipe_df.csv", "clean_recipe_df.json"]
+    preprocess()
+    expected = [(tmp_path / name).read_bytes() for name in outputs]
+
+    profile_path = tmp_path / "profile" / "profile.json"
+    preprocess(profile_path=str(profile_path), profile_cprofile=True)
+
+    assert [(tmp_path / name).read_bytes() for name in outputs] == expected
+    report = json.loads(profile_path.read_text())
+    stages = [record["stage"] for record in report["stages"]]
+    # The watermarks are only computed with a state path
+    expected_stages = [name for name in pipeline_preprocess.STAGES if name != "watermarks"]
+    assert sorted(stages) == sorted(expected_stages + ["save"])
+    assert report["slowest"] in stages
+    filtered = report["stages"][stages.index("filter")]
+    assert filtered["rows_in"] >= filtered["rows_out"] > 0
+    assert filtered["memory_out"] > 0
+    assert filtered["throughput"] is None
+    sentiment = report["stages"][stages.index("sentiment")]
+    assert sentiment["unit"] == "reviews"
+    assert sentiment["items"] == 6
+    assert sentiment["throughput"] > 0
+    assert (tmp_path / "profile" / "profile.txt").read_text().startswith("stage")
+    assert pstats.Stats(str(tmp_path / "profile" / "profile.prof")).total_calls > 0
+
+
+def test_preprocess_synthetic_dump(tmp_path, offline_pipeline):
+    from scripts.generate_synthetic_data import generate, REAL_RECIPES
+    from scripts.pipeline_preprocess import load_clean_dataset
+
+    generate(str(tmp_path), 300 / REAL_RECIPES, seed=0, chunk_recipes=100)
+    offline_pipeline(tmp_path)
+    preprocess()
+
+    clean = load_clean_dataset(str(tmp_path / "clean_recipe_df.csv"))
+    assert 0 < len(clean) <= 300
+    assert clean["Nombre de commentaires"].gt(0).all()
+
+
+from scripts.duckdb_backend import (
+    groupby_duckdb,
+    delete_outliers_minutes_duckdb,
+    delete_outliers_steps_duckdb,
+    delete_outliers_calories_duckdb,
+)
+from scripts.pipeline_preprocess import (
+    GROUPBY_FIRST_COLUMNS,
+    GROUPBY_LIST_COLUMNS,
+    NUTRITION_KEPT_COLUMNS,
+    delete_outliers_calories,
+)
+
+
+def test_groupby_duckdb_matches_in_memory(tmp_path):
+    raw_recipes, raw_interactions, pp_recipes = make_raw_tables()
+    # Reviews pandas reads as missing, quotes and line breaks
+    raw_interactions["review"] = ["great", "NA", None, 'so "fresh",\nreally', "meh",
+                                  "lost", " nice "]
+    interactions_path = tmp_path / "RAW_interactions.csv"
+    raw_interactions.to_csv(interactions_path, index=False)
+
+    recipes, interactions, pp = parse_raw_tables(
+        raw_recipes.copy(), pd.read_csv(interactions_path), pp_recipes.copy()
+    )
+    df = merge_dataframe(recipes, interactions, "id", "recipe_id")
+    df = merge_dataframe(pp, df, "id", "recipe_id")
+    expected = groupby(df)
+
+    recipes, _, pp = parse_raw_tables(raw_recipes.copy(), None, pp_recipes.copy())
+    result = groupby_duckdb(
+        recipes, pp, str(interactions_path), GROUPBY_FIRST_COLUMNS,
+        GROUPBY_LIST_COLUMNS, memory_limit_mb=64, threads=2,
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.to_csv(index=False) == expected.to_csv(index=False)
+
+
+def test_groupby_duckdb_keeps_file_order_of_parallel_scan(tmp_path):
+    raw_recipes, _, pp_recipes = make_raw_tables()
+    recipes, _, pp = parse_raw_tables(raw_recipes.copy(), None, pp_recipes.copy())
+    # Large enough for DuckDB to split the file between its threads
+    n_rows = 400_000
+    interactions = pd.DataFrame({
+        "user_id": np.arange(n_rows),
+        "recipe_id": np.array([10, 11, 12, 13])[np.arange(n_rows) % 4],
+        "date": "2004-01-01",
+        "rating": 5,
+        "review": "a review long enough to make the file span several buffers " * 2,
+    })
+    interactions_path = tmp_path / "RAW_interactions.csv"
+    interactions.to_csv(interactions_path, index=False)
+    interactions.to_parquet(tmp_path / "RAW_interactions.parquet", row_group_size=10_000)
+
+    for path in [interactions_path, tmp_path / "RAW_interactions.parquet"]:
+        result = groupby_duckdb(
+            recipes, pp, str(path), GROUPBY_FIRST_COLUMNS, ["user_id"], threads=4,
+        )
+        for recipe, user_ids in zip(result["recipe_id"], result["user_id"]):
+            assert user_ids == list(range(recipe - 10, n_rows, 4))
+
+
+def test_duckdb_outlier_filters_match_pandas():
+    data = pd.DataFrame({
+        "recipe_id": pd.Categorical([1, 2, 3, 4, 5, 6]),
+        "minutes": [10, 500, 0, 500, 500, 20],
+        "n_steps": [1, 0, 2, 3, 4, 5],
+        "calories": np.array([100, 20000, 0, np.nan, 19999.5, 5], dtype=np.float32),
+    }, index=[3, 5, 8, 9, 12, 20])
+
+    # Ties on the largest minutes: the first ones are the troll recipes
+    pd.testing.assert_frame_equal(
+        delete_outliers_minutes_duckdb(data), delete_outliers_minutes(data)
+    )
+    pd.testing.assert_frame_equal(
+        delete_outliers_minutes_duckdb(data, [2, 6]), delete_outliers_minutes(data, [2, 6])
+    )
+    pd.testing.assert_frame_equal(
+        delete_outliers_minutes_duckdb(data, []), delete_outliers_minutes(data, [])
+    )
+    pd.testing.assert_frame_equal(
+        delete_outliers_steps_duckdb(data), delete_outliers_steps(data)
+    )
+    pd.testing.assert_frame_equal(
+        delete_outliers_calories_duckdb(data), delete_outliers_calories(data)
+    )
+
+
+@pytest.mark.parametrize("backend", ["pandas", "duckdb"])
+def test_delete_outliers_calories_boundary(backend):
+    # 19999.9995 rounds to 20000 in float32
+    assert np.float32(19999.9995) == 20000
+    data = pd.DataFrame({
+        "nutrition": [
+            f"[{calories}, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]"
+            for calories in ["19999.9995", "20000.0", "100.5", "0.0"]
+        ],
+    })
+    data = explicit_nutriments(data, NUTRITION_KEPT_COLUMNS, np.float64)
+
+    kept = delete_outliers_calories(data, backend)
+
+    assert kept.index.tolist() == [0, 2]
+    assert kept["calories"].dtype == np.float32
+
+
+def test_preprocess_duckdb_backend_matches_pandas(tmp_path, offline_pipeline):
+    from scripts.generate_synthetic_data import generate, REAL_RECIPES
+
+    for backend in ["pandas", "duckdb"]:
+        directory = tmp_path / backend
+        directory.mkdir()
+        generate(str(directory), 300 / REAL_RECIPES, seed=0, chunk_recipes=100)
+        offline_pipeline(directory)
+        preprocess(state_path=str(directory / "state.json"), backend=backend)
+
+    assert_same_outputs(tmp_path / "duckdb", tmp_path / "pandas")
+
+
+def test_preprocess_unknown_backend(tmp_path, offline_pipeline):
+    offline_pipeline(tmp_path)
+    with pytest.raises(ValueError):
+        preprocess(backend="spark")
+
+
+@patch("nltk.word_tokenize", side_effect=str.split)
+def test_clean_and_tokenize_without_pos_tags(mock_word_tokenize):
+    assert clean_and_tokenize("The quick stew, 2 times", {"the"}, do_pos_tags=False) == [
+        "quick", "stew", "times"
+    ]
+
+
+@patch("nltk.word_tokenize", side_effect=str.split)
+@patch("scripts.pipeline_preprocess.nltk.pos_tag")
+def test_clean_colonne_pos_lexicon(mock_pos_tag, mock_word_tokenize):
+    data = pd.DataFrame({"name": ["the hot soup", "hot stew"]})
+    lexicon = {"the": "DT", "hot": "JJ", "soup": "NN", "stew": "NN"}
+
+    result = clean_colonne(data.copy(), "name", set(), pos_lexicon=lexicon)
+
+    assert result["cleaned_name"].tolist() == [["soup"], ["stew"]]
+    mock_pos_tag.assert_not_called()
+
+
+def test_token_cache_fingerprint_pos_lexicon(tmp_path):
+    from scripts.pos_lexicon import save_lexicon
+
+    path = str(tmp_path / "lexicon.json")
+    save_lexicon(path, {"soup": "NN"})
+    with_lexicon = token_cache_fingerprint({"a"}, path)
+    assert with_lexicon != token_cache_fingerprint({"a"})
+    save_lexicon(path, {"soup": "VB"})
+    assert token_cache_fingerprint({"a"}, path) != with_lexicon
+
+
+def test_preprocess_sentiment_cache(tmp_path, offline_pipeline, monkeypatch):
+    offline_pipeline(tmp_path)
+    write_dump(tmp_path, make_dump())
+    outputs = ["clean_recipe_df.csv", "clean_recipe_df.json"]
+    preprocess()
+    expected = [(tmp_path / name).read_bytes() for name in outputs]
+
+    sentiment_cache = str(tmp_path / "cache" / "sentiment.sqlite")
+    preprocess(sentiment_cache_path=sentiment_cache)
+    assert [(tmp_path / name).read_bytes() for name in outputs] == expected
+
+    # All the reviews are then read from the cache
+    scored = []
+    score_texts = review_sentiment.score_texts
+
+    def counted_score_texts(texts, n_jobs=1, batch_size=1):
+        scored.extend(texts)
+        return score_texts(texts, n_jobs, batch_size)
+
+    monkeypatch.setattr(review_sentiment, "score_texts", counted_score_texts)
+    preprocess(sentiment_cache_path=sentiment_cache)
+    assert scored == []
+    assert [(tmp_path / name).read_bytes() for name in outputs] == expected
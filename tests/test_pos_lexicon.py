@@ -0,0 +1,123 @@
+import os
+import sys
+
+import nltk
+import pandas as pd
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(root)
+
+from scripts.pos_lexicon import (
+    LexiconTagger,
+    build_lexicon,
+    save_lexicon,
+    load_lexicon,
+    tag_agreement,
+    main,
+)
+
+
+class ContextTagger:
+    """Tag a word as a verb after "to", as an adjective if it ends with "y", as a
+    noun otherwise"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def tag(self, tokens):
+        self.calls += 1
+        tags = []
+        for i, token in enumerate(tokens):
+            if i > 0 and tokens[i - 1] == "to":
+                tags.append("VB")
+            elif token.endswith("y"):
+                tags.append("JJ")
+            else:
+                tags.append("NN")
+        return list(zip(tokens, tags))
+
+
+def test_build_lexicon_keeps_dominant_tag():
+    token_lists = [["to", "cook", "soup"], ["cook", "soup"], ["cook"], ["spicy"]]
+
+    lexicon = build_lexicon(token_lists, ContextTagger())
+
+    assert lexicon == {"to": "NN", "cook": "NN", "soup": "NN", "spicy": "JJ"}
+
+
+def test_lexicon_tagger_known_words():
+    fallback = ContextTagger()
+    tagger = LexiconTagger({"cook": "VB", "soup": "NN"}, fallback=lambda: fallback)
+
+    assert tagger.tag(["cook", "soup"]) == [("cook", "VB"), ("soup", "NN")]
+    assert fallback.calls == 0
+    assert tagger.missing_rate == 0.0
+
+
+def test_lexicon_tagger_falls_back_on_missing_words():
+    built = []
+
+    def fallback():
+        built.append(ContextTagger())
+        return built[-1]
+
+    tagger = LexiconTagger({"to": "TO", "soup": "NN"}, fallback=fallback)
+
+    # The fallback tags the missing word in its context
+    assert tagger.tag(["to", "stew", "soup"]) == [
+        ("to", "TO"), ("stew", "VB"), ("soup", "NN")
+    ]
+    assert tagger.tag(["creamy", "soup"]) == [("creamy", "JJ"), ("soup", "NN")]
+    assert len(built) == 1
+    assert built[0].calls == 2
+    assert tagger.missing_rate == pytest.approx(2 / 5)
+
+
+def test_lexicon_tagger_without_fallback():
+    tagger = LexiconTagger({"soup": "NN"})
+
+    assert tagger.tag(["hot", "soup"]) == [("hot", None), ("soup", "NN")]
+
+
+def test_save_and_load_lexicon(tmp_path):
+    path = str(tmp_path / "cache" / "lexicon.json")
+    save_lexicon(path, {"soup": "NN"}, texts=3)
+
+    assert load_lexicon(path) == {"soup": "NN"}
+
+
+def test_tag_agreement():
+    token_lists = [["to", "cook"], ["spicy", "soup"]]
+    lexicon = LexiconTagger({"to": "NN", "cook": "NN", "spicy": "JJR", "soup": "NN"})
+
+    measures = tag_agreement(
+        token_lists, lexicon, ContextTagger(), frozenset(["JJ", "JJR", "VB"])
+    )
+
+    assert measures == {
+        "texts": 2,
+        "words": 4,
+        "tag_agreement": 0.5,
+        "filter_agreement": 0.75,
+        "text_agreement": 0.5,
+    }
+
+
+def test_main_build_and_agreement(tmp_path, monkeypatch, capsys):
+    pd.DataFrame({
+        "name": ["spicy soup", "to stew"],
+        "description": [None, "a stew to cook slowly"],
+    }).to_csv(tmp_path / "RAW_recipes.csv", index=False)
+    monkeypatch.setattr(nltk, "word_tokenize", str.split)
+    monkeypatch.setattr(nltk.tag, "PerceptronTagger", ContextTagger)
+    lexicon_path = str(tmp_path / "lexicon.json")
+
+    main(["build", "--data", str(tmp_path), "--output", lexicon_path])
+    assert load_lexicon(lexicon_path)["spicy"] == "JJ"
+
+    main(["agreement", "--data", str(tmp_path), "--lexicon", lexicon_path])
+    output = capsys.readouterr().out
+    assert "texts" in output
+    assert "filter_agreement" in output
+    assert "missing_rate" in output
@@ -0,0 +1,87 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(root)
+
+from scripts import review_sentiment as sentiment
+from scripts.review_sentiment import (
+    score_texts,
+    score_reviews,
+    aggregate_sentiment,
+    review_sentiment,
+    open_sentiment_cache,
+    sentiment_fingerprint,
+)
+
+REVIEWS = ["Great recipe!", "Too salty, not good.", "We loved it", "review"]
+
+
+def test_score_texts():
+    scores = score_texts(REVIEWS)
+
+    assert scores[0] > 0
+    assert scores[1] < 0
+    assert scores[3] == 0.0
+
+
+def test_score_texts_parallel_keeps_order():
+    texts = REVIEWS * 5
+
+    assert score_texts(texts, n_jobs=2, batch_size=3) == score_texts(texts)
+
+
+def test_score_reviews_scores_each_review_once(monkeypatch):
+    scored = []
+
+    def fake_score_texts(texts, n_jobs=1, batch_size=1):
+        scored.extend(texts)
+        return [float(len(text)) for text in texts]
+
+    monkeypatch.setattr(sentiment, "score_texts", fake_score_texts)
+    scores = score_reviews(["good", None, "good", "bad", np.nan])
+
+    assert scored == ["good", "bad"]
+    np.testing.assert_array_equal(scores, [4.0, np.nan, 4.0, 3.0, np.nan])
+
+
+def test_score_reviews_uses_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "sentiment.sqlite")
+    cache = open_sentiment_cache(path)
+    expected = score_reviews(REVIEWS, cache=cache)
+    cache.close()
+
+    def score_nothing(texts, n_jobs=1, batch_size=1):
+        assert texts == []
+        return []
+
+    monkeypatch.setattr(sentiment, "score_texts", score_nothing)
+    cache = open_sentiment_cache(path)
+    np.testing.assert_array_equal(score_reviews(REVIEWS, cache=cache), expected)
+    cache.close()
+
+
+def test_sentiment_fingerprint():
+    assert sentiment_fingerprint().startswith("vaderSentiment ")
+
+
+def test_aggregate_sentiment():
+    scores = np.array([0.5, -0.5, 0.2, np.nan, np.nan, 0.1])
+
+    mean, std = aggregate_sentiment(scores, np.array([2, 2, 1, 0, 1]))
+
+    np.testing.assert_allclose(mean, [0.0, 0.2, np.nan, np.nan, 0.1])
+    np.testing.assert_allclose(std, [0.5, 0.0, np.nan, np.nan, 0.0])
+
+
+def test_review_sentiment():
+    mean, std = review_sentiment([REVIEWS[:2], [], [REVIEWS[2]]])
+    scores = score_texts(REVIEWS[:3])
+
+    assert mean[0] == pytest.approx((scores[0] + scores[1]) / 2)
+    assert std[0] == pytest.approx(abs(scores[0] - scores[1]) / 2)
+    assert np.isnan(mean[1])
+    assert mean[2] == scores[2]
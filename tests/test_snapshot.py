@@ -0,0 +1,65 @@
+import os
+
+import pyarrow as pa
+from utils import snapshot
+from utils.snapshot import (
+    snapshot_path,
+    source_key,
+    is_up_to_date,
+    write_snapshot,
+    read_snapshot,
+)
+
+
+def write_source(tmp_path, content="a,b\n1,2\n"):
+    path = tmp_path / "data.csv"
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_write_and_read_snapshot(tmp_path):
+    path = write_source(tmp_path)
+    table = pa.table({"a": [1, 2, 3]})
+
+    write_snapshot(table, path, [source_key(path)])
+
+    # Le fichier temporaire a été renommé
+    assert sorted(os.listdir(tmp_path)) == ["data.csv", "data.csv.snapshot.arrow"]
+    assert read_snapshot(path, [path]).column("a").to_pylist() == [1, 2, 3]
+
+
+def test_is_up_to_date(tmp_path):
+    path = write_source(tmp_path)
+    keys = [source_key(path)]
+
+    assert is_up_to_date(keys, [path])
+    # Touché sans être modifié
+    os.utime(path, ns=(0, 0))
+    assert is_up_to_date(keys, [path])
+    # Modifié, avec la même taille
+    write_source(tmp_path, "a,b\n1,3\n")
+    os.utime(path, ns=(1, 1))
+    assert not is_up_to_date(keys, [path])
+    # Source ajoutée ou supprimée
+    other = str(tmp_path / "other.csv")
+    assert not is_up_to_date(keys, [path, other])
+    os.remove(path)
+    assert not is_up_to_date(keys, [path])
+
+
+def test_read_snapshot_missing_or_stale(tmp_path, monkeypatch):
+    path = write_source(tmp_path)
+    assert read_snapshot(path, [path]) is None
+
+    write_snapshot(pa.table({"a": [1]}), path, [source_key(path)])
+    monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", snapshot.SNAPSHOT_VERSION + 1)
+    assert read_snapshot(path, [path]) is None
+
+
+def test_read_snapshot_unreadable(tmp_path, caplog):
+    path = write_source(tmp_path)
+    with open(snapshot_path(path), "wb") as file:
+        file.write(b"not an arrow file")
+
+    assert read_snapshot(path, [path]) is None
+    assert "Instantané illisible" in caplog.text
@@ -0,0 +1,143 @@
+# tests/test_stage_cache.py
+
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.stage_cache import (
+    Stage,
+    StageCache,
+    run_stages,
+    stage_keys,
+    code_fingerprint,
+    downstream_stages,
+)
+
+SCALE = 2
+
+
+def read_number(path):
+    with open(path) as file:
+        return int(file.read())
+
+
+def double(value):
+    return value * SCALE
+
+
+def add(value, offset):
+    return value + offset
+
+
+class Scaler:
+    def scale(self, value):
+        return value * SCALE
+
+
+def make_stages(path, calls, offset=1):
+    def counted(name, function):
+        def run(*args, **kwargs):
+            calls.append(name)
+            return function(*args, **kwargs)
+
+        return run
+
+    return [
+        Stage("read", counted("read", read_number), outputs=["number"],
+              params={"path": str(path)}, files=[path]),
+        Stage("double", counted("double", double), inputs=["number"], outputs=["doubled"]),
+        Stage("add", counted("add", add), inputs=["doubled"], outputs=["result"],
+              params={"offset": offset}),
+    ]
+
+
+def test_run_stages_without_cache(tmp_path):
+    path = tmp_path / "number.txt"
+    path.write_text("3")
+    calls = []
+    assert run_stages(make_stages(path, calls), ["result"]) == [7]
+    assert calls == ["read", "double", "add"]
+    calls.clear()
+    assert run_stages(make_stages(path, calls), ["doubled"]) == [6]
+    assert calls == ["read", "double"]
+
+
+def test_run_stages_skips_cached_stages(tmp_path):
+    path = tmp_path / "number.txt"
+    path.write_text("3")
+    cache = StageCache(str(tmp_path / "stages"))
+    calls = []
+    assert run_stages(make_stages(path, calls), ["result"], cache) == [7]
+    calls.clear()
+
+    assert run_stages(make_stages(path, calls), ["result"], cache) == [7]
+    assert calls == []
+
+    # Only the stage whose parameters changed runs again
+    assert run_stages(make_stages(path, calls, offset=10), ["result"], cache) == [16]
+    assert calls == ["add"]
+    calls.clear()
+
+    # A changed input file invalidates every stage downstream of it
+    path.write_text("4")
+    assert run_stages(make_stages(path, calls, offset=10), ["result"], cache) == [18]
+    assert calls == ["read", "double", "add"]
+    assert len(os.listdir(tmp_path / "stages")) == 3
+
+
+def test_run_stages_from_stage(tmp_path):
+    path = tmp_path / "number.txt"
+    path.write_text("3")
+    cache = StageCache(str(tmp_path / "stages"))
+    calls = []
+    run_stages(make_stages(path, calls), ["result"], cache)
+    calls.clear()
+
+    assert run_stages(make_stages(path, calls), ["result"], cache, "double") == [7]
+    assert calls == ["double", "add"]
+    assert downstream_stages(make_stages(path, []), "read") == {"read", "double", "add"}
+    with pytest.raises(ValueError):
+        run_stages(make_stages(path, calls), ["result"], cache, "unknown")
+
+
+def test_stage_keys_chain(tmp_path):
+    path = tmp_path / "number.txt"
+    path.write_text("3")
+    keys = stage_keys(make_stages(path, []))
+    assert stage_keys(make_stages(path, [])) == keys
+    changed = stage_keys(make_stages(path, [], offset=2))
+    assert changed["read"] == keys["read"]
+    assert changed["add"] != keys["add"]
+    with pytest.raises(ValueError):
+        stage_keys([Stage("double", double, inputs=["number"], outputs=["doubled"])])
+
+
+def test_code_fingerprint_follows_functions_and_constants(monkeypatch):
+    def stage(value):
+        return double(value)
+
+    fingerprint = code_fingerprint(stage)
+    assert code_fingerprint(stage) == fingerprint
+    monkeypatch.setattr(sys.modules[__name__], "SCALE", 3)
+    assert code_fingerprint(stage) != fingerprint
+
+
+def test_stage_keys_follow_project_classes(monkeypatch):
+    scaler = Scaler()
+
+    def scale_new(value):
+        return Scaler().scale(value)
+
+    def scale_shared(value):
+        return scaler.scale(value)
+
+    stages = [Stage("new", scale_new, outputs=["new"]),
+              Stage("shared", scale_shared, outputs=["shared"])]
+    keys = stage_keys(stages)
+    assert stage_keys(stages) == keys
+    monkeypatch.setattr(Scaler, "scale", lambda self, value: value * 4)
+    changed = stage_keys(stages)
+    assert changed["new"] != keys["new"]
+    assert changed["shared"] != keys["shared"]
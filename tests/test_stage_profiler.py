@@ -0,0 +1,91 @@
+# tests/test_stage_profiler.py
+
+import sys
+import os
+import json
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.stage_cache import Stage, StageCache, run_stages
+from scripts.stage_profiler import StageProfiler, frame_rows, frame_memory
+
+
+def make_frame(size):
+    return pd.DataFrame({"value": range(size)})
+
+
+def keep_even(df):
+    return df[df["value"] % 2 == 0]
+
+
+def make_stages(size):
+    return [
+        Stage("make", make_frame, outputs=["frame"], params={"size": size}),
+        Stage("even", keep_even, inputs=["frame"], outputs=["even"]),
+    ]
+
+
+def test_frame_rows_and_memory():
+    df = make_frame(10)
+    assert frame_rows([df, df["value"], 3]) == 20
+    assert frame_rows([3, "text"]) is None
+    assert frame_memory([df]) == df.memory_usage(deep=True).sum()
+    assert frame_memory([]) is None
+
+
+def test_run_stages_with_profiler(tmp_path):
+    cache = StageCache(str(tmp_path / "stages"))
+    profiler = StageProfiler()
+    assert len(run_stages(make_stages(100), ["even"], cache, profiler=profiler)[0]) == 50
+    assert [record["stage"] for record in profiler.records] == ["make", "even"]
+    assert profiler.records[1]["rows_in"] == 100
+    assert profiler.records[1]["rows_out"] == 50
+    assert not any(record["cached"] for record in profiler.records)
+
+    profiler = StageProfiler()
+    run_stages(make_stages(100), ["even"], cache, profiler=profiler)
+    assert [record["stage"] for record in profiler.records] == ["even"]
+    assert profiler.records[0]["cached"]
+    assert profiler.slowest() is None
+
+
+def test_rows_in_counted_before_the_stage():
+    def drop_odd(df):
+        df.drop(df.index[df["value"] % 2 == 1], inplace=True)
+        return df
+
+    df = make_frame(100)
+    profiler = StageProfiler()
+    profiler.measure("drop", lambda: drop_odd(df), [df], False)
+    assert profiler.records[0]["rows_in"] == 100
+    assert profiler.records[0]["rows_out"] == 50
+
+
+def test_stage_throughput():
+    stages = make_stages(100)
+    stages[1].throughput = ("values", len)
+    profiler = StageProfiler()
+    run_stages(stages, ["even"], profiler=profiler)
+
+    make, even = profiler.records
+    assert make["throughput"] is None
+    assert even["items"] == 100
+    assert even["unit"] == "values"
+    assert even["throughput"] == 100 / even["wall_time"]
+    assert "values/s" in profiler.table()
+
+
+def test_write_report_and_slowest_stage(tmp_path):
+    profiler = StageProfiler(cprofile=True)
+    run_stages(make_stages(1000), ["even"], profiler=profiler)
+    path = tmp_path / "profile.json"
+    table = profiler.write(str(path))
+
+    report = json.loads(path.read_text())
+    assert [record["stage"] for record in report["stages"]] == ["make", "even"]
+    assert report["slowest"] == profiler.slowest()["stage"]
+    assert (tmp_path / "profile.txt").read_text() == table + "\n"
+    assert profiler.dump_slowest(str(tmp_path / "slowest.prof")) == report["slowest"]
+    assert (tmp_path / "slowest.prof").exists()
@@ -0,0 +1,50 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from utils.techniques import (
+    TECHNIQUES_LIST,
+    vectors_to_masks,
+    masks_to_words,
+    popcount,
+    most_common_techniques,
+)
+
+
+def random_vectors(n_recipes, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n_recipes, len(TECHNIQUES_LIST))) < 0.1).astype(int).tolist()
+
+
+def test_vectors_to_words_round_trip():
+    vectors = random_vectors(200)
+    masks = vectors_to_masks(vectors)
+    expected = [
+        [technique for technique, used in zip(TECHNIQUES_LIST, vector) if used == 1]
+        for vector in vectors
+    ]
+    assert masks.dtype == np.uint64
+    assert masks_to_words(masks) == expected
+    assert popcount(masks).tolist() == [len(words) for words in expected]
+
+
+def test_popcount_all_bits():
+    masks = np.array([0, 1, 2**63, 2**64 - 1, 0x5555555555555555], dtype=np.uint64)
+    expected = [bin(int(mask)).count("1") for mask in masks]
+    assert popcount(masks).tolist() == expected
+    assert popcount(pd.Series(masks)).tolist() == expected
+
+
+def test_vectors_to_masks_ragged_and_non_binary():
+    masks = vectors_to_masks([[1, 0, 2], [0, 1], [0] * 60 + [1]])
+    assert masks_to_words(masks) == [["bake"], ["barbecue"], []]
+
+
+def test_most_common_techniques_matches_counter():
+    masks = vectors_to_masks(random_vectors(300, seed=1))
+    words = masks_to_words(masks)
+    counter = Counter(technique for recipe in words for technique in recipe)
+    assert most_common_techniques(masks, 10) == counter.most_common(10)
+    assert most_common_techniques(masks) == counter.most_common()
+    assert most_common_techniques(np.array([], dtype=np.uint64), 5) == []
+
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from utils import time_series
+from utils.time_series import (
+    MonthlySeries,
+    arrow_date_months,
+    date_months,
+    monthly_counts,
+    seasonal_components,
+)
+
+
+def test_monthly_counts():
+    series = monthly_counts(
+        pd.to_datetime(["2020-01-15", "2020-01-02", "2020-03-31", None]).to_numpy()
+    )
+
+    assert series.start == np.datetime64("2020-01")
+    # Les mois vides sont comptés
+    assert series.counts.tolist() == [2, 0, 1]
+    assert series.counts.dtype == np.int32
+    assert list(series.months) == list(pd.date_range("2020-01-01", periods=3, freq="MS"))
+    with pytest.raises(ValueError):
+        series.counts[0] = 1
+    assert len(monthly_counts(np.array([], dtype="datetime64[D]"))) == 0
+
+
+def test_date_months():
+    expected = np.array(["2009-12", "2010-01", "2010-01"], dtype="datetime64[M]")
+    csv = pd.Series(
+        [
+            "[datetime.date(2009, 12, 9), datetime.date(2010, 1, 2)]",
+            "[]",
+            "[datetime.date(2010, 1, 30)]",
+        ]
+    )
+    lists = pd.Series(
+        [
+            [pd.Timestamp("2009-12-09"), pd.Timestamp("2010-01-02")],
+            [],
+            [pd.Timestamp("2010-01-30")],
+        ]
+    )
+    arrow = pa.chunked_array([pa.array(lists.tolist(), pa.list_(pa.timestamp("ns")))])
+
+    np.testing.assert_array_equal(date_months(csv), expected)
+    np.testing.assert_array_equal(date_months(lists), expected)
+    np.testing.assert_array_equal(arrow_date_months(arrow), expected)
+    np.testing.assert_array_equal(
+        date_months(pd.Series(["2009-12-09", "2010-01-02"])), expected[:2]
+    )
+
+
+def test_seasonal_components_cached(monkeypatch):
+    seasonal_components.clear()
+    calls = []
+    decompose = time_series.sm.tsa.seasonal_decompose
+
+    def counting_decompose(*args, **kwargs):
+        calls.append(kwargs["model"])
+        return decompose(*args, **kwargs)
+
+    monkeypatch.setattr(time_series.sm.tsa, "seasonal_decompose", counting_decompose)
+    series = MonthlySeries("2020-01", np.arange(1, 37))
+
+    components = seasonal_components(series, "additive", 12)
+    assert list(components.columns) == ["Date", "Tendance", "Saisonnalité"]
+    assert len(components) == 36
+    assert components["Tendance"].iloc[18] == pytest.approx(19)
+    # Même série, modèle et période : pas de nouveau calcul
+    seasonal_components(MonthlySeries("2020-01", np.arange(1, 37)), "additive", 12)
+    seasonal_components(series, "multiplicative", 12)
+    assert calls == ["additive", "multiplicative"]
+
+    assert seasonal_components(MonthlySeries("2020-01", [1] * 23)).empty
+    # Le modèle multiplicatif divise par les effectifs : pas de mois vide
+    with pytest.raises(ValueError):
+        seasonal_components(MonthlySeries("2020-01", [0] + [1] * 35), "multiplicative")
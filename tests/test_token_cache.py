@@ -0,0 +1,85 @@
+# tests/test_token_cache.py
+
+import sys
+import os
+import sqlite3
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.token_cache import TokenCache, text_key
+
+
+def test_text_key():
+    assert text_key("stir fry") == text_key("stir fry")
+    assert text_key("stir fry") != text_key("stir fry ")
+
+
+def test_token_cache_persists(tmp_path):
+    path = str(tmp_path / "cache" / "tokens.sqlite")
+    with TokenCache(path, "v1") as cache:
+        cache.set_many([("crock pot beef stew", ["crock", "pot", "beef", "stew"])])
+
+    with TokenCache(path, "v1") as cache:
+        found = cache.get_many(["crock pot beef stew", "stir fry"])
+        assert found == {"crock pot beef stew": ["crock", "pot", "beef", "stew"]}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+
+def test_token_cache_invalidated_by_fingerprint(tmp_path):
+    path = str(tmp_path / "tokens.sqlite")
+    with TokenCache(path, "v1") as cache:
+        cache.set_many([("stir fry", ["stir", "fry"])])
+
+    with TokenCache(path, "v2") as cache:
+        assert len(cache) == 0
+        assert cache.get_many(["stir fry"]) == {}
+
+
+def test_token_cache_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "tokens.sqlite")
+    with TokenCache(path, "v1", max_entries=2) as cache:
+        cache.set_many([("a", ["a"])])
+        cache.set_many([("b", ["b"])])
+        cache.get_many(["a"])
+        cache.set_many([("c", ["c"])])
+
+        assert len(cache) == 2
+        assert cache.get_many(["a", "b", "c"]) == {"a": ["a"], "c": ["c"]}
+
+
+def test_token_cache_invalid_size(tmp_path):
+    with pytest.raises(ValueError):
+        TokenCache(str(tmp_path / "tokens.sqlite"), "v1", max_entries=0)
+
+
+def test_token_cache_tables_share_a_file(tmp_path):
+    path = str(tmp_path / "caches.sqlite")
+    with TokenCache(path, "v1") as tokens, TokenCache(path, "v2", table="scores") as scores:
+        tokens.set_many([("stir fry", ["stir", "fry"])])
+        scores.set_many([("stir fry", 0.5)])
+
+    # Each table keeps its own fingerprint
+    with TokenCache(path, "v1") as tokens, TokenCache(path, "v2", table="scores") as scores:
+        assert tokens.get_many(["stir fry"]) == {"stir fry": ["stir", "fry"]}
+        assert scores.get_many(["stir fry"]) == {"stir fry": 0.5}
+    with pytest.raises(ValueError):
+        TokenCache(path, "v1", table="scores; DROP TABLE meta")
+
+
+def test_token_cache_replaces_old_layout(tmp_path):
+    path = str(tmp_path / "tokens.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE tokens "
+        "(key TEXT PRIMARY KEY, tokens TEXT NOT NULL, last_used INTEGER NOT NULL)"
+    )
+    connection.execute("INSERT INTO tokens VALUES ('key', '[]', 1)")
+    connection.commit()
+    connection.close()
+
+    with TokenCache(path, "v1") as cache:
+        assert len(cache) == 0
+        cache.set_many([("stir fry", ["stir", "fry"])])
+        assert cache.get_many(["stir fry"]) == {"stir fry": ["stir", "fry"]}
@@ -7,6 +7,7 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 from unittest.mock import patch, MagicMock
 from utils.univariate_study import UnivariateStudy
+from utils.ingredients import VOCABULARY_ATTR, build_vocabulary, encode_ingredients
 
 
 def test_init_univariate():
@@ -179,6 +180,23 @@ def test_get_data_points_ingredients_univariate():
     assert (recipe_ids == [101, 102, 103]).all()
 
 
+def test_get_data_points_ingredients_ids():
+    name_lists = [["salt", "pepper"], ["sugar"], ["pepper", "salt"], ["egg"]]
+    vocabulary = build_vocabulary(name_lists)
+    df = pd.DataFrame({"filter1": [5, 10, 15, 20], "recipe_id": [101, 102, 103, 104]})
+    df["Ingrédients"] = encode_ingredients(name_lists, vocabulary, df.index)
+    df.attrs[VOCABULARY_ATTR] = vocabulary
+    study = UnivariateStudy(key="test_key", dataframe=df, plot_type="bar_ingredients")
+
+    list_elts, count_elts, recipe_ids = study.get_data_points_ingredients(
+        df, "Ingrédients", 2, ["filter1"], [(5, 15)]
+    )
+
+    assert list_elts == ["salt", "pepper"]
+    assert count_elts == [2, 2]
+    assert list(recipe_ids) == [101, 102, 103]
+
+
 def test_filters_univariate():
     df = pd.DataFrame(
         {